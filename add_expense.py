@@ -1,19 +1,36 @@
 from datetime import datetime
-import sqlite3
-from parse_expense import parse_expense
+from parse_expense import parse_expense, parse_expenses_batch
+from storage import get_repository
+
+def warn_possible_duplicates(repo, entry, timestamp):
+    """Point out existing expenses this one may repeat; the expense is still added"""
+    if entry.get("amount") is None:
+        return []
+    matches = repo.find_possible_duplicates(entry["amount"], entry["description"], timestamp)
+    for existing, score in matches:
+        print(f"⚠️  Possible duplicate of expense {existing['id']}: ${existing['amount']:.2f} | "
+              f"{existing['description']} | {str(existing['timestamp'])[:10]} ({score:.0%} similar)")
+    return matches
 
 def add_to_db(entry):
     # Use parsed date if available, otherwise use current time
     timestamp = entry.get('parsed_date', datetime.now().isoformat())
     
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute(
-        "INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?)",
-        (entry["amount"], entry["category"], entry["description"], timestamp)
-    )
-    conn.commit()
-    conn.close()
+    repo = get_repository()
+    warn_possible_duplicates(repo, entry, timestamp)
+    repo.insert_expense(entry["amount"], entry["category"], entry["description"], timestamp)
+
+def insert_expenses(rows):
+    """Insert many (amount, category, description, timestamp) rows in one transaction"""
+    return get_repository().insert_expenses(rows)
+
+def add_many_to_db(entries):
+    """Insert several parsed expenses with a single connection and commit"""
+    now = datetime.now().isoformat()
+    return insert_expenses([
+        (entry["amount"], entry["category"], entry["description"], entry.get('parsed_date', now))
+        for entry in entries
+    ])
 
 def add_expense(natural_input):
     result = parse_expense(natural_input)
@@ -26,12 +43,11 @@ def add_expense(natural_input):
     if isinstance(result, list):
         print(f"🔍 Found {len(result)} expenses to add:")
         
+        add_many_to_db(result)
         for i, entry in enumerate(result, 1):
             display_entry = {k: v for k, v in entry.items() if k != 'parsed_date'}
             if 'parsed_date' in entry:
                 print(f"🗓️  Expense {i} - Using parsed date: {entry['parsed_date'][:10]}")
-            
-            add_to_db(entry)
             print(f"✅ Expense {i} added:", display_entry)
         
         print(f"🎉 Successfully added all {len(result)} expenses!")
@@ -44,3 +60,34 @@ def add_expense(natural_input):
         
         add_to_db(result)
         print("✅ Expense added:", display_entry)
+
+def add_expenses_from_lines(lines):
+    """Parse many natural-language lines in batches and add every expense found"""
+    lines = [line.strip() for line in lines if line.strip()]
+    if not lines:
+        print("⚠️ No expenses to add.")
+        return
+    
+    print(f"🔍 Parsing {len(lines)} lines...")
+    results = parse_expenses_batch(lines)
+    
+    to_add = []
+    failed = []
+    for line, result in zip(lines, results):
+        if not result:
+            failed.append(line)
+            continue
+        entries = result if isinstance(result, list) else [result]
+        to_add.extend(entries)
+        for entry in entries:
+            display_entry = {k: v for k, v in entry.items() if k != 'parsed_date'}
+            print(f"✅ {line} →", display_entry)
+    
+    if to_add:
+        add_many_to_db(to_add)
+    print(f"🎉 Added {len(to_add)} expenses from {len(lines) - len(failed)} lines")
+    
+    if failed:
+        print(f"⚠️ Could not parse {len(failed)} lines:")
+        for line in failed:
+            print(f"  - {line}")
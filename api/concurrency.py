@@ -0,0 +1,51 @@
+"""
+Thread Offloading for Blocking I/O
+
+psycopg2 and the Ollama client (requests) are both blocking libraries. Any
+`async def` route that calls them directly freezes the event loop for the
+whole uvicorn worker, so blocking work is pushed onto threads here instead:
+
+- Database work runs on the shared worker threadpool (the same one FastAPI
+  uses for plain `def` routes and dependencies)
+- LLM calls run on their own executor, so slow model requests can never use
+  up the threads that database work needs. How many actually reach Ollama at
+  once, and in what order, is decided by the shared client in llm_client.py
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+import asyncio
+import functools
+import os
+
+import anyio.to_thread
+from starlette.concurrency import run_in_threadpool
+
+# Worker threads shared by database work, plain `def` routes and dependencies
+API_THREADPOOL_SIZE = int(os.getenv('API_THREADPOOL_SIZE', '40'))
+
+# Threads that may wait on the LLM; llm_client queues them by priority and
+# limits how many reach Ollama, so this only needs to cover the queue
+LLM_MAX_WORKERS = int(os.getenv('LLM_MAX_WORKERS', '16'))
+
+_llm_executor = ThreadPoolExecutor(max_workers=LLM_MAX_WORKERS, thread_name_prefix="llm")
+
+
+def configure_threadpool():
+    """Size the shared worker threadpool (must run inside the event loop)"""
+    anyio.to_thread.current_default_thread_limiter().total_tokens = API_THREADPOOL_SIZE
+
+
+async def run_db(func, *args, **kwargs):
+    """Run a blocking database call without blocking the event loop"""
+    return await run_in_threadpool(func, *args, **kwargs)
+
+
+async def run_llm(func, *args, **kwargs):
+    """Run a blocking LLM call on the dedicated LLM executor"""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_llm_executor, functools.partial(func, *args, **kwargs))
+
+
+def shutdown_executors():
+    """Stop the LLM executor (called on application shutdown)"""
+    _llm_executor.shutdown(wait=False, cancel_futures=True)
@@ -1,17 +1,207 @@
+from fastapi import Depends
 import psycopg2
+from psycopg2 import pool as pg_pool
 from psycopg2.extras import RealDictCursor
 import os
+import sys
+import threading
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from storage import PostgresRepository
 
 # Try DATABASE_PUBLIC_URL first (Railway public proxy), fall back to DATABASE_URL
 DATABASE_URL = os.getenv('DATABASE_PUBLIC_URL') or os.getenv('DATABASE_URL')
 
+# Pool sizing and recycling (all overridable from the environment)
+DB_POOL_MIN_SIZE = int(os.getenv('DB_POOL_MIN_SIZE', '1'))
+DB_POOL_MAX_SIZE = int(os.getenv('DB_POOL_MAX_SIZE', '10'))
+DB_POOL_MAX_IDLE_SECONDS = float(os.getenv('DB_POOL_MAX_IDLE_SECONDS', '300'))
+DB_POOL_HEALTH_CHECK_SECONDS = float(os.getenv('DB_POOL_HEALTH_CHECK_SECONDS', '30'))
+DB_POOL_TIMEOUT_SECONDS = float(os.getenv('DB_POOL_TIMEOUT_SECONDS', '30'))
+
+
+class DatabasePool:
+    """
+    Process-wide pool of PostgreSQL connections.
+
+    Wraps psycopg2's ThreadedConnectionPool so requests reuse open connections
+    instead of paying a new TCP/TLS/auth handshake each time. Connections that
+    sat idle too long are recycled, and connections idle for a little while
+    are pinged before being handed out. When every connection is checked out,
+    callers wait (up to timeout_seconds) instead of failing immediately.
+    """
+
+    def __init__(self, dsn, min_size=DB_POOL_MIN_SIZE, max_size=DB_POOL_MAX_SIZE,
+                 max_idle_seconds=DB_POOL_MAX_IDLE_SECONDS,
+                 health_check_seconds=DB_POOL_HEALTH_CHECK_SECONDS,
+                 timeout_seconds=DB_POOL_TIMEOUT_SECONDS):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.max_idle_seconds = max_idle_seconds
+        self.health_check_seconds = health_check_seconds
+        self.timeout_seconds = timeout_seconds
+        self._pool = pg_pool.ThreadedConnectionPool(
+            min_size, max_size, dsn, cursor_factory=RealDictCursor
+        )
+        self._lock = threading.Lock()
+        self._available = threading.BoundedSemaphore(max_size)
+        self._last_used = {}  # id(conn) -> time it was returned, for each idle connection
+        self._in_use = 0
+        self._checkouts = 0
+        self._recycled = 0
+        self._failed_checks = 0
+        # The pool opens min_size connections up front; start them off as idle
+        for conn in [self._pool.getconn() for _ in range(min_size)]:
+            self._release(conn)
+
+    def _release(self, conn):
+        """Hand a connection back to psycopg2's pool and note when it went idle"""
+        with self._lock:
+            # psycopg2 rolls back any transaction left open, and closes
+            # connections beyond min_size instead of keeping them
+            self._pool.putconn(conn)
+            if not conn.closed:
+                self._last_used[id(conn)] = time.monotonic()
+
+    def _discard(self, conn):
+        """Close a connection and drop it from the pool"""
+        with self._lock:
+            self._last_used.pop(id(conn), None)
+            self._pool.putconn(conn, close=True)
+
+    def _is_healthy(self, conn):
+        """Cheap liveness probe for a connection that has been idle a while"""
+        try:
+            c = conn.cursor()
+            c.execute("SELECT 1")
+            c.fetchone()
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def getconn(self):
+        """Check out a healthy connection from the pool, waiting if it is exhausted"""
+        if not self._available.acquire(timeout=self.timeout_seconds):
+            raise pg_pool.PoolError(
+                f"Timed out after {self.timeout_seconds}s waiting for a database connection"
+            )
+        try:
+            return self._checkout()
+        except Exception:
+            self._available.release()
+            raise
+
+    def _checkout(self):
+        """Take a connection from the pool, replacing dead or stale ones"""
+        # Bounded by max_size so a pool full of dead connections can't loop forever
+        for _ in range(self.max_size + 1):
+            with self._lock:
+                conn = self._pool.getconn()
+                last_used = self._last_used.pop(id(conn), None)
+            idle_for = time.monotonic() - last_used if last_used is not None else 0
+
+            if conn.closed:
+                self._discard(conn)
+                with self._lock:
+                    self._failed_checks += 1
+                continue
+
+            if idle_for > self.max_idle_seconds:
+                self._discard(conn)
+                with self._lock:
+                    self._recycled += 1
+                continue
+
+            if idle_for > self.health_check_seconds and not self._is_healthy(conn):
+                self._discard(conn)
+                with self._lock:
+                    self._failed_checks += 1
+                continue
+
+            with self._lock:
+                self._in_use += 1
+                self._checkouts += 1
+            return conn
+
+        raise pg_pool.PoolError("Unable to obtain a healthy database connection")
+
+    def putconn(self, conn):
+        """Return a connection to the pool"""
+        with self._lock:
+            self._in_use -= 1
+        try:
+            if conn.closed:
+                self._discard(conn)
+                return
+            self._release(conn)
+        finally:
+            self._available.release()
+
+    def stats(self):
+        """Snapshot of pool usage for monitoring"""
+        with self._lock:
+            return {
+                "min_size": self.min_size,
+                "max_size": self.max_size,
+                "in_use": self._in_use,
+                "idle": len(self._last_used),
+                "total_checkouts": self._checkouts,
+                "recycled": self._recycled,
+                "failed_health_checks": self._failed_checks,
+            }
+
+    def close(self):
+        """Close every connection in the pool"""
+        self._pool.closeall()
+
+
+_db_pool = None
+_db_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Return the shared connection pool, creating it on first use"""
+    global _db_pool
+    if _db_pool is None:
+        with _db_pool_lock:
+            if _db_pool is None:
+                _db_pool = DatabasePool(DATABASE_URL)
+    return _db_pool
+
+
+def get_pool_stats():
+    """Pool statistics, or None if the pool hasn't been created yet"""
+    return _db_pool.stats() if _db_pool is not None else None
+
+
+def close_pool():
+    """Close the shared pool (called on application shutdown)"""
+    global _db_pool
+    with _db_pool_lock:
+        if _db_pool is not None:
+            _db_pool.close()
+            _db_pool = None
+
+
 def get_db():
     """
     FastAPI dependency to get a database connection.
-    Yields a connection and ensures it's closed.
+    Yields a pooled connection and returns it to the pool afterwards.
     """
-    conn = psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor)
+    db_pool = get_pool()
+    conn = db_pool.getconn()
     try:
         yield conn
     finally:
-        conn.close()
+        db_pool.putconn(conn)
+
+
+def get_repository(db=Depends(get_db)):
+    """
+    FastAPI dependency for the shared data-access layer (see storage.py).
+    Wraps the request's pooled connection, so routes use the same queries as the CLI.
+    """
+    return PostgresRepository(db)
@@ -16,7 +16,12 @@ import os
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
 # Import route modules (we'll create these next)
-from api.routes import expenses, summary
+from api.routes import expenses, summary, sync
+from api.dependencies import close_pool, get_pool_stats
+from api.concurrency import configure_threadpool, shutdown_executors
+from api.utils.summary_cache import summary_cache
+from parse_expense import get_parse_tier_stats
+from llm_client import get_llm_client
 
 # Create the FastAPI application
 app = FastAPI(
@@ -34,9 +39,25 @@ app.add_middleware(
     allow_headers=["*"],  # Allow all headers
 )
 
+@app.on_event("startup")
+async def size_threadpool():
+    """
+    Size the worker threadpool used for blocking database calls
+    """
+    configure_threadpool()
+
+@app.on_event("shutdown")
+def shutdown_resources():
+    """
+    Close pooled database connections and worker threads when the server stops
+    """
+    close_pool()
+    shutdown_executors()
+
 # Include your API routers
 app.include_router(expenses.router, prefix="/api/v1", tags=["Expenses"])
 app.include_router(summary.router, prefix="/api/v1", tags=["Summary"])
+app.include_router(sync.router, prefix="/api/v1", tags=["Sync"])
 
 @app.get("/")
 async def root():
@@ -44,9 +65,10 @@ async def root():
 
 
 @app.get("/health")
-async def health_check():
+def health_check():
     """
     Detailed health check for monitoring
+    (plain def so the blocking database probe runs on the threadpool)
     """
     # Test database connection
     try:
@@ -73,11 +95,15 @@ async def health_check():
         "timestamp": datetime.now().isoformat(),
         "database": {
             "status": database_status,
-            "expense_count": expense_count
+            "expense_count": expense_count,
+            "pool": get_pool_stats()
         },
         "api": {
             "version": "1.0.0",
-            "features": ["expense_crud", "ai_parsing", "analytics"]
+            "features": ["expense_crud", "ai_parsing", "analytics"],
+            "summary_cache": summary_cache.stats(),
+            "parse_tiers": get_parse_tier_stats(),
+            "llm": get_llm_client().stats()
         }
     }
 
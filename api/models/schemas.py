@@ -7,7 +7,7 @@ Pydantic automatically validates the data and provides clear error messages.
 
 from pydantic import BaseModel, Field
 from datetime import datetime
-from typing import Optional, List
+from typing import Optional, List, Dict, Any
 from enum import Enum
 
 
@@ -66,8 +66,10 @@ class ExpenseResponse(BaseModel):
 class ExpenseListResponse(BaseModel):
     """Schema for listing multiple expenses"""
     expenses: List[ExpenseResponse]
-    total_amount: float = Field(..., description="Sum of all expense amounts")
+    total_amount: Optional[float] = Field(None, description="Sum of all matching expense amounts (null on cursor pages)")
     count: int = Field(..., description="Number of expenses")
+    total_count: Optional[int] = Field(None, description="Number of expenses matching the filters across all pages (null on cursor pages)")
+    next_cursor: Optional[str] = Field(None, description="Cursor for the next page (null on the last page)")
     
     class Config:
         schema_extra = {
@@ -82,7 +84,66 @@ class ExpenseListResponse(BaseModel):
                     }
                 ],
                 "total_amount": 12.50,
-                "count": 1
+                "count": 1,
+                "total_count": 1,
+                "next_cursor": None
+            }
+        }
+
+
+class ExpenseCreateResponse(ExpenseResponse):
+    """Schema for a newly created expense"""
+    possible_duplicates: List[ExpenseResponse] = Field(
+        default_factory=list,
+        description="Existing expenses with the same amount and a similar description from the surrounding days"
+    )
+
+
+class ExpenseSearchResult(ExpenseResponse):
+    """An expense matched by full-text search"""
+    rank: float = Field(..., description="Relevance score (higher is a better match)")
+
+
+class ExpenseSearchResponse(BaseModel):
+    """Schema for full-text search results, best match first"""
+    query: str = Field(..., description="The search query as given")
+    expenses: List[ExpenseSearchResult]
+    count: int = Field(..., description="Number of expenses returned")
+    total_amount: float = Field(..., description="Sum of the returned expense amounts")
+
+
+class SyncTableChanges(BaseModel):
+    """Changes to one table since the client's last sync"""
+    columns: List[str] = Field(..., description="Column names, in the order of each row's values")
+    rows: List[List[Any]] = Field(default_factory=list, description="Inserted or updated rows, oldest change first")
+    deleted: List[int] = Field(default_factory=list, description="IDs of deleted rows")
+
+
+class SyncResponse(BaseModel):
+    """One batch of changes for the mobile client's local database"""
+    token: str = Field(..., description="Pass as `since` on the next sync")
+    has_more: bool = Field(..., description="More changes are waiting; sync again right away")
+    changes: Dict[str, SyncTableChanges] = Field(..., description="Changes per table (expenses, pantry_items)")
+
+
+class BulkImportError(BaseModel):
+    """A row that was rejected during bulk import"""
+    row: int = Field(..., description="Row number in the uploaded file (1-based; CSV counts the header)")
+    error: str = Field(..., description="Why the row was rejected")
+
+
+class BulkImportResponse(BaseModel):
+    """Schema for bulk import results"""
+    inserted: int = Field(..., description="Number of expenses inserted")
+    failed: int = Field(..., description="Number of rows rejected")
+    errors: List[BulkImportError] = Field(default_factory=list, description="Per-row errors")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "inserted": 2,
+                "failed": 1,
+                "errors": [{"row": 3, "error": "amount: Input should be greater than 0"}]
             }
         }
 
@@ -99,6 +160,33 @@ class NaturalLanguageExpense(BaseModel):
         }
 
 
+class BatchNaturalLanguageExpense(BaseModel):
+    """Schema for parsing many natural language expenses at once"""
+    texts: List[str] = Field(..., min_length=1, max_length=500, description="One natural language expense per item")
+    
+    class Config:
+        schema_extra = {
+            "example": {
+                "texts": ["lunch at starbucks $12.50", "uber home $18", "$38 COS, T Shirt"]
+            }
+        }
+
+
+class BatchParseItem(BaseModel):
+    """Parse outcome for one input of a batch"""
+    index: int = Field(..., description="Position of the input in the request (0-based)")
+    text: str = Field(..., description="The original input")
+    expenses: List[ExpenseResponse] = Field(default_factory=list, description="Expenses created from this input")
+    error: Optional[str] = Field(None, description="Why the input couldn't be parsed")
+
+
+class BatchParseResponse(BaseModel):
+    """Schema for batch parse results"""
+    parsed: int = Field(..., description="Number of inputs parsed successfully")
+    failed: int = Field(..., description="Number of inputs that couldn't be parsed")
+    results: List[BatchParseItem]
+
+
 class SummaryRequest(BaseModel):
     """Schema for summary requests"""
     days: Optional[int] = Field(None, ge=1, description="Number of days to look back (default: all time)")
@@ -10,37 +10,43 @@ These endpoints handle all expense-related operations:
 All operations use your existing CLI functions and database.
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
 from typing import Optional, List
-import psycopg2
-from psycopg2.extras import RealDictCursor
-from datetime import datetime, timedelta
+from datetime import datetime
 import sys
 import os
 
 # Import your existing CLI functions
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from add_expense import add_expense
-from api.dependencies import get_db
-
-# Define get_expense_by_id locally to avoid circular import
-def get_expense_by_id(expense_id: int, db):
-    """Get expense details by ID"""
-    c = db.cursor()
-    c.execute("SELECT id, amount, category, description, timestamp FROM expenses WHERE id = %s", (expense_id,))
-    expense = c.fetchone()
-    return expense
+from parse_expense import parse_expense, parse_expenses_batch
+from expense_import import SUPPORTED_FORMATS, load_expenses, batched
+from api.dependencies import get_repository
+from api.concurrency import run_db, run_llm
+from llm_client import LLMBusyError
+from api.utils.pagination import decode_cursor, next_cursor_for, InvalidCursorError
+from api.utils.etag import make_etag, etag_matches, not_modified, set_etag_headers
 
 # Import our API schemas
 from api.models.schemas import (
-    ExpenseCreate, ExpenseUpdate, ExpenseResponse, ExpenseListResponse,
-    NaturalLanguageExpense, SuccessResponse, ErrorResponse
+    ExpenseCreate, ExpenseCreateResponse, ExpenseUpdate, ExpenseResponse, ExpenseListResponse,
+    ExpenseSearchResponse,
+    NaturalLanguageExpense, SuccessResponse, ErrorResponse, BulkImportResponse,
+    BatchNaturalLanguageExpense, BatchParseItem, BatchParseResponse
 )
 
 # Create the router
 router = APIRouter()
 
 
+def parse_timestamp(value):
+    """Timestamps come back as datetimes from TIMESTAMPTZ columns, or ISO strings from legacy TEXT ones"""
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(value)
+
+
 def expense_row_to_dict(row):
     """Convert database row to dictionary"""
     if not row:
@@ -52,7 +58,7 @@ def expense_row_to_dict(row):
             "amount": row["amount"],
             "category": row["category"],
             "description": row["description"],
-            "timestamp": datetime.fromisoformat(row["timestamp"]) if row["timestamp"] else None
+            "timestamp": parse_timestamp(row["timestamp"])
         }
     else:
         return {
@@ -60,12 +66,12 @@ def expense_row_to_dict(row):
             "amount": row[1],
             "category": row[2], 
             "description": row[3],
-            "timestamp": datetime.fromisoformat(row[4]) if row[4] else None
+            "timestamp": parse_timestamp(row[4])
         }
 
 
 @router.post("/expenses/parse", response_model=SuccessResponse)
-async def add_expense_natural_language(expense_input: NaturalLanguageExpense):
+async def add_expense_natural_language(expense_input: NaturalLanguageExpense, repo = Depends(get_repository)):
     """
     Add expense using natural language parsing (like your CLI)
     
@@ -73,160 +79,234 @@ async def add_expense_natural_language(expense_input: NaturalLanguageExpense):
     This uses your existing AI parsing logic!
     """
     try:
-        # Call your existing add_expense function!
-        # This handles all the AI parsing and database insertion
-        result = add_expense(expense_input.text)
-        
-        return SuccessResponse(
-            message="Expense parsed and added successfully!",
-            data={
-                "original_text": expense_input.text,
-                "parsed_result": str(result)
-            }
-        )
+        # Parsing waits on the LLM, so it runs off the event loop; the
+        # expenses go into the same database as every other route's
+        result = await run_llm(parse_expense, expense_input.text)
+        created = (await run_db(insert_parsed_expenses, repo, [result]))[0]
+    except LLMBusyError as e:
+        raise HTTPException(status_code=503, detail=str(e))
     except Exception as e:
+        repo.rollback()
         raise HTTPException(
             status_code=400,
             detail=f"Failed to parse expense: {str(e)}"
         )
+    
+    if not created:
+        raise HTTPException(status_code=400, detail="Could not parse an expense from this input")
+    
+    return SuccessResponse(
+        message="Expense parsed and added successfully!",
+        data={
+            "original_text": expense_input.text,
+            "parsed_result": str(result),
+            "expenses": [expense_row_to_dict(row) for row in created]
+        }
+    )
+
 
+def insert_parsed_expenses(repo, parsed_results):
+    """Insert batch-parse results in one transaction; returns created rows per input"""
+    now = datetime.now()
+    created = []
+    with repo.transaction():
+        for result in parsed_results:
+            entries = result if isinstance(result, list) else ([result] if result else [])
+            created.append([
+                repo.insert_expense_returning(
+                    entry["amount"], entry["category"], entry["description"],
+                    parse_timestamp(entry.get('parsed_date')) or now
+                )
+                for entry in entries
+            ])
+    return created
 
-@router.post("/expenses/", response_model=ExpenseResponse)
-async def create_expense_structured(request: dict, db = Depends(get_db)):
+
+@router.post("/expenses/parse/batch", response_model=BatchParseResponse)
+async def add_expenses_batch(batch_input: BatchNaturalLanguageExpense, repo = Depends(get_repository)):
+    """
+    Parse and add many natural language expenses at once
+    
+    Simple inputs are parsed by rules or the parse cache; the rest share a few
+    batched LLM calls instead of one call each. Inputs that still can't be
+    parsed are reported individually and don't block the others.
+    """
+    try:
+        parsed_results = await run_llm(parse_expenses_batch, batch_input.texts)
+        created = await run_db(insert_parsed_expenses, repo, parsed_results)
+    except Exception as e:
+        repo.rollback()
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to parse expenses: {str(e)}"
+        )
+    
+    results = []
+    for index, (text, rows) in enumerate(zip(batch_input.texts, created)):
+        results.append(BatchParseItem(
+            index=index,
+            text=text,
+            expenses=[ExpenseResponse(**expense_row_to_dict(row)) for row in rows],
+            error=None if rows else "Could not parse an expense from this input"
+        ))
+    parsed = sum(1 for item in results if item.expenses)
+    
+    return BatchParseResponse(parsed=parsed, failed=len(results) - parsed, results=results)
+
+
+@router.post("/expenses/", response_model=ExpenseCreateResponse)
+def create_expense_structured(request: dict, repo = Depends(get_repository)):
     """
     Add expense using structured data (form input)
     """
     try:
-        print(f"🔍 Raw request data: {request}")
-        
-        # Parse the request data manually to see what's being sent
+        # Validate manually so the error names the offending field
         try:
             expense = ExpenseCreate(**request)
         except Exception as validation_error:
-            print(f"❌ Validation error: {validation_error}")
             raise HTTPException(
                 status_code=422,
                 detail=f"Validation error: {str(validation_error)}"
             )
         
-        print(f"🔍 Received expense data: {expense}")
-        print(f"🔍 Amount: {expense.amount} (type: {type(expense.amount)})")
-        print(f"🔍 Category: {expense.category} (type: {type(expense.category)})")
-        print(f"🔍 Description: {expense.description} (type: {type(expense.description)})")
-        
-        c = db.cursor()
-        
         # Use current time if no timestamp provided
         timestamp = expense.timestamp or datetime.now()
         
-        # Insert the expense
-        c.execute('''
-            INSERT INTO expenses (amount, category, description, timestamp)
-            VALUES (%s, %s, %s, %s)
-            RETURNING id
-        ''', (expense.amount, expense.category.value, expense.description, timestamp.isoformat()))
+        # Look for likely duplicates first so the new expense isn't among them
+        possible_duplicates = repo.find_possible_duplicates(expense.amount, expense.description, timestamp)
         
-        result = c.fetchone()
-        expense_id = result['id'] if result else None
-        db.commit()
+        # Insert the expense
+        expense_id = repo.insert_expense(expense.amount, expense.category.value, expense.description, timestamp)
         
         # Return the created expense
         if expense_id is None:
             raise HTTPException(status_code=500, detail="Failed to create expense")
             
-        return ExpenseResponse(
+        return ExpenseCreateResponse(
             id=expense_id,
             amount=expense.amount,
             category=expense.category.value,
             description=expense.description,
-            timestamp=timestamp
+            timestamp=timestamp,
+            possible_duplicates=[
+                ExpenseResponse(**expense_row_to_dict(row)) for row, _ in possible_duplicates
+            ]
         )
     except Exception as e:
-        print(f"❌ Error creating expense: {e}")
         raise HTTPException(
             status_code=400,
             detail=f"Failed to create expense: {str(e)}"
         )
 
 
+# Content types accepted by the bulk endpoint when no ?format= is given
+BULK_CONTENT_TYPES = {
+    "text/csv": "csv",
+    "application/json": "json",
+    "application/x-ndjson": "jsonl",
+    "application/jsonl": "jsonl",
+    "application/x-jsonlines": "jsonl",
+}
+
+
+def insert_expenses_batched(repo, expenses):
+    """Insert validated expense tuples with one multi-row INSERT (and commit) per batch"""
+    inserted = 0
+    for batch in batched(expenses):
+        inserted += repo.insert_expenses(batch)
+    return inserted
+
+
+@router.post("/expenses/bulk", response_model=BulkImportResponse)
+async def bulk_import_expenses(
+    request: Request,
+    format: Optional[str] = Query(None, description="csv, json or jsonl (default: from Content-Type)"),
+    repo = Depends(get_repository)
+):
+    """
+    Import many expenses at once from a CSV, JSON or JSONL request body
+    
+    Each row is validated like POST /expenses/. Valid rows are inserted in
+    batches; invalid rows are skipped and reported with their row number.
+    """
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    fmt = (format or BULK_CONTENT_TYPES.get(content_type, "")).lower()
+    if fmt not in SUPPORTED_FORMATS:
+        raise HTTPException(
+            status_code=415,
+            detail="Unsupported import format. Send text/csv, application/json or application/x-ndjson, or pass ?format=csv|json|jsonl"
+        )
+    
+    try:
+        body = (await request.body()).decode("utf-8-sig")
+        expenses, errors = load_expenses(body, fmt)
+    except (UnicodeDecodeError, ValueError) as e:
+        raise HTTPException(status_code=400, detail=f"Could not read import: {str(e)}")
+    
+    try:
+        inserted = await run_db(insert_expenses_batched, repo, expenses)
+    except Exception as e:
+        repo.rollback()
+        raise HTTPException(status_code=500, detail=f"Failed to import expenses: {str(e)}")
+    
+    return BulkImportResponse(inserted=inserted, failed=len(errors), errors=errors)
+
+
 @router.get("/expenses/", response_model=ExpenseListResponse)
-async def list_expenses(
+def list_expenses(
+    request: Request,
+    response: Response,
     limit: int = Query(50, ge=1, le=1000, description="Number of expenses to return"),
-    offset: int = Query(0, ge=0, description="Number of expenses to skip"),
+    offset: int = Query(0, ge=0, description="Number of expenses to skip (ignored when cursor is set)"),
+    cursor: Optional[str] = Query(None, description="Opaque cursor from a previous response's next_cursor"),
     category: Optional[str] = Query(None, description="Filter by category"),
     days: Optional[int] = Query(None, ge=1, description="Filter by days back"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     List expenses with optional filtering
     Uses the same database queries as your CLI
+    
+    Supports two pagination modes:
+    - offset: pass limit/offset as before
+    - cursor: pass the next_cursor from the previous page; every page costs
+      the same no matter how deep the client has scrolled. Totals come with
+      the first page only (they're null on cursor pages)
+
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    instead of the list when no expense has changed.
     """
     try:
-        c = db.cursor()
-        
-        # Build query with filters
-        query = "SELECT id, amount, category, description, timestamp FROM expenses WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        query += " ORDER BY timestamp DESC LIMIT %s OFFSET %s"
-        params.extend([limit, offset])
-        
-        c.execute(query, params)
-        expense_rows = c.fetchall()
-        
-        # Get total count for pagination
-        count_query = "SELECT COUNT(*) FROM expenses WHERE 1=1"
-        count_params = []
-        if category:
-            count_query += " AND category = %s"
-            count_params.append(category)
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            count_query += " AND timestamp >= %s"
-            count_params.append(cutoff_date)
-        
-        c.execute(count_query, count_params)
-        count_result = c.fetchone()
-        total_count = count_result['count'] if isinstance(count_result, dict) else count_result[0]
-        
-        # Calculate total amount
-        amount_query = "SELECT COALESCE(SUM(amount), 0) as total FROM expenses WHERE 1=1"
-        amount_params = []
-        
-        if category:
-            amount_query += " AND category = %s"
-            amount_params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            amount_query += " AND timestamp >= %s"
-            amount_params.append(cutoff_date)
-        
-        c.execute(amount_query, amount_params)
-        amount_result = c.fetchone()
-        total_amount = (amount_result['total'] if isinstance(amount_result, dict) else amount_result[0]) or 0
+        etag = make_etag(request, repo.expenses_version(), relative_to_now=days is not None)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # One round trip: the requested page (plus totals over the filtered set
+        # unless paging by cursor), which holds one extra row to tell whether
+        # there is a next page
+        before = decode_cursor(cursor) if cursor else None
+        expense_rows, total_count, total_amount = repo.list_expenses_page(
+            category=category, days=days, limit=limit, offset=offset, before=before
+        )
+        next_cursor = next_cursor_for(expense_rows, limit)
         
         # Convert rows to response format
         expenses = []
-        for row in expense_rows:
+        for row in expense_rows[:limit]:
             expense_dict = expense_row_to_dict(row)
             if expense_dict:
                 expenses.append(ExpenseResponse(**expense_dict))
         
+        set_etag_headers(response, etag)
         return ExpenseListResponse(
             expenses=expenses,
             total_amount=total_amount,
-            count=len(expenses)
+            count=len(expenses),
+            total_count=total_count,
+            next_cursor=next_cursor
         )
+    except InvalidCursorError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -234,14 +314,53 @@ async def list_expenses(
         )
 
 
+@router.get("/expenses/search", response_model=ExpenseSearchResponse)
+def search_expenses(
+    q: str = Query(..., min_length=1, max_length=200, description='Words, prefix* terms and "quoted phrases"'),
+    fuzzy: bool = Query(False, description="Match descriptions similar to q (typos, spelling variants) instead of exact words"),
+    limit: int = Query(50, ge=1, le=1000, description="Number of results to return"),
+    category: Optional[str] = Query(None, description="Filter by category"),
+    days: Optional[int] = Query(None, ge=1, description="Filter by days back"),
+    repo = Depends(get_repository)
+):
+    """
+    Full-text search over expense descriptions and categories
+
+    All words must match, `star*` matches words starting with "star" and
+    `"oat milk"` matches the exact phrase. Results come from a search index,
+    ranked by relevance with description matches first.
+
+    With fuzzy=true, descriptions are ranked by trigram similarity to q
+    instead, so "trader joes" also finds "Trader Joe's groceries".
+    """
+    try:
+        if fuzzy:
+            rows = repo.fuzzy_search(q, category=category, days=days, limit=limit)
+        else:
+            rows = repo.search_expenses(q, category=category, days=days, limit=limit)
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to search expenses: {str(e)}"
+        )
+
+    expenses = [dict(expense_row_to_dict(row), rank=row["rank"]) for row in rows]
+    return ExpenseSearchResponse(
+        query=q,
+        expenses=expenses,
+        count=len(expenses),
+        total_amount=sum(expense["amount"] or 0 for expense in expenses)
+    )
+
+
 @router.get("/expenses/{expense_id}", response_model=ExpenseResponse)
-async def get_expense(expense_id: int, db = Depends(get_db)):
+def get_expense(expense_id: int, repo = Depends(get_repository)):
     """
     Get a specific expense by ID
     Uses your existing get_expense_by_id function
     """
     try:
-        expense = get_expense_by_id(expense_id, db)
+        expense = repo.get_expense(expense_id)
         if not expense:
             raise HTTPException(
                 status_code=404,
@@ -262,57 +381,41 @@ async def get_expense(expense_id: int, db = Depends(get_db)):
 
 
 @router.put("/expenses/{expense_id}", response_model=ExpenseResponse)
-async def update_expense(expense_id: int, expense_update: ExpenseUpdate, db = Depends(get_db)):
+def update_expense(expense_id: int, expense_update: ExpenseUpdate, repo = Depends(get_repository)):
     """
     Update an existing expense
     """
     try:
         # Check if expense exists
-        existing_expense = get_expense_by_id(expense_id, db)
+        existing_expense = repo.get_expense(expense_id)
         if not existing_expense:
             raise HTTPException(
                 status_code=404,
                 detail=f"Expense with ID {expense_id} not found"
             )
         
-        c = db.cursor()
-        
-        # Build update query with only provided fields
-        update_fields = []
-        params = []
-        
+        # Only the provided fields change
+        fields = {}
         if expense_update.amount is not None:
-            update_fields.append("amount = %s")
-            params.append(expense_update.amount)
-        
+            fields["amount"] = expense_update.amount
         if expense_update.category is not None:
-            update_fields.append("category = %s")
-            params.append(expense_update.category.value)
-        
+            fields["category"] = expense_update.category.value
         if expense_update.description is not None:
-            update_fields.append("description = %s")
-            params.append(expense_update.description)
-        
+            fields["description"] = expense_update.description
         if expense_update.timestamp is not None:
-            update_fields.append("timestamp = %s")
-            params.append(expense_update.timestamp.isoformat())
+            fields["timestamp"] = expense_update.timestamp
         
-        if not update_fields:
+        if not fields:
             # No fields to update
             expense_dict = expense_row_to_dict(existing_expense)
             if not expense_dict:
                 raise HTTPException(status_code=500, detail="Failed to retrieve expense data")
             return ExpenseResponse(**expense_dict)
         
-        # Execute update
-        query = f"UPDATE expenses SET {', '.join(update_fields)} WHERE id = %s"
-        params.append(expense_id)
-        
-        c.execute(query, params)
-        db.commit()
+        repo.update_expense(expense_id, **fields)
         
         # Return updated expense
-        updated_expense = get_expense_by_id(expense_id, db)
+        updated_expense = repo.get_expense(expense_id)
         expense_dict = expense_row_to_dict(updated_expense)
         if not expense_dict:
             raise HTTPException(status_code=500, detail="Failed to retrieve updated expense")
@@ -328,33 +431,27 @@ async def update_expense(expense_id: int, expense_update: ExpenseUpdate, db = De
 
 
 @router.delete("/expenses/{expense_id}", response_model=SuccessResponse)
-async def delete_expense(expense_id: int, db = Depends(get_db)):
+def delete_expense(expense_id: int, repo = Depends(get_repository)):
     """
     Delete an expense by ID
     Uses similar logic to your CLI delete function
     """
     try:
         # Check if expense exists
-        expense = get_expense_by_id(expense_id, db)
+        expense = repo.get_expense(expense_id)
         if not expense:
             raise HTTPException(
                 status_code=404,
                 detail=f"Expense with ID {expense_id} not found"
             )
         
-        c = db.cursor()
-        
         # Delete the expense
-        c.execute("DELETE FROM expenses WHERE id = %s", (expense_id,))
-        
-        if c.rowcount == 0:
+        if repo.delete_expense(expense_id) == 0:
             raise HTTPException(
                 status_code=404,
                 detail=f"Expense with ID {expense_id} not found"
             )
         
-        db.commit()
-        
         return SuccessResponse(
             message=f"Expense {expense_id} deleted successfully",
             data={"deleted_expense_id": expense_id}
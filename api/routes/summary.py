@@ -7,64 +7,86 @@ These endpoints provide AI-powered insights and analytics:
 - Budget analysis
 - Custom prompts
 
-All operations use your existing summarize() function and AI logic.
+Each report reads the request's database once, with every filter applied;
+the same rows feed both the response statistics and the LLM prompt.
 """
 
-from fastapi import APIRouter, HTTPException, Query, Depends
+from fastapi import APIRouter, HTTPException, Query, Depends, Request, Response
+from fastapi.responses import StreamingResponse
 from typing import Optional
+import json
 import sys
 import os
-from datetime import datetime, timedelta
+from datetime import datetime
 
 # Import your existing CLI functions
 sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
-from summarize import summarize
+from summarize import summarize, summarize_stream
+from expense_analytics import ExpenseColumns, compute_stats
+from storage import SUMMARY_COLUMNS
+from llm_client import LLMError, LLMBusyError
 
 # Import our API schemas
 from api.models.schemas import SummaryRequest, SummaryResponse, SuccessResponse
 
 # Import dependencies
-from api.dependencies import get_db
+from api.dependencies import get_repository
+from api.concurrency import run_db, run_llm
+from api.utils.summary_cache import summary_cache
+from api.utils.etag import make_etag, etag_matches, not_modified, set_etag_headers
 
 # Create the router
 router = APIRouter()
 
 
+def load_expense_columns(repo, category: Optional[str] = None, days: Optional[int] = None):
+    """Read the filtered expenses once into analytics columns (blocking; run via run_db)"""
+    return ExpenseColumns.from_rows(repo.list_expenses(category=category, days=days, columns=SUMMARY_COLUMNS))
+
+
+async def generate_summary(repo, report_type: str = "comprehensive", prompt: Optional[str] = None,
+                           days: Optional[int] = None, category: Optional[str] = None):
+    """
+    Summarize the filtered expenses, reusing a cached report when the data hasn't changed
+
+    Returns:
+        (summary_text, stats) - summary_text is None if the LLM failed, and
+        both are None if no expenses match the filters
+    """
+    data_version = await run_db(repo.expenses_version)
+    columns = await run_db(load_expense_columns, repo, category, days)
+    stats = compute_stats(columns)
+    if stats is None:
+        return None, None
+
+    cache_key = summary_cache.make_key(data_version, report_type, prompt, days, category)
+    summary_result = summary_cache.get(cache_key)
+    if summary_result is None:
+        try:
+            summary_result = await run_llm(summarize, columns, stats, prompt, report_type)
+        except LLMBusyError as e:
+            raise HTTPException(status_code=503, detail=str(e))
+        except LLMError as e:
+            print(f"Error generating summary: {e}")
+            return None, stats
+        summary_cache.set(cache_key, summary_result)
+    return summary_result, stats
+
+
 @router.get("/summary/quick", response_model=SummaryResponse)
 async def get_quick_summary(
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
     category: Optional[str] = Query(None, description="Filter by specific category"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     Get a quick 3-4 sentence summary of expenses
-    Uses your existing summarize() function with report_type='quick'
     """
     try:
-        # Call your existing summarize function
-        summary_result = summarize(report_type='quick', timeframe_days=days)
+        # One filtered read feeds the stats and the prompt; the report is cached
+        summary_result, stats = await generate_summary(repo, report_type='quick', days=days, category=category)
         summary_text = summary_result if summary_result is not None else "Unable to generate summary"
-        
-        # Get basic statistics for the response
-        c = db.cursor()
-        
-        # Build query with filters
-        query = "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM expenses WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        c.execute(query, params)
-        result = c.fetchone()
-        count = result[0] if result else 0
-        total_amount = result[1] if result else 0
+        count, total_amount = (stats["count"], stats["total"]) if stats else (0, 0)
         
         # Determine time period description
         if days:
@@ -80,6 +102,8 @@ async def get_quick_summary(
             generated_at=datetime.now()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -91,37 +115,16 @@ async def get_quick_summary(
 async def get_insights_summary(
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
     category: Optional[str] = Query(None, description="Filter by specific category"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     Get detailed spending insights and patterns
-    Uses your existing summarize() function with report_type='insights'
     """
     try:
-        # Call your existing summarize function
-        summary_result = summarize(report_type='insights', timeframe_days=days)
+        # One filtered read feeds the stats and the prompt; the report is cached
+        summary_result, stats = await generate_summary(repo, report_type='insights', days=days, category=category)
         summary_text = summary_result if summary_result is not None else "Unable to generate insights"
-        
-        # Get basic statistics for the response
-        c = db.cursor()
-        
-        # Build query with filters
-        query = "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM expenses WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        c.execute(query, params)
-        result = c.fetchone()
-        count = result[0] if result else 0
-        total_amount = result[1] if result else 0
+        count, total_amount = (stats["count"], stats["total"]) if stats else (0, 0)
         
         # Determine time period description
         if days:
@@ -137,6 +140,8 @@ async def get_insights_summary(
             generated_at=datetime.now()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -148,37 +153,16 @@ async def get_insights_summary(
 async def get_budget_analysis(
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
     category: Optional[str] = Query(None, description="Filter by specific category"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     Get budget analysis and recommendations
-    Uses your existing summarize() function with report_type='budget_analysis'
     """
     try:
-        # Call your existing summarize function
-        summary_result = summarize(report_type='budget_analysis', timeframe_days=days)
+        # One filtered read feeds the stats and the prompt; the report is cached
+        summary_result, stats = await generate_summary(repo, report_type='budget_analysis', days=days, category=category)
         summary_text = summary_result if summary_result is not None else "Unable to generate budget analysis"
-        
-        # Get basic statistics for the response
-        c = db.cursor()
-        
-        # Build query with filters
-        query = "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM expenses WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        c.execute(query, params)
-        result = c.fetchone()
-        count = result[0] if result else 0
-        total_amount = result[1] if result else 0
+        count, total_amount = (stats["count"], stats["total"]) if stats else (0, 0)
         
         # Determine time period description
         if days:
@@ -194,6 +178,8 @@ async def get_budget_analysis(
             generated_at=datetime.now()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -206,37 +192,16 @@ async def get_custom_summary(
     prompt: str = Query(..., description="Custom analysis prompt"),
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
     category: Optional[str] = Query(None, description="Filter by specific category"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     Get custom AI analysis with your own prompt
-    Uses your existing summarize() function with custom prompt
     """
     try:
-        # Call your existing summarize function with custom prompt
-        summary_result = summarize(prompt=prompt, timeframe_days=days)
+        # One filtered read feeds the stats and the prompt; the report is cached
+        summary_result, stats = await generate_summary(repo, prompt=prompt, days=days, category=category)
         summary_text = summary_result if summary_result is not None else "Unable to generate custom summary"
-        
-        # Get basic statistics for the response
-        c = db.cursor()
-        
-        # Build query with filters
-        query = "SELECT COUNT(*), COALESCE(SUM(amount), 0) FROM expenses WHERE 1=1"
-        params = []
-        
-        if category:
-            query += " AND category = %s"
-            params.append(category)
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        c.execute(query, params)
-        result = c.fetchone()
-        count = result[0] if result else 0
-        total_amount = result[1] if result else 0
+        count, total_amount = (stats["count"], stats["total"]) if stats else (0, 0)
         
         # Determine time period description
         if days:
@@ -252,6 +217,8 @@ async def get_custom_summary(
             generated_at=datetime.now()
         )
         
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(
             status_code=500,
@@ -259,34 +226,126 @@ async def get_custom_summary(
         )
 
 
+def sse_event(data, event: Optional[str] = None):
+    """Format one Server-Sent Events message (data is JSON-encoded so newlines survive)"""
+    message = f"event: {event}\n" if event else ""
+    return message + f"data: {json.dumps(data)}\n\n"
+
+
+def stream_summary_events(cache_key, cached: Optional[str], columns, stats, prompt: Optional[str],
+                          report_type: str):
+    """
+    Yield SSE messages for a summary as the LLM generates it
+
+    A cached report is sent as a single chunk; a freshly streamed one is cached
+    once it completes. This is a plain generator, so Starlette iterates it on
+    the threadpool and the blocking LLM stream never touches the event loop.
+    """
+    if cached is not None:
+        yield sse_event(cached)
+        yield sse_event({"cached": True}, event="done")
+        return
+
+    chunks = []
+    if stats is not None:
+        try:
+            for token in summarize_stream(columns, stats, prompt, report_type):
+                chunks.append(token)
+                yield sse_event(token)
+        except Exception as e:
+            yield sse_event(f"Failed to generate summary: {str(e)}", event="error")
+            return
+
+    if chunks:
+        summary_cache.set(cache_key, "".join(chunks))
+    yield sse_event({"cached": False}, event="done")
+
+
+@router.get("/summary/stream")
+def stream_summary(
+    report_type: str = Query("quick", pattern="^(quick|comprehensive|insights|budget_analysis)$",
+                             description="Report type (ignored when prompt is set)"),
+    prompt: Optional[str] = Query(None, description="Custom analysis prompt"),
+    days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
+    category: Optional[str] = Query(None, description="Filter by specific category"),
+    repo = Depends(get_repository)
+):
+    """
+    Stream a summary as Server-Sent Events while the LLM generates it
+
+    Each `data:` message carries a JSON-encoded text chunk. The stream ends
+    with an `event: done` message (or `event: error` if generation failed),
+    so clients can render the first tokens instead of waiting for the whole
+    report.
+    """
+    try:
+        cache_key = summary_cache.make_key(repo.expenses_version(), report_type, prompt, days, category)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to load expenses: {str(e)}")
+    cached = summary_cache.get(cache_key)
+
+    # The expenses are read before streaming starts, so the generator never needs the connection
+    columns = stats = None
+    if cached is None:
+        try:
+            columns = load_expense_columns(repo, category, days)
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=f"Failed to load expenses: {str(e)}")
+        stats = compute_stats(columns)
+
+    return StreamingResponse(
+        stream_summary_events(cache_key, cached, columns, stats, prompt, report_type),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+
+@router.get("/summary/stats", response_model=dict)
+def get_summary_stats(
+    days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
+    category: Optional[str] = Query(None, description="Filter by specific category"),
+    repo = Depends(get_repository)
+):
+    """
+    Get spending statistics without an AI report
+    
+    Totals, per-category and per-weekday breakdowns, daily totals, a rolling
+    daily average, amount percentiles and unusually large expenses.
+    """
+    try:
+        stats = compute_stats(load_expense_columns(repo, category, days))
+        return {
+            "statistics": stats,
+            "time_period": f"Last {days} days" if days else "All time",
+            "generated_at": datetime.now().isoformat()
+        }
+    except Exception as e:
+        raise HTTPException(
+            status_code=500,
+            detail=f"Failed to compute statistics: {str(e)}"
+        )
+
+
 @router.get("/summary/categories", response_model=dict)
-async def get_category_breakdown(
+def get_category_breakdown(
+    request: Request,
+    response: Response,
     days: Optional[int] = Query(None, ge=1, description="Number of days to look back (default: all time)"),
-    db = Depends(get_db)
+    repo = Depends(get_repository)
 ):
     """
     Get spending breakdown by category
+
+    Responses carry an ETag; send it back in If-None-Match to get a 304
+    when no expense has changed.
     """
     try:
-        c = db.cursor()
-        
-        # Build query with optional time filter
-        query = """
-            SELECT category, COUNT(*) as count, COALESCE(SUM(amount), 0) as total, COALESCE(AVG(amount), 0) as average
-            FROM expenses 
-            WHERE 1=1
-        """
-        params = []
-        
-        if days:
-            cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-            query += " AND timestamp >= %s"
-            params.append(cutoff_date)
-        
-        query += " GROUP BY category ORDER BY total DESC"
-        
-        c.execute(query, params)
-        results = c.fetchall()
+        etag = make_etag(request, repo.expenses_version(), relative_to_now=days is not None)
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+        # Reads at most one rollup row per day and category instead of every expense
+        results = repo.category_rollup(days=days)
         
         # Format results
         categories = []
@@ -294,13 +353,15 @@ async def get_category_breakdown(
         
         for row in results:
             category_data = {
-                "category": row[0],
-                "count": row[1],
-                "total": row[2],
-                "average": row[3]
+                "category": row["category"],
+                "count": row["count"],
+                "total": row["total"],
+                "average": row["total"] / row["count"] if row["count"] else 0,
+                "min": row["min_amount"],
+                "max": row["max_amount"]
             }
             categories.append(category_data)
-            total_spent += row[2]
+            total_spent += row["total"]
         
         # Add percentages
         for category in categories:
@@ -315,6 +376,7 @@ async def get_category_breakdown(
         else:
             time_period = "All time"
         
+        set_etag_headers(response, etag)
         return {
             "categories": categories,
             "total_spent": total_spent,
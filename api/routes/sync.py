@@ -0,0 +1,131 @@
+"""
+Sync and Data Export API Routes
+
+- /sync hands the mobile app batches of the inserts, updates and deletes
+  since its last sync token, so catching up after a day offline transfers
+  only what changed
+- /export streams the whole database (or the rows changed since a
+  watermark) for a first download
+"""
+
+from fastapi import APIRouter, HTTPException, Query, Request, Depends
+from fastapi.responses import StreamingResponse
+from typing import Optional
+from decimal import Decimal
+import sys
+import os
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+from expense_export import export_header, json_chunks, ndjson_chunks, buffered, gzip_chunks, parse_watermark
+from expense_sync import InvalidSyncTokenError, decode_sync_token, encode_sync_token
+from storage import PostgresRepository, EXPORT_COLUMNS, SYNC_BATCH_SIZE
+
+from api.dependencies import get_pool, get_repository
+from api.models.schemas import SyncResponse, SyncTableChanges
+
+# Create the router
+router = APIRouter()
+
+# Columns sent for each table's rows, in order
+SYNC_COLUMNS = {
+    table: [column.strip() for column in columns.split(",")] + ["updated_at"]
+    for table, columns in EXPORT_COLUMNS.items()
+}
+
+
+def sync_value(value):
+    """NUMERIC amounts come back as Decimal, which would be sent as strings"""
+    return float(value) if isinstance(value, Decimal) else value
+
+
+@router.get("/sync", response_model=SyncResponse)
+def sync_changes(
+    since: Optional[str] = Query(None, description="Token from the previous sync (omit to start from scratch)"),
+    limit: int = Query(SYNC_BATCH_SIZE, ge=1, le=5000, description="Maximum number of changes in this batch"),
+    repo = Depends(get_repository)
+):
+    """
+    Changes to expenses and pantry items since the last sync
+
+    Rows are sent as value lists in the order of `columns` to keep batches
+    small. Apply `rows` as upserts by id and `deleted` as deletes, store the
+    returned token, and repeat while `has_more` is true. A 410 means the
+    token no longer fits the server's data; sync again without one.
+    """
+    try:
+        since_seq = decode_sync_token(since)
+    except InvalidSyncTokenError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        changes, next_seq, has_more = repo.changes_since(since_seq, limit)
+    except InvalidSyncTokenError as e:
+        raise HTTPException(status_code=410, detail=f"{e}; sync again without a token")
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Failed to read changes: {str(e)}")
+
+    return SyncResponse(
+        token=encode_sync_token(next_seq),
+        has_more=has_more,
+        changes={
+            table: SyncTableChanges(
+                columns=SYNC_COLUMNS[table],
+                rows=[[sync_value(row[column]) for column in SYNC_COLUMNS[table]] for row in table_changes["rows"]],
+                deleted=table_changes["deleted"]
+            )
+            for table, table_changes in changes.items()
+        }
+    )
+
+
+def stream_export(fmt: str, since, compress: bool):
+    """
+    Yield the export as it's read from the database
+
+    The generator checks out its own pooled connection: a request's
+    dependencies are cleaned up before a streaming body is sent, so the
+    request's connection would already be back in the pool.
+    """
+    db_pool = get_pool()
+    conn = db_pool.getconn()
+    try:
+        repo = PostgresRepository(conn)
+        header = export_header(repo, since)
+        chunks = buffered((ndjson_chunks if fmt == "ndjson" else json_chunks)(repo, header, since))
+        if compress:
+            yield from gzip_chunks(chunks)
+        else:
+            for chunk in chunks:
+                yield chunk.encode()
+    finally:
+        db_pool.putconn(conn)
+
+
+@router.get("/export")
+def export_data(
+    request: Request,
+    since: Optional[str] = Query(None, description="Only rows changed since this watermark from an earlier export (or ISO-8601 time)"),
+    format: str = Query("ndjson", pattern="^(json|ndjson)$", description="json or ndjson (one row per line)")
+):
+    """
+    Stream every expense and pantry item, or only those changed since a watermark
+
+    The response starts with metadata including a `watermark`; pass it as
+    `since` next time to download only what changed (rows changed while an
+    export runs may come again; apply rows as upserts by id). Deleted rows
+    aren't included. Responses are gzipped when the client accepts it.
+    """
+    try:
+        since_value = parse_watermark(since)
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"Invalid since watermark: {since}")
+
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {"Cache-Control": "no-store"}
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    return StreamingResponse(
+        stream_export(format, since_value, compress),
+        media_type="application/x-ndjson" if format == "ndjson" else "application/json",
+        headers=headers
+    )
@@ -0,0 +1,58 @@
+"""
+Conditional GET support (ETag / If-None-Match)
+
+The app re-fetches its lists every time it regains focus, and most of the
+time nothing has changed. A response's ETag is derived from the request
+(path and query) plus the expenses data version - the highest change
+sequence number in the database, read from an index in two lookups - so a
+client that already holds the current version gets a bodiless 304 without
+any expense rows being read or serialized.
+
+Filters relative to now (`days`) also age: an expense drops out of "the
+last 7 days" without any write. Those ETags include a time window of
+ETAG_WINDOW_SECONDS, so such a response is at most that much out of date.
+"""
+
+from typing import Optional
+import hashlib
+import os
+import time
+
+from fastapi import Request, Response
+
+# Clients may keep responses but must revalidate before every reuse
+ETAG_CACHE_CONTROL = os.getenv('ETAG_CACHE_CONTROL', 'private, no-cache')
+ETAG_WINDOW_SECONDS = int(os.getenv('ETAG_WINDOW_SECONDS', '60'))
+
+# Bump when a response format changes, so clients can't reuse old bodies
+ETAG_FORMAT_VERSION = 1
+
+
+def make_etag(request: Request, data_version, relative_to_now: bool = False) -> str:
+    """Strong ETag for this request at the given data version"""
+    query = "&".join(f"{key}={value}" for key, value in sorted(request.query_params.multi_items()))
+    window = int(time.time() // ETAG_WINDOW_SECONDS) if relative_to_now else ""
+    key = f"{ETAG_FORMAT_VERSION}|{request.url.path}|{query}|{data_version}|{window}"
+    return '"' + hashlib.sha256(key.encode()).hexdigest()[:32] + '"'
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Whether If-None-Match names this ETag (weak comparison, as RFC 9110 specifies for it)"""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    for candidate in header.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def not_modified(etag: str) -> Response:
+    """Bodiless 304 telling the client its copy is current"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+def set_etag_headers(response: Response, etag: str):
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = ETAG_CACHE_CONTROL
@@ -0,0 +1,303 @@
+"""
+Grocery type categorization for pantry items
+
+Every keyword of every category is compiled once, at import, into a single
+regular expression, so an item name is scanned in one pass however many
+keywords there are. Names are lowercased and punctuation is collapsed to
+spaces before matching, and keywords only match whole words ("ham" doesn't
+match "shampoo").
+
+Categorization order:
+  1. Special cases: known item names, looked up exactly
+  2. Overrides: "frozen", ice cream, "canned" and the like win over anything else
+  3. Keywords: when several match, the last one wins, since it's usually the
+     noun the rest describe ("chicken broth" is broth, "honey yogurt" is
+     yogurt). Multi-word keywords beat the single words inside them
+     ("peanut butter" is a condiment, not dairy).
+  4. Fallback: "other"
+
+categorize_grocery_item() can hand names the rules don't recognize to the LLM.
+"""
+
+from functools import lru_cache
+import json
+import re
+
+GROCERY_CATEGORIES = [
+    'produce', 'meat', 'dairy', 'bread', 'staples', 'pantry',
+    'frozen', 'beverages', 'snacks', 'condiments', 'other',
+]
+
+CATEGORY_KEYWORDS = {
+    'produce': [
+        # Fruit
+        'apple', 'banana', 'orange', 'lemon', 'lime', 'grape', 'strawberry', 'blueberry',
+        'raspberry', 'blackberry', 'cranberry', 'cherry', 'peach', 'pear', 'plum', 'apricot',
+        'mango', 'pineapple', 'papaya', 'kiwi', 'watermelon', 'melon', 'cantaloupe',
+        'honeydew', 'avocado', 'grapefruit', 'clementine', 'mandarin', 'tangerine',
+        'pomegranate', 'fig', 'date', 'coconut', 'lychee', 'longan', 'durian', 'rambutan',
+        'dragon fruit', 'passion fruit', 'persimmon', 'nectarine', 'berry', 'fruit',
+        # Vegetables
+        'onion', 'garlic', 'shallot', 'scallion', 'spring onion', 'leek', 'tomato',
+        'carrot', 'celery', 'cucumber', 'zucchini', 'eggplant', 'aubergine', 'pepper',
+        'bell pepper', 'capsicum', 'jalapeno', 'chili pepper', 'broccoli', 'cauliflower',
+        'cabbage', 'bok choy', 'pak choy', 'choy sum', 'kang kong', 'kangkong',
+        'spinach', 'kale', 'lettuce', 'arugula', 'rocket', 'salad', 'greens', 'asparagus',
+        'green bean', 'snap pea', 'snow pea', 'edamame', 'corn', 'mushroom', 'enoki',
+        'shiitake', 'radish', 'daikon', 'beet', 'beetroot', 'turnip', 'parsnip', 'squash',
+        'pumpkin', 'okra', 'artichoke', 'brussels sprout', 'bean sprout', 'sprout',
+        'ginger', 'taro', 'yam', 'lotus root', 'vegetable', 'veggie',
+        # Fresh herbs
+        'basil', 'cilantro', 'coriander leaves', 'parsley', 'mint', 'dill', 'rosemary',
+        'thyme', 'chives', 'lemongrass', 'herb',
+    ],
+    'meat': [
+        'chicken', 'beef', 'pork', 'lamb', 'mutton', 'veal', 'turkey', 'duck', 'goat',
+        'steak', 'ground beef', 'minced beef', 'mince', 'brisket', 'ribs', 'rib',
+        'tenderloin', 'sirloin', 'ribeye', 'chop', 'thigh', 'breast', 'drumstick', 'wing',
+        'bacon', 'ham', 'sausage', 'salami', 'pepperoni', 'prosciutto', 'chorizo',
+        'hot dog', 'smart dog', 'meatball', 'burger', 'patty', 'nugget', 'jerky',
+        'fish', 'salmon', 'tuna', 'cod', 'tilapia', 'mackerel', 'sardine', 'anchovy',
+        'trout', 'halibut', 'sea bass', 'snapper', 'shrimp', 'prawn', 'crab', 'lobster',
+        'scallop', 'clam', 'mussel', 'oyster', 'squid', 'calamari', 'octopus', 'seafood',
+        'fish ball', 'fishcake', 'fish cake',
+        'egg', 'tofu', 'tempeh', 'seitan', 'meatless', 'bulgogi', 'bulgolgi', 'meat',
+    ],
+    'dairy': [
+        'milk', 'cheese', 'cheddar', 'mozzarella', 'parmesan', 'parmigiano', 'reggiano',
+        'brie', 'camembert', 'gouda', 'feta', 'ricotta', 'mascarpone', 'halloumi',
+        'paneer', 'gruyere', 'emmental', 'swiss cheese', 'blue cheese', 'cream cheese',
+        'cottage cheese', 'burrata', 'yogurt', 'yoghurt', 'kefir', 'butter', 'ghee',
+        'cream', 'sour cream', 'heavy cream', 'whipping cream', 'half and half', 'creamer',
+    ],
+    'bread': [
+        'bread', 'loaf', 'baguette', 'sourdough', 'brioche', 'ciabatta', 'focaccia',
+        'bagel', 'bun', 'roll', 'croissant', 'english muffin', 'pita', 'naan', 'roti',
+        'chapati', 'paratha', 'tortilla', 'wrap', 'flatbread', 'toast', 'rye', 'challah',
+        'crumpet', 'pastry',
+    ],
+    'staples': [
+        'rice', 'white rice', 'brown rice', 'basmati', 'jasmine rice', 'arborio',
+        'pasta', 'spaghetti', 'penne', 'linguine', 'fettuccine', 'fusilli', 'fusili',
+        'macaroni', 'lasagna', 'lasagne', 'ravioli', 'tortellini', 'gnocchi', 'orzo',
+        'rigatoni', 'farfalle', 'noodle', 'ramen', 'udon', 'soba', 'vermicelli',
+        'rice noodle', 'bee hoon', 'kway teow', 'quinoa', 'couscous', 'bulgur', 'barley',
+        'oat', 'oatmeal', 'porridge', 'grain', 'polenta', 'lentil', 'chickpea', 'bean',
+        'black bean', 'kidney bean', 'dal', 'dhal', 'potato', 'sweet potato',
+        'radish cake', 'rice cake',
+    ],
+    'pantry': [
+        'flour', 'sugar', 'brown sugar', 'salt', 'sea salt', 'msg', 'ajinomoto',
+        'baking soda', 'baking powder', 'yeast', 'cornstarch', 'corn starch', 'starch',
+        'vanilla', 'cocoa', 'oil', 'olive oil', 'sesame oil', 'vegetable oil',
+        'canola oil', 'coconut oil', 'cooking spray', 'broth', 'stock', 'bouillon',
+        'soup', 'spice', 'seasoning', 'powder', 'cumin', 'turmeric', 'paprika',
+        'cinnamon', 'nutmeg', 'clove', 'cardamom', 'star anise', 'anise', 'bay leaf',
+        'bay leaves', 'oregano', 'peppercorn', 'black pepper', 'white pepper',
+        'chili flakes', 'chilli flakes', 'dried chili', 'dried chilli', 'curry',
+        'masala', 'garam masala', 'five spice', 'minced garlic', 'garlic powder',
+        'seaweed', 'nori', 'kombu', 'dried shrimp', 'ikan bilis', 'canned', 'tinned',
+        'coconut milk', 'tomato paste', 'breadcrumbs', 'panko', 'gelatin', 'cereal',
+    ],
+    'frozen': [
+        'frozen', 'ice cream', 'gelato', 'sorbet', 'popsicle', 'ice pop',
+        'gyoza', 'dumpling', 'potsticker', 'hash brown', 'fries', 'tater tot',
+        'frozen pizza', 'pizza',
+    ],
+    'beverages': [
+        'water', 'sparkling water', 'juice', 'soda', 'cola', 'lemonade', 'coffee',
+        'espresso', 'nespresso', 'latte', 'tea', 'black tea', 'green tea', 'chai',
+        'matcha', 'kombucha', 'beer', 'wine', 'red wine', 'white wine', 'cooking wine',
+        'sake', 'soju', 'whiskey', 'whisky', 'vodka', 'gin', 'rum', 'tequila', 'cider',
+        'champagne', 'prosecco', 'smoothie', 'shake', 'protein shake', 'milo', 'ovaltine',
+        'drink', 'energy drink', 'sports drink', 'gatorade', 'almond milk', 'oat milk',
+        'soy milk', 'soymilk',
+    ],
+    'snacks': [
+        'chips', 'crisps', 'crackers', 'cracker', 'pretzel', 'popcorn', 'nut', 'almond',
+        'cashew', 'peanut', 'pistachio', 'walnut', 'pecan', 'trail mix', 'cookie',
+        'biscuit', 'brownie', 'brookie', 'cake', 'cupcake', 'muffin', 'donut', 'doughnut',
+        'wafer', 'candy', 'chocolate', 'gummy', 'gummies', 'mints', 'mochi',
+        'taro ball', 'granola', 'granola bar', 'protein bar', 'energy bar', 'bar',
+        'snack', 'jelly', 'pudding', 'marshmallow', 'dried fruit', 'raisin', 'jerky stick',
+    ],
+    'condiments': [
+        'sauce', 'soy sauce', 'fish sauce', 'oyster sauce', 'hoisin', 'hoi sin',
+        'hot sauce', 'chili sauce', 'chilli sauce', 'sriracha', 'sambal', 'gochujang',
+        'laoganma', 'lao gan ma', 'chili crisp', 'chili oil', 'chilli oil', 'ketchup',
+        'mustard', 'mayo', 'mayonnaise', 'relish', 'salsa', 'pesto', 'dressing',
+        'vinaigrette', 'vinegar', 'mirin', 'miso', 'tahini', 'hummus', 'tzatziki', 'dip',
+        'jam', 'jelly spread', 'marmalade', 'preserves', 'spread', 'nutella', 'kaya',
+        'honey', 'maple syrup', 'syrup', 'agave', 'peanut butter', 'almond butter',
+        'cashew butter', 'nut butter', 'sunflower butter', 'apple butter', 'marinade',
+        'teriyaki', 'worcestershire', 'barbecue sauce', 'bbq sauce', 'pickle',
+        'kimchi', 'chutney',
+    ],
+}
+
+# Whole (normalized) names whose category the keywords would get wrong
+SPECIAL_CASES = {
+    'impossible nuggets': 'meat',
+    'nespresso rich chocolate': 'beverages',
+    'radish cake': 'staples',
+}
+
+# Words that decide the category wherever they appear in a name
+OVERRIDES = {
+    'frozen': 'frozen',
+    'ice cream': 'frozen',
+    'gelato': 'frozen',
+    'sorbet': 'frozen',
+    'popsicle': 'frozen',
+    'canned': 'pantry',
+    'tinned': 'pantry',
+}
+
+_NON_ALNUM = re.compile(r"[^a-z0-9%]+")
+
+
+def normalize_item_name(name: str) -> str:
+    """Lowercase words separated by single spaces; "Trader Joe's Milk!" -> "trader joe s milk" """
+    return " ".join(_NON_ALNUM.sub(" ", (name or "").lower()).split())
+
+
+def _word_forms(keyword: str):
+    """The keyword and its plurals ("berry" -> "berries", "tomato" -> "tomatoes")"""
+    forms = {keyword, keyword + 's', keyword + 'es'}
+    if keyword.endswith('y') and keyword[-2:-1] not in 'aeiou':
+        forms.add(keyword[:-1] + 'ies')
+    if keyword.endswith('f'):
+        forms.add(keyword[:-1] + 'ves')
+    return forms
+
+
+def _trie_regex(node):
+    """Regex for the words in a character trie; optional suffixes are greedy, so longer words win"""
+    branches = [re.escape(char) + _trie_regex(child) for char, child in sorted(node.items()) if char]
+    if not branches:
+        return ""
+    body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    if "" in node:
+        body = ("(?:" + body + ")" if len(branches) == 1 and len(body) > 1 else body) + "?"
+    return body
+
+
+def _compile(category_by_form):
+    """
+    One regex matching any of the forms as whole words
+
+    The forms are factored into a trie first ("pea", "peach", "peanut" ->
+    pea(?:ch|nut)?), so matching walks the shared prefixes once instead of
+    trying each of the ~1500 forms in turn.
+    """
+    trie = {}
+    for form in category_by_form:
+        node = trie
+        for char in form:
+            node = node.setdefault(char, {})
+        node[""] = {}
+    return re.compile(r"\b" + _trie_regex(trie) + r"\b")
+
+
+_CATEGORY_BY_FORM = {}
+for _category, _keywords in CATEGORY_KEYWORDS.items():
+    for _keyword in _keywords:
+        for _form in _word_forms(_keyword):
+            # Spelled-out forms ("wafers") take precedence over generated ones
+            if _CATEGORY_BY_FORM.get(_form) is None or _form == _keyword:
+                _CATEGORY_BY_FORM[_form] = _category
+_KEYWORD_PATTERN = _compile(_CATEGORY_BY_FORM)
+
+_OVERRIDE_BY_FORM = {form: category for phrase, category in OVERRIDES.items() for form in _word_forms(phrase)}
+_OVERRIDE_PATTERN = _compile(_OVERRIDE_BY_FORM)
+
+
+@lru_cache(maxsize=4096)
+def categorize_grocery_item_rule_based(item_name: str) -> str:
+    """Categorize a pantry item by its name alone; always one of GROCERY_CATEGORIES"""
+    name = normalize_item_name(item_name)
+    if not name:
+        return 'other'
+
+    special = SPECIAL_CASES.get(name)
+    if special:
+        return special
+
+    override = _OVERRIDE_PATTERN.search(name)
+    if override:
+        return _OVERRIDE_BY_FORM[override.group()]
+
+    category = 'other'
+    for match in _KEYWORD_PATTERN.finditer(name):
+        category = _CATEGORY_BY_FORM[match.group()]
+    return category
+
+
+GROCERY_CATEGORY_PROMPT = """Categorize this grocery item into exactly one category.
+
+Item: "{item_name}"
+
+Categories:
+- produce: fresh fruits, vegetables and herbs
+- meat: meat, poultry, fish, seafood, eggs, tofu and meat substitutes
+- dairy: milk, cheese, yogurt, butter and cream (not nut butters or plant milks)
+- bread: bread, bagels, buns, wraps and savory pastries (not sweet baked goods)
+- staples: rice, pasta, noodles, grains, legumes and potatoes
+- pantry: flour, sugar, oils, spices, broths and canned goods
+- frozen: anything sold frozen, including ice cream
+- beverages: drinks, juices, tea, coffee, plant milks and alcohol, including cooking wine
+- snacks: chips, crackers, nuts, cookies, cakes, candy, chocolate and bars
+- condiments: sauces, dressings, spreads, jams, honey, syrups and nut butters
+- other: anything else
+
+Respond with only JSON:
+{{"category": "<category>", "confidence": <0.0-1.0>, "reasoning": "<one short sentence>"}}"""
+
+
+def categorize_grocery_item_ai(item_name: str):
+    """
+    Ask the LLM to categorize a pantry item
+
+    Falls back to the rules, with zero confidence, if the LLM is unavailable
+    or answers with something other than a known category.
+
+    Returns:
+        Dict with category, confidence (0-1) and reasoning
+    """
+    # Imported here so the rules work without the LLM client's dependencies
+    from llm_client import get_llm_client, PRIORITY_BACKGROUND, LLMError
+
+    try:
+        response = get_llm_client().generate(
+            GROCERY_CATEGORY_PROMPT.format(item_name=item_name), priority=PRIORITY_BACKGROUND
+        )
+        start = response.find('{')
+        end = response.rfind('}')
+        result = json.loads(response[start:end + 1])
+        category = str(result.get('category', '')).strip().lower()
+        if category not in GROCERY_CATEGORIES:
+            raise ValueError(f"unknown category {category!r}")
+        confidence = min(max(float(result.get('confidence', 0.5)), 0.0), 1.0)
+        return {
+            'category': category,
+            'confidence': confidence,
+            'reasoning': str(result.get('reasoning', '')),
+        }
+    except (LLMError, ValueError, TypeError, AttributeError) as e:
+        return {
+            'category': categorize_grocery_item_rule_based(item_name),
+            'confidence': 0.0,
+            'reasoning': f"Rule-based fallback ({e})",
+        }
+
+
+def categorize_grocery_item(item_name: str, use_ai: bool = True) -> str:
+    """
+    Categorize a pantry item by rules, asking the LLM only about names the rules don't know
+
+    Pass use_ai=False to never call the LLM (e.g. when recategorizing many items).
+    """
+    category = categorize_grocery_item_rule_based(item_name)
+    if category == 'other' and use_ai:
+        return categorize_grocery_item_ai(item_name)['category']
+    return category
@@ -0,0 +1,56 @@
+"""
+Keyset (cursor) pagination helpers
+
+Expenses are listed newest first, ordered by (timestamp, id), with any
+undated expenses (NULL timestamp) last. A cursor records
+the (timestamp, id) of the last row on a page, so the next page can seek
+straight past it with an index lookup instead of scanning and discarding
+OFFSET rows.
+
+Cursors are opaque to clients: URL-safe base64 of a small JSON object.
+"""
+
+import base64
+import json
+from datetime import datetime
+from typing import Optional, Tuple
+
+
+class InvalidCursorError(ValueError):
+    """Raised when a client sends a cursor we didn't issue"""
+
+
+def encode_cursor(timestamp, expense_id: int) -> str:
+    """Build an opaque cursor pointing just past the given row"""
+    if isinstance(timestamp, datetime):
+        timestamp = timestamp.isoformat()
+    payload = json.dumps({"t": timestamp, "id": expense_id}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> Tuple[Optional[str], int]:
+    """Decode a cursor back into its (timestamp, id) position; timestamp is None among undated expenses"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        timestamp = payload["t"]
+        expense_id = int(payload["id"])
+        # Validate the timestamp so garbage never reaches the SQL layer
+        if timestamp is not None:
+            datetime.fromisoformat(timestamp)
+        return timestamp, expense_id
+    except (ValueError, KeyError, TypeError) as e:
+        raise InvalidCursorError(f"Invalid pagination cursor: {cursor}") from e
+
+
+def next_cursor_for(rows, limit: int) -> Optional[str]:
+    """
+    Cursor for the page after `rows`, or None if this is the last page
+
+    `rows` should hold up to limit + 1 rows; the extra row only signals that
+    another page exists and is not returned to the client.
+    """
+    if len(rows) <= limit:
+        return None
+    last = rows[limit - 1]
+    return encode_cursor(last["timestamp"], last["id"])
@@ -0,0 +1,86 @@
+"""
+In-process cache for LLM-generated summaries
+
+Generating a summary means re-reading every expense and waiting seconds on the
+LLM, yet the answer only changes when the expense data does. Entries are keyed
+on the request parameters plus the database's expenses version
+(repo.expenses_version(), the same value the ETags use), so any write - from
+any API worker, the CLI or a script - makes earlier summaries unreachable. The
+TTL bounds how long a "last N days" report can lag behind the clock, and LRU
+eviction bounds memory, including entries for versions that are now stale.
+"""
+
+from collections import OrderedDict
+from typing import Optional
+import hashlib
+import os
+import threading
+import time
+
+SUMMARY_CACHE_TTL_SECONDS = float(os.getenv('SUMMARY_CACHE_TTL_SECONDS', '600'))
+SUMMARY_CACHE_MAX_ENTRIES = int(os.getenv('SUMMARY_CACHE_MAX_ENTRIES', '128'))
+
+
+class SummaryCache:
+    """Thread-safe TTL + LRU cache with hit/miss counters"""
+
+    def __init__(self, ttl_seconds=SUMMARY_CACHE_TTL_SECONDS, max_entries=SUMMARY_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # key -> (expires_at, value)
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def make_key(self, data_version, report_type: str, prompt: Optional[str] = None,
+                 days: Optional[int] = None, category: Optional[str] = None):
+        """
+        Build a cache key for a summary request
+
+        Args:
+            data_version: repo.expenses_version(), read before the expenses are,
+                so a write landing in between can only make the entry unreachable
+        """
+        prompt_hash = hashlib.sha256(prompt.encode()).hexdigest() if prompt else None
+        return (report_type, prompt_hash, days, category, data_version)
+
+    def get(self, key):
+        """Return the cached value, or None on a miss or expired entry"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self._misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[1]
+
+    def set(self, key, value):
+        """Store a value, evicting the least recently used entries if full"""
+        with self._lock:
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions += 1
+
+    def stats(self):
+        """Snapshot of cache usage for monitoring"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self._hits,
+                "misses": self._misses,
+                "evictions": self._evictions,
+                "hit_rate": (self._hits / lookups) if lookups else 0.0,
+            }
+
+
+# Shared instance used by the summary routes
+summary_cache = SummaryCache()
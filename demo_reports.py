@@ -3,7 +3,7 @@
 Demo script showing the enhanced expense reporting capabilities
 """
 
-from summarize import summarize
+from summarize import print_summary
 import time
 
 def demo_reports():
@@ -15,35 +15,35 @@ def demo_reports():
     # Demo 1: Quick Summary
     print("\n1️⃣ QUICK SUMMARY")
     print("-" * 30)
-    summarize(report_type="quick")
+    print_summary(report_type="quick")
     
     time.sleep(2)
     
     # Demo 2: Comprehensive Analysis  
     print("\n2️⃣ COMPREHENSIVE ANALYSIS")
     print("-" * 30)
-    summarize(report_type="comprehensive")
+    print_summary(report_type="comprehensive")
     
     time.sleep(2)
     
     # Demo 3: Insights Focus
     print("\n3️⃣ SPENDING INSIGHTS")
     print("-" * 30)
-    summarize(report_type="insights")
+    print_summary(report_type="insights")
     
     time.sleep(2)
     
     # Demo 4: Budget Analysis
     print("\n4️⃣ BUDGET ANALYSIS")
     print("-" * 30)
-    summarize(report_type="budget_analysis")
+    print_summary(report_type="budget_analysis")
     
     time.sleep(2)
     
     # Demo 5: Weekly Report
     print("\n5️⃣ WEEKLY REPORT (Last 7 days)")
     print("-" * 30)
-    summarize(report_type="comprehensive", timeframe_days=7)
+    print_summary(report_type="comprehensive", timeframe_days=7)
     
     time.sleep(2)
     
@@ -58,7 +58,7 @@ def demo_reports():
     3. How much I could potentially save per month
     Be specific with dollar amounts and actionable advice.
     """
-    summarize(prompt=custom_prompt)
+    print_summary(prompt=custom_prompt)
 
 if __name__ == "__main__":
     demo_reports() 
\ No newline at end of file
@@ -0,0 +1,194 @@
+"""
+Columnar expense analytics
+
+Summaries used to walk the raw (amount, category, description, timestamp)
+tuples several times and re-parse every timestamp on each pass. Here the
+filtered expenses are loaded once into typed arrays - amounts as doubles,
+days as ordinals, categories as small integer codes - with every timestamp
+parsed exactly once. The statistics are then computed with NumPy over those
+arrays (viewed in place, not copied): grouped sums are bincounts over the
+category codes, weekdays and day offsets, the rolling average is a
+convolution over the daily totals, and the z-scores are computed for every
+expense at once. Only loading the rows is still per-row Python.
+
+Works the same on rows from SQLite (ISO strings, floats) and PostgreSQL
+(datetimes, Decimals).
+"""
+
+from array import array
+from datetime import date, datetime
+
+import numpy as np
+
+ROLLING_WINDOW_DAYS = 7
+PERCENTILES = (50, 75, 90, 95)
+
+# An expense is flagged when it sits this many standard deviations above its
+# category's mean, given at least ANOMALY_MIN_SAMPLES expenses in the category
+ANOMALY_Z_SCORE = 3.0
+ANOMALY_MIN_SAMPLES = 5
+MAX_ANOMALIES = 10
+
+WEEKDAYS = ("Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday")
+
+
+class ExpenseColumns:
+    """Expenses held column-wise; row i is (amounts[i], categories[category_codes[i]], ...)"""
+
+    def __init__(self):
+        self.amounts = array('d')
+        self.days = array('l')           # date.toordinal()
+        self.weekdays = array('b')       # 0 = Monday
+        self.category_codes = array('H')
+        self.categories = []             # code -> category name
+        self.descriptions = []
+        self._category_index = {}
+
+    def __len__(self):
+        return len(self.amounts)
+
+    def append(self, amount, category, description, timestamp):
+        """Add one expense; timestamp is a datetime or an ISO string"""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        day = timestamp.date() if isinstance(timestamp, datetime) else timestamp
+
+        code = self._category_index.get(category)
+        if code is None:
+            code = self._category_index[category] = len(self.categories)
+            self.categories.append(category)
+
+        self.amounts.append(float(amount))
+        self.days.append(day.toordinal())
+        self.weekdays.append(day.weekday())
+        self.category_codes.append(code)
+        self.descriptions.append(description)
+
+    @classmethod
+    def from_rows(cls, rows):
+        """
+        Build columns from (amount, category, description, timestamp) rows or dict rows
+
+        Rows without an amount or timestamp are skipped.
+        """
+        columns = cls()
+        for row in rows:
+            if isinstance(row, dict):
+                amount, category, description, timestamp = (
+                    row["amount"], row["category"], row["description"], row["timestamp"]
+                )
+            else:
+                amount, category, description, timestamp = row
+            if amount is None or not timestamp:
+                continue
+            columns.append(amount, category, description, timestamp)
+        return columns
+
+    def row(self, i):
+        """Expense i as a dict"""
+        return {
+            "amount": self.amounts[i],
+            "category": self.categories[self.category_codes[i]],
+            "description": self.descriptions[i],
+            "date": date.fromordinal(self.days[i]),
+        }
+
+
+def compute_stats(columns, rolling_window=ROLLING_WINDOW_DAYS):
+    """
+    Summary statistics for a set of expenses
+
+    Returns:
+        dict with count, total, mean, first_day/last_day, span_days,
+        active_days, daily_average, by_category, by_weekday, daily_totals,
+        rolling_average, percentiles and anomalies; None if there are no expenses
+    """
+    n = len(columns)
+    if n == 0:
+        return None
+
+    amounts = np.asarray(columns.amounts)
+    days = np.asarray(columns.days)
+    codes = np.asarray(columns.category_codes)
+    weekdays = np.asarray(columns.weekdays)
+    n_categories = len(columns.categories)
+
+    # Totals and grouped sums
+    first_day = int(days.min())
+    last_day = int(days.max())
+    span_days = last_day - first_day + 1
+    total = float(amounts.sum())
+
+    cat_count = np.bincount(codes, minlength=n_categories)
+    cat_sum = np.bincount(codes, weights=amounts, minlength=n_categories)
+    cat_sumsq = np.bincount(codes, weights=amounts * amounts, minlength=n_categories)
+    weekday_count = np.bincount(weekdays, minlength=7)
+    weekday_sum = np.bincount(weekdays, weights=amounts, minlength=7)
+    day_sum = np.bincount(days - first_day, weights=amounts, minlength=span_days)
+
+    # Trailing rolling average over calendar days (quiet days count as $0)
+    window_sums = np.convolve(day_sum, np.ones(rolling_window))[:span_days]
+    rolling = window_sums / np.minimum(np.arange(1, span_days + 1), rolling_window)
+    active_days = int(np.count_nonzero(day_sum))
+
+    # Anomalies, measured against each category's own spread
+    counted = cat_count > 0
+    cat_mean = np.divide(cat_sum, cat_count, out=np.zeros(n_categories), where=counted)
+    cat_var = np.divide(cat_sumsq, cat_count, out=np.zeros(n_categories), where=counted) - cat_mean ** 2
+    cat_std = np.sqrt(np.maximum(cat_var, 0.0))
+    row_std = cat_std[codes]
+    eligible = (cat_count[codes] >= ANOMALY_MIN_SAMPLES) & (row_std > 0)
+    z_scores = np.divide(amounts - cat_mean[codes], row_std, out=np.zeros(n), where=eligible)
+    flagged = np.flatnonzero(eligible & (z_scores >= ANOMALY_Z_SCORE))
+    # Highest z-score first, later expenses first among equals
+    flagged = flagged[np.lexsort((flagged, z_scores[flagged]))[::-1]][:MAX_ANOMALIES]
+
+    percentiles = np.percentile(amounts, PERCENTILES)
+    category_order = np.argsort(-cat_sum, kind="stable")
+    active_offsets = np.flatnonzero(day_sum)
+
+    return {
+        "count": n,
+        "total": total,
+        "mean": total / n,
+        "first_day": date.fromordinal(first_day),
+        "last_day": date.fromordinal(last_day),
+        "span_days": span_days,
+        "active_days": active_days,
+        "daily_average": total / active_days if active_days else 0.0,
+        "by_category": {
+            columns.categories[c]: {
+                "count": int(cat_count[c]),
+                "total": float(cat_sum[c]),
+                "average": float(cat_mean[c]),
+                "percentage": float(cat_sum[c] / total * 100) if total else 0.0,
+            }
+            for c in category_order.tolist()
+        },
+        "by_weekday": {
+            WEEKDAYS[d]: {"count": int(weekday_count[d]), "total": float(weekday_sum[d])}
+            for d in range(7)
+        },
+        "daily_totals": {
+            date.fromordinal(first_day + offset): value
+            for offset, value in zip(active_offsets.tolist(), day_sum[active_offsets].tolist())
+        },
+        "rolling_average": {
+            "window_days": rolling_window,
+            "latest": float(rolling[-1]),
+            "series": [
+                (date.fromordinal(first_day + offset), value)
+                for offset, value in enumerate(rolling.tolist())
+            ],
+        },
+        "percentiles": dict(zip(PERCENTILES, percentiles.tolist())),
+        "anomalies": [
+            dict(columns.row(i), z_score=round(float(z_scores[i]), 2))
+            for i in flagged.tolist()
+        ],
+    }
+
+
+def category_totals(stats):
+    """{category: total} from compute_stats() output, largest first"""
+    return {category: values["total"] for category, values in stats["by_category"].items()}
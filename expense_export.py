@@ -0,0 +1,195 @@
+"""
+Streaming export of expenses and pantry items
+
+Every insert and update stamps the row with the next change sequence number
+(see expense_sync.py), so an export can be limited to the rows changed since
+an earlier export's watermark. Rows are written one at a time as JSON or
+NDJSON, optionally gzipped, so memory use doesn't grow with the tables.
+
+The watermark is a token for the settled change sequence number read just
+before the rows are - the same point sync reads up to, kept below changes
+of transactions still open - so a row whose transaction commits while an
+export runs is picked up by the next export rather than lost. Rows numbered
+after the watermark may be exported twice; they're applied as upserts by id,
+so that's harmless.
+
+A since of an ISO-8601 time instead of a watermark selects rows by their
+updated_at time, which suits asking by hand for "changed since June 1st";
+a change still uncommitted at that time can be missed.
+
+Deleted rows aren't part of an export.
+"""
+
+from datetime import datetime, timezone
+from decimal import Decimal
+import json
+import zlib
+
+from expense_sync import SQLITE_CHANGE_TIME, decode_sync_token, encode_sync_token
+
+EXPORT_VERSION = "1.2"
+
+# Write buffered output in pieces of about this many characters
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+SQLITE_UPDATED_AT_SCHEMA = []
+for _table in ("expenses", "pantry_items"):
+    SQLITE_UPDATED_AT_SCHEMA += [
+        f"ALTER TABLE {_table} ADD COLUMN updated_at TEXT",
+        f"UPDATE {_table} SET updated_at = {SQLITE_CHANGE_TIME}",
+        f"CREATE INDEX IF NOT EXISTS idx_{_table}_updated_at ON {_table} (updated_at)",
+        # Only updated_at is written, and no other trigger watches that column
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {_table}_touch_insert AFTER INSERT ON {_table}
+        WHEN NEW.updated_at IS NULL
+        BEGIN
+            UPDATE {_table} SET updated_at = {SQLITE_CHANGE_TIME} WHERE id = NEW.id;
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {_table}_touch_update AFTER UPDATE ON {_table}
+        WHEN NEW.updated_at IS OLD.updated_at
+        BEGIN
+            UPDATE {_table} SET updated_at = {SQLITE_CHANGE_TIME} WHERE id = NEW.id;
+        END
+        ''',
+    ]
+
+# clock_timestamp() rather than CURRENT_TIMESTAMP, which is fixed at the
+# start of the transaction
+POSTGRES_UPDATED_AT_SCHEMA = [
+    '''
+    CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+]
+for _table in ("expenses", "pantry_items"):
+    POSTGRES_UPDATED_AT_SCHEMA += [
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS updated_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp()",
+        f"CREATE INDEX IF NOT EXISTS idx_{_table}_updated_at ON {_table} (updated_at)",
+        f"DROP TRIGGER IF EXISTS {_table}_touch ON {_table}",
+        f'''
+        CREATE TRIGGER {_table}_touch
+        BEFORE UPDATE ON {_table}
+        FOR EACH ROW EXECUTE PROCEDURE touch_updated_at()
+        ''',
+    ]
+
+
+def parse_watermark(value):
+    """
+    Read a since value: a watermark token becomes its change sequence number
+    (an int), an ISO-8601 time an aware datetime (naive times are UTC)
+
+    Raises:
+        ValueError: if value is neither
+    """
+    if value is None or isinstance(value, int):
+        return value
+    if isinstance(value, datetime):
+        moment = value
+    elif value.strip().startswith("v"):
+        return decode_sync_token(value)
+    else:
+        moment = datetime.fromisoformat(value.strip().replace("Z", "+00:00"))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment
+
+
+def format_watermark(moment) -> str:
+    """UTC ISO-8601 with milliseconds, e.g. 2025-06-01T12:00:00.000Z"""
+    moment = parse_watermark(moment).astimezone(timezone.utc)
+    return moment.strftime("%Y-%m-%dT%H:%M:%S.") + f"{moment.microsecond // 1000:03d}Z"
+
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _record(row):
+    record = dict(row)
+    if "is_consumed" in record:
+        # SQLite stores booleans as 0/1
+        record["is_consumed"] = bool(record["is_consumed"])
+    return json.dumps(record, default=_json_default)
+
+
+def format_since(since):
+    """How a parsed since value is reported in the export header"""
+    if since is None:
+        return None
+    return encode_sync_token(since) if isinstance(since, int) else format_watermark(since)
+
+
+def export_header(repo, since=None):
+    """Metadata for an export starting now; read the watermark before any rows"""
+    return {
+        "version": EXPORT_VERSION,
+        "exported_at": datetime.now().isoformat(),
+        "since": format_since(since),
+        "watermark": encode_sync_token(repo.settled_change_seq()),
+    }
+
+
+def json_chunks(repo, header, since=None, counts=None):
+    """
+    Yield a JSON document piece by piece: header fields, then one array per table
+
+    Args:
+        counts: Optional dict filled with the number of rows per table
+    """
+    yield json.dumps(header)[:-1]
+    for table in repo.export_tables:
+        yield f', "{table}": ['
+        count = 0
+        for row in repo.stream_rows(table, since):
+            yield (",\n" if count else "\n") + _record(row)
+            count += 1
+        yield "\n]"
+        if counts is not None:
+            counts[table] = count
+    yield "}\n"
+
+
+def ndjson_chunks(repo, header, since=None, counts=None):
+    """Yield NDJSON: a header line, then one {"table": ..., "row": ...} line per row"""
+    yield json.dumps({"type": "header", **header}) + "\n"
+    for table in repo.export_tables:
+        count = 0
+        for row in repo.stream_rows(table, since):
+            yield f'{{"type": "row", "table": "{table}", "row": {_record(row)}}}\n'
+            count += 1
+        if counts is not None:
+            counts[table] = count
+
+
+def buffered(chunks, size: int = EXPORT_CHUNK_SIZE):
+    """Join small string pieces into pieces of about size characters"""
+    parts, length = [], 0
+    for chunk in chunks:
+        parts.append(chunk)
+        length += len(chunk)
+        if length >= size:
+            yield "".join(parts)
+            parts, length = [], 0
+    if parts:
+        yield "".join(parts)
+
+
+def gzip_chunks(chunks):
+    """Gzip a stream of strings into a stream of bytes"""
+    compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk.encode())
+        if data:
+            yield data
+    yield compressor.flush()
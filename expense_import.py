@@ -0,0 +1,134 @@
+"""
+Bulk expense import - file parsing and validation
+
+Shared by the `expense import FILE` CLI command and POST /api/v1/expenses/bulk.
+Accepts:
+  - CSV with a header row: amount, category, description[, timestamp]
+  - JSON: a list of expense objects, or {"expenses": [...]} as written by
+    export_local_db_to_json.py
+  - JSONL: one expense object per line
+
+Every row is validated against the API's ExpenseCreate schema. Bad rows are
+reported with their row number and skipped; good rows are returned for
+batched insertion.
+"""
+
+import csv
+import io
+import json
+import os
+from datetime import datetime
+
+from api.models.schemas import ExpenseCreate
+
+SUPPORTED_FORMATS = ("csv", "json", "jsonl")
+
+# Rows per INSERT batch / transaction
+IMPORT_BATCH_SIZE = 1000
+
+
+def detect_format(filename: str) -> str:
+    """Guess the import format from a file extension"""
+    ext = os.path.splitext(filename)[1].lower().lstrip(".")
+    if ext == "ndjson":
+        return "jsonl"
+    if ext not in SUPPORTED_FORMATS:
+        raise ValueError(f"Unsupported file type '.{ext}'. Use one of: {', '.join(SUPPORTED_FORMATS)}")
+    return ext
+
+
+def read_rows(text: str, fmt: str):
+    """
+    Split import text into raw rows
+
+    Returns:
+        (rows, errors) - rows is a list of (row_number, dict), errors a list of
+        {"row": n, "error": message} for rows that couldn't even be read
+    """
+    rows = []
+    errors = []
+
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(text))
+        # Row 1 is the header, so data starts at row 2
+        for row_number, record in enumerate(reader, 2):
+            if not any((v or "").strip() for v in record.values() if isinstance(v, str)):
+                continue  # Spreadsheet exports often end with empty ",,," rows
+            rows.append((row_number, {k.strip().lower(): v for k, v in record.items() if k}))
+
+    elif fmt == "json":
+        data = json.loads(text)
+        if isinstance(data, dict) and "expenses" in data:
+            data = data["expenses"]
+        if not isinstance(data, list):
+            raise ValueError("JSON import must be a list of expenses or an object with an 'expenses' list")
+        for row_number, record in enumerate(data, 1):
+            if isinstance(record, dict):
+                rows.append((row_number, record))
+            else:
+                errors.append({"row": row_number, "error": "Expected a JSON object"})
+
+    elif fmt == "jsonl":
+        for row_number, line in enumerate(text.splitlines(), 1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError as e:
+                errors.append({"row": row_number, "error": f"Invalid JSON: {e.msg}"})
+                continue
+            if isinstance(record, dict):
+                rows.append((row_number, record))
+            else:
+                errors.append({"row": row_number, "error": "Expected a JSON object"})
+
+    else:
+        raise ValueError(f"Unsupported format '{fmt}'. Use one of: {', '.join(SUPPORTED_FORMATS)}")
+
+    return rows, errors
+
+
+def validate_rows(rows):
+    """
+    Validate raw rows against ExpenseCreate
+
+    Returns:
+        (expenses, errors) - expenses is a list of (amount, category, description,
+        timestamp) tuples ready to insert, errors a list of {"row": n, "error": message}
+    """
+    expenses = []
+    errors = []
+    now = datetime.now()
+
+    for row_number, record in rows:
+        # Blank CSV cells mean "not provided"
+        cleaned = {k: v for k, v in record.items() if v not in ("", None)}
+        if isinstance(cleaned.get("category"), str):
+            cleaned["category"] = cleaned["category"].strip().lower()
+        try:
+            expense = ExpenseCreate(**cleaned)
+        except Exception as e:
+            errors.append({"row": row_number, "error": str(e)})
+            continue
+        expenses.append((
+            expense.amount,
+            expense.category.value,
+            expense.description,
+            expense.timestamp or now
+        ))
+
+    return expenses, errors
+
+
+def load_expenses(text: str, fmt: str):
+    """Read and validate an import file's contents in one step"""
+    rows, read_errors = read_rows(text, fmt)
+    expenses, validation_errors = validate_rows(rows)
+    errors = sorted(read_errors + validation_errors, key=lambda e: e["row"])
+    return expenses, errors
+
+
+def batched(items, size=IMPORT_BATCH_SIZE):
+    """Yield successive slices of at most `size` items"""
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
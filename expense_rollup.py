@@ -0,0 +1,218 @@
+#!/usr/bin/env python3
+"""
+Daily per-category rollup of expenses.
+
+expense_daily_rollup holds one row per (day, category) with the count, sum,
+min and max of that day's expenses, so category breakdowns and totals over
+any date range read a few hundred rollup rows instead of scanning every
+expense.
+
+The table is kept current by triggers on the expenses table (installed by
+migrate_schema.py), so every write path - CLI add/edit/undo/delete/clear,
+bulk import and the API - maintains it without extra code:
+  - an insert adds to its group in place
+  - an update or delete recomputes the affected group(s) from the expenses
+    index on (category, day); min/max can't be decremented
+
+Expenses without a category or a readable timestamp aren't rolled up.
+
+Usage:
+    python expense_rollup.py              # rebuild the local SQLite rollup
+    python expense_rollup.py --postgres   # rebuild the rollup in DATABASE_URL
+"""
+
+from storage import connect_sqlite
+import sys
+import os
+
+# SQLite buckets an expense by date(timestamp) everywhere - the triggers, the
+# recompute, the rebuild and the repository's reads. date() turns offset
+# timestamps into UTC dates, so a raw text range on timestamp could put the
+# same row in another day. date() is NULL for an unparseable timestamp; such
+# rows are left out rather than failing the write.
+def _sqlite_refresh(row: str) -> str:
+    """Trigger statements recomputing the rollup group of OLD or NEW from expenses"""
+    day = f"date({row}.timestamp)"
+    return f'''
+        DELETE FROM expense_daily_rollup WHERE day = {day} AND category = {row}.category;
+        INSERT INTO expense_daily_rollup (day, category, expense_count, total_amount, min_amount, max_amount)
+        SELECT {day}, {row}.category, COUNT(*), COALESCE(SUM(amount), 0), MIN(amount), MAX(amount)
+        FROM expenses
+        WHERE category = {row}.category AND date(timestamp) = {day}
+        HAVING COUNT(*) > 0;'''
+
+
+SQLITE_ROLLUP_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+        day TEXT NOT NULL,
+        category TEXT NOT NULL,
+        expense_count INTEGER NOT NULL,
+        total_amount REAL NOT NULL,
+        min_amount REAL,
+        max_amount REAL,
+        PRIMARY KEY (day, category)
+    )
+    ''',
+    # Serves the recompute's (category, day) lookups
+    "CREATE INDEX IF NOT EXISTS idx_expenses_category_day ON expenses (category, date(timestamp))",
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_rollup_insert
+    AFTER INSERT ON expenses
+    WHEN date(NEW.timestamp) IS NOT NULL AND NEW.category IS NOT NULL
+    BEGIN
+        INSERT INTO expense_daily_rollup (day, category, expense_count, total_amount, min_amount, max_amount)
+        VALUES (date(NEW.timestamp), NEW.category, 1, COALESCE(NEW.amount, 0), NEW.amount, NEW.amount)
+        ON CONFLICT (day, category) DO UPDATE SET
+            expense_count = expense_count + 1,
+            total_amount = total_amount + excluded.total_amount,
+            min_amount = min(COALESCE(min_amount, excluded.min_amount), COALESCE(excluded.min_amount, min_amount)),
+            max_amount = max(COALESCE(max_amount, excluded.max_amount), COALESCE(excluded.max_amount, max_amount));
+    END
+    ''',
+    f'''
+    CREATE TRIGGER IF NOT EXISTS expenses_rollup_delete
+    AFTER DELETE ON expenses
+    WHEN date(OLD.timestamp) IS NOT NULL AND OLD.category IS NOT NULL
+    BEGIN {_sqlite_refresh("OLD")}
+    END
+    ''',
+    # A NULL day or category matches no rollup row and no expenses, so those halves do nothing
+    f'''
+    CREATE TRIGGER IF NOT EXISTS expenses_rollup_update
+    AFTER UPDATE OF amount, category, timestamp ON expenses
+    BEGIN {_sqlite_refresh("OLD")}
+        {_sqlite_refresh("NEW")}
+    END
+    ''',
+]
+
+# Days are calendar dates in the session time zone, the same zone the API's
+# naive cutoff datetimes are read in
+POSTGRES_ROLLUP_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS expense_daily_rollup (
+        day DATE NOT NULL,
+        category TEXT NOT NULL,
+        expense_count INTEGER NOT NULL,
+        total_amount NUMERIC(14, 2) NOT NULL,
+        min_amount NUMERIC(12, 2),
+        max_amount NUMERIC(12, 2),
+        PRIMARY KEY (day, category)
+    )
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION refresh_expense_rollup(p_day DATE, p_category TEXT) RETURNS void AS $$
+    BEGIN
+        DELETE FROM expense_daily_rollup WHERE day = p_day AND category = p_category;
+        INSERT INTO expense_daily_rollup (day, category, expense_count, total_amount, min_amount, max_amount)
+        SELECT p_day, p_category, COUNT(*), COALESCE(SUM(amount), 0), MIN(amount), MAX(amount)
+        FROM expenses
+        WHERE category = p_category AND timestamp >= p_day AND timestamp < p_day + 1
+        HAVING COUNT(*) > 0;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION expenses_rollup_trigger() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP = 'INSERT' THEN
+            IF NEW.timestamp IS NOT NULL AND NEW.category IS NOT NULL THEN
+                INSERT INTO expense_daily_rollup AS r (day, category, expense_count, total_amount, min_amount, max_amount)
+                VALUES (NEW.timestamp::date, NEW.category, 1, COALESCE(NEW.amount, 0), NEW.amount, NEW.amount)
+                ON CONFLICT (day, category) DO UPDATE SET
+                    expense_count = r.expense_count + 1,
+                    total_amount = r.total_amount + EXCLUDED.total_amount,
+                    min_amount = LEAST(r.min_amount, EXCLUDED.min_amount),
+                    max_amount = GREATEST(r.max_amount, EXCLUDED.max_amount);
+            END IF;
+            RETURN NULL;
+        END IF;
+
+        IF TG_OP = 'UPDATE'
+           AND NEW.amount IS NOT DISTINCT FROM OLD.amount
+           AND NEW.category IS NOT DISTINCT FROM OLD.category
+           AND NEW.timestamp IS NOT DISTINCT FROM OLD.timestamp THEN
+            RETURN NULL;
+        END IF;
+
+        IF OLD.timestamp IS NOT NULL AND OLD.category IS NOT NULL THEN
+            PERFORM refresh_expense_rollup(OLD.timestamp::date, OLD.category);
+        END IF;
+        IF TG_OP = 'UPDATE' AND NEW.timestamp IS NOT NULL AND NEW.category IS NOT NULL
+           AND (NEW.timestamp::date, NEW.category) IS DISTINCT FROM (OLD.timestamp::date, OLD.category) THEN
+            PERFORM refresh_expense_rollup(NEW.timestamp::date, NEW.category);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    "DROP TRIGGER IF EXISTS expenses_rollup ON expenses",
+    '''
+    CREATE TRIGGER expenses_rollup
+    AFTER INSERT OR UPDATE OR DELETE ON expenses
+    FOR EACH ROW EXECUTE PROCEDURE expenses_rollup_trigger()
+    ''',
+]
+
+SQLITE_REBUILD = [
+    "DELETE FROM expense_daily_rollup",
+    '''
+    INSERT INTO expense_daily_rollup (day, category, expense_count, total_amount, min_amount, max_amount)
+    SELECT date(timestamp), category, COUNT(*), COALESCE(SUM(amount), 0), MIN(amount), MAX(amount)
+    FROM expenses
+    WHERE date(timestamp) IS NOT NULL AND category IS NOT NULL
+    GROUP BY date(timestamp), category
+    ''',
+]
+
+POSTGRES_REBUILD = [
+    "DELETE FROM expense_daily_rollup",
+    '''
+    INSERT INTO expense_daily_rollup (day, category, expense_count, total_amount, min_amount, max_amount)
+    SELECT timestamp::date, category, COUNT(*), COALESCE(SUM(amount), 0), MIN(amount), MAX(amount)
+    FROM expenses
+    WHERE timestamp IS NOT NULL AND category IS NOT NULL
+    GROUP BY timestamp::date, category
+    ''',
+]
+
+
+def rebuild_rollup(conn, postgres=False):
+    """
+    Recompute expense_daily_rollup from scratch in one transaction
+
+    Only needed if the rollup drifted (e.g. expenses were changed with the
+    triggers disabled); normal writes keep it current.
+
+    Returns:
+        Number of rollup rows written
+    """
+    c = conn.cursor()
+    try:
+        for statement in (POSTGRES_REBUILD if postgres else SQLITE_REBUILD):
+            c.execute(statement)
+        rows = c.rowcount
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return rows
+
+
+if __name__ == "__main__":
+    if "--postgres" in sys.argv:
+        import psycopg2
+
+        DATABASE_URL = os.getenv('DATABASE_URL')
+        if not DATABASE_URL:
+            print("Error: DATABASE_URL environment variable not set")
+            exit(1)
+        conn = psycopg2.connect(DATABASE_URL)
+        rows = rebuild_rollup(conn, postgres=True)
+    else:
+        conn = connect_sqlite()
+        rows = rebuild_rollup(conn)
+
+    conn.close()
+    print(f"Rebuilt expense rollup: {rows} day/category rows")
@@ -0,0 +1,178 @@
+#!/usr/bin/env python3
+"""
+Full-text search over expense descriptions and categories.
+
+`description LIKE '%term%'` can't use an index, so every search scanned the
+whole table. Instead each backend keeps an inverted index that is updated on
+every write (installed by migrate_schema.py):
+  - SQLite: an FTS5 table over expenses, kept in sync by triggers
+  - PostgreSQL: a generated tsvector column with a GIN index
+
+Both are queried with the same small syntax:
+  coffee oat        expenses mentioning both words (any order)
+  star*             words starting with "star"
+  "oat milk"        the exact phrase
+Matches are ranked by relevance, with description hits above category hits.
+
+Usage:
+    python expense_search.py              # rebuild the local SQLite index
+    python expense_search.py --postgres   # rebuild the index in DATABASE_URL
+"""
+
+import re
+import sys
+import os
+
+SQLITE_SEARCH_SCHEMA = [
+    # External-content table: the text lives in expenses, FTS5 only stores the index.
+    # The prefix indexes make short "sta*" queries as cheap as whole words.
+    '''
+    CREATE VIRTUAL TABLE IF NOT EXISTS expenses_fts USING fts5(
+        description,
+        category,
+        content='expenses',
+        content_rowid='id',
+        tokenize='unicode61 remove_diacritics 2',
+        prefix='2 3'
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_insert AFTER INSERT ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (new.id, new.description, new.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_delete AFTER DELETE ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', old.id, old.description, old.category);
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS expenses_fts_update AFTER UPDATE OF description, category ON expenses
+    BEGIN
+        INSERT INTO expenses_fts (expenses_fts, rowid, description, category)
+        VALUES ('delete', old.id, old.description, old.category);
+        INSERT INTO expenses_fts (rowid, description, category)
+        VALUES (new.id, new.description, new.category);
+    END
+    ''',
+]
+
+# A generated column is recomputed by PostgreSQL on every insert and update,
+# so no trigger is needed. The 'simple' configuration doesn't stem, matching
+# the SQLite tokenizer.
+POSTGRES_SEARCH_SCHEMA = [
+    '''
+    ALTER TABLE expenses ADD COLUMN IF NOT EXISTS search_vector tsvector
+    GENERATED ALWAYS AS (
+        setweight(to_tsvector('simple', coalesce(description, '')), 'A') ||
+        setweight(to_tsvector('simple', coalesce(category, '')), 'B')
+    ) STORED
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_expenses_search_vector ON expenses USING GIN (search_vector)",
+]
+
+SQLITE_SEARCH_REBUILD = [
+    "INSERT INTO expenses_fts (expenses_fts) VALUES ('rebuild')",
+]
+
+# Dropping and re-adding the generated column recomputes every vector with the
+# expression above (REINDEX would only re-read the stored ones); the index goes
+# with the column and is recreated. This rewrites the table under an exclusive lock.
+POSTGRES_SEARCH_REBUILD = [
+    "ALTER TABLE expenses DROP COLUMN IF EXISTS search_vector",
+] + POSTGRES_SEARCH_SCHEMA
+
+# Relevance queries per backend, yielding (id, rank) with higher ranks better.
+# Each takes the backend's compiled query string as its only parameter.
+SQLITE_MATCHES_SQL = '''
+    SELECT rowid AS id, -bm25(expenses_fts, 2.0, 1.0) AS rank
+    FROM expenses_fts
+    WHERE expenses_fts MATCH ?
+'''
+
+POSTGRES_MATCHES_SQL = '''
+    SELECT id, ts_rank(search_vector, query) AS rank
+    FROM expenses, to_tsquery('simple', ?) AS query
+    WHERE search_vector @@ query
+'''
+
+_QUERY_TOKEN = re.compile(r'"([^"]*)"|(\S+)')
+# Letters and digits only, as both tokenizers split on everything else
+_WORD = re.compile(r"[^\W_]+")
+
+
+def parse_search_query(text: str):
+    """
+    Split a search string into clauses that must all match
+
+    Returns:
+        List of (words, prefix) - several words form a phrase; prefix means
+        the last word may be the start of a longer word
+    """
+    clauses = []
+    for phrase, term in _QUERY_TOKEN.findall(text or ""):
+        words = tuple(_WORD.findall((phrase or term).lower()))
+        if words:
+            clauses.append((words, bool(term) and term.endswith("*")))
+    return clauses
+
+
+def to_fts5_query(clauses) -> str:
+    """FTS5 MATCH expression; every word is quoted, so user input can't inject operators"""
+    return " ".join(
+        '"' + " ".join(words) + '"' + ("*" if prefix else "")
+        for words, prefix in clauses
+    )
+
+
+def to_tsquery(clauses) -> str:
+    """PostgreSQL to_tsquery() input; words are letters and digits only, so always valid"""
+    parts = []
+    for words, prefix in clauses:
+        words = list(words)
+        if prefix:
+            words[-1] += ":*"
+        parts.append(" <-> ".join(words))
+    return " & ".join(parts)
+
+
+def rebuild_search_index(conn, postgres=False):
+    """
+    Rebuild the search index from the expenses table in one transaction
+
+    Only needed if the index drifted (e.g. expenses were changed with the
+    triggers disabled, or the PostgreSQL vectors were built with another
+    configuration); normal writes keep it current.
+    """
+    c = conn.cursor()
+    try:
+        for statement in (POSTGRES_SEARCH_REBUILD if postgres else SQLITE_SEARCH_REBUILD):
+            c.execute(statement)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+if __name__ == "__main__":
+    if "--postgres" in sys.argv:
+        import psycopg2
+
+        DATABASE_URL = os.getenv('DATABASE_URL')
+        if not DATABASE_URL:
+            print("Error: DATABASE_URL environment variable not set")
+            exit(1)
+        conn = psycopg2.connect(DATABASE_URL)
+        rebuild_search_index(conn, postgres=True)
+    else:
+        from storage import connect_sqlite
+
+        conn = connect_sqlite()
+        rebuild_search_index(conn)
+
+    conn.close()
+    print("Rebuilt expense search index")
@@ -0,0 +1,217 @@
+"""
+Change tracking for incremental sync of expenses and pantry items
+
+Every insert and update stamps the row with the next value of one
+database-wide change sequence, and every delete leaves a tombstone in
+sync_tombstones stamped the same way (triggers installed by
+migrate_schema.py). A client remembers the highest sequence number it has
+seen - handed out as an opaque sync token - and later asks only for
+changes after it, so catching up costs the size of what changed rather
+than the size of the history.
+
+Each read is capped at a ceiling taken when it starts, so a change landing
+between the per-table queries is left for the next sync instead of being
+skipped over. SQLite has one writer at a time, so there the ceiling is just
+the latest number. On PostgreSQL numbers are taken when a row is written but
+become visible when its transaction commits, so a long transaction (a bulk
+import, a batch parse) can still hold 10 after 11 has committed. Before its
+first number, every writing transaction takes a shared advisory lock keyed
+by the sequence's last value, a lower bound for any number it will get
+(next_change_seq() below). Readers keep the ceiling under the smallest such
+key held by another session, so no token ever moves past a change that
+isn't visible yet.
+"""
+
+import re
+
+SYNC_TOKEN_VERSION = 1
+
+# updated_at times on SQLite, as UTC ISO-8601 text with milliseconds
+SQLITE_CHANGE_TIME = "strftime('%Y-%m-%dT%H:%M:%fZ', 'now')"
+
+_TOKEN = re.compile(r"^v(\d+)-(\d+)$")
+
+# PostgreSQL advisory lock keys are this prefix ("SY") in the top 16 bits and
+# a change sequence number in the low 48
+SYNC_LOCK_PREFIX = 0x5359
+
+# Smallest change number a transaction of another session may still commit
+POSTGRES_PENDING_CHANGE_SEQ = f"""
+    SELECT MIN(((classid::bigint & 65535) << 32) | objid::bigint) AS pending
+    FROM pg_locks
+    WHERE locktype = 'advisory' AND objsubid = 1 AND classid::bigint >> 16 = {SYNC_LOCK_PREFIX}
+      AND database = (SELECT oid FROM pg_database WHERE datname = current_database())
+      AND pid <> pg_backend_pid()
+"""
+
+SQLITE_SYNC_SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS sync_clock (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        change_seq INTEGER NOT NULL
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_tombstones (
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        change_seq INTEGER NOT NULL,
+        deleted_at TEXT NOT NULL,
+        PRIMARY KEY (table_name, row_id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_sync_tombstones_change_seq ON sync_tombstones (change_seq)",
+]
+for _table in ("expenses", "pantry_items"):
+    SQLITE_SYNC_SCHEMA += [
+        f"ALTER TABLE {_table} ADD COLUMN change_seq INTEGER",
+        # Replaced by the triggers below, which stamp both columns in one UPDATE
+        f"DROP TRIGGER IF EXISTS {_table}_touch_insert",
+        f"DROP TRIGGER IF EXISTS {_table}_touch_update",
+    ]
+SQLITE_SYNC_SCHEMA += [
+    # Existing rows get distinct sequence numbers, expenses first
+    "UPDATE expenses SET change_seq = id",
+    "UPDATE pantry_items SET change_seq = id + (SELECT COALESCE(MAX(id), 0) FROM expenses)",
+    '''
+    INSERT INTO sync_clock (id, change_seq)
+    SELECT 1, MAX(COALESCE((SELECT MAX(change_seq) FROM expenses), 0),
+                  COALESCE((SELECT MAX(change_seq) FROM pantry_items), 0))
+    ''',
+]
+for _table in ("expenses", "pantry_items"):
+    _stamp = f'''
+            UPDATE sync_clock SET change_seq = change_seq + 1;
+            UPDATE {_table}
+            SET change_seq = (SELECT change_seq FROM sync_clock), updated_at = {SQLITE_CHANGE_TIME}
+            WHERE id = NEW.id;
+    '''
+    SQLITE_SYNC_SCHEMA += [
+        f"CREATE INDEX IF NOT EXISTS idx_{_table}_change_seq ON {_table} (change_seq)",
+        # The stamping UPDATE changes change_seq, so it can't set itself off again
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {_table}_track_insert AFTER INSERT ON {_table}
+        BEGIN {_stamp}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {_table}_track_update AFTER UPDATE ON {_table}
+        WHEN NEW.change_seq IS OLD.change_seq
+        BEGIN {_stamp}
+        END
+        ''',
+        f'''
+        CREATE TRIGGER IF NOT EXISTS {_table}_track_delete AFTER DELETE ON {_table}
+        BEGIN
+            UPDATE sync_clock SET change_seq = change_seq + 1;
+            INSERT OR REPLACE INTO sync_tombstones (table_name, row_id, change_seq, deleted_at)
+            VALUES ('{_table}', OLD.id, (SELECT change_seq FROM sync_clock), {SQLITE_CHANGE_TIME});
+        END
+        ''',
+    ]
+
+POSTGRES_SYNC_SCHEMA = [
+    "CREATE SEQUENCE IF NOT EXISTS change_seq",
+    # Every change number is taken through here; the setting lasts until the
+    # transaction ends, like the lock, so each transaction locks once
+    f'''
+    CREATE OR REPLACE FUNCTION next_change_seq() RETURNS bigint AS $$
+    BEGIN
+        IF current_setting('expense_sync.writing', true) IS DISTINCT FROM 'on' THEN
+            PERFORM pg_advisory_xact_lock_shared(
+                ({SYNC_LOCK_PREFIX}::bigint << 48) + (SELECT last_value FROM change_seq));
+            PERFORM set_config('expense_sync.writing', 'on', true);
+        END IF;
+        RETURN nextval('change_seq');
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS sync_tombstones (
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        change_seq BIGINT NOT NULL DEFAULT next_change_seq(),
+        deleted_at TIMESTAMPTZ NOT NULL DEFAULT clock_timestamp(),
+        PRIMARY KEY (table_name, row_id)
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_sync_tombstones_change_seq ON sync_tombstones (change_seq)",
+    # Inserts take the column default; updates are restamped with updated_at
+    '''
+    CREATE OR REPLACE FUNCTION touch_updated_at() RETURNS trigger AS $$
+    BEGIN
+        NEW.updated_at := clock_timestamp();
+        NEW.change_seq := next_change_seq();
+        RETURN NEW;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+    '''
+    CREATE OR REPLACE FUNCTION record_tombstone() RETURNS trigger AS $$
+    BEGIN
+        INSERT INTO sync_tombstones (table_name, row_id) VALUES (TG_TABLE_NAME, OLD.id)
+        ON CONFLICT (table_name, row_id) DO UPDATE SET
+            change_seq = next_change_seq(),
+            deleted_at = clock_timestamp();
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    ''',
+]
+for _table in ("expenses", "pantry_items"):
+    POSTGRES_SYNC_SCHEMA += [
+        # A volatile default numbers the existing rows too
+        f"ALTER TABLE {_table} ADD COLUMN IF NOT EXISTS change_seq BIGINT NOT NULL DEFAULT next_change_seq()",
+        f"CREATE INDEX IF NOT EXISTS idx_{_table}_change_seq ON {_table} (change_seq)",
+        f"DROP TRIGGER IF EXISTS {_table}_tombstone ON {_table}",
+        f'''
+        CREATE TRIGGER {_table}_tombstone
+        AFTER DELETE ON {_table}
+        FOR EACH ROW EXECUTE PROCEDURE record_tombstone()
+        ''',
+    ]
+
+
+class InvalidSyncTokenError(ValueError):
+    """Raised when a sync token is malformed or from another token version"""
+
+
+def encode_sync_token(change_seq: int) -> str:
+    return f"v{SYNC_TOKEN_VERSION}-{change_seq}"
+
+
+def decode_sync_token(token) -> int:
+    """Change sequence a token stands for; no token means from the beginning"""
+    if not token:
+        return 0
+    match = _TOKEN.match(token.strip())
+    if not match or int(match.group(1)) != SYNC_TOKEN_VERSION:
+        raise InvalidSyncTokenError(f"Invalid sync token: {token}")
+    return int(match.group(2))
+
+
+def merge_changes(row_batches, tombstones, limit: int):
+    """
+    The first `limit` changes across all tables, in change order
+
+    Args:
+        row_batches: {table: rows ordered by change_seq}, each at most limit + 1 long
+        tombstones: (table_name, row_id, change_seq) ordered by change_seq, at most limit + 1
+        limit: Maximum number of changes to return
+
+    Returns:
+        (changes, last_seq, has_more) - changes is {table: {"rows": [...], "deleted": [...]}};
+        last_seq is the sequence number of the last change included
+    """
+    stream = [(row["change_seq"], table, row) for table, rows in row_batches.items() for row in rows]
+    stream += [(row["change_seq"], row["table_name"], row["row_id"]) for row in tombstones]
+    stream.sort(key=lambda change: change[0])
+
+    changes = {table: {"rows": [], "deleted": []} for table in row_batches}
+    for change_seq, table, item in stream[:limit]:
+        if isinstance(item, int):
+            changes.setdefault(table, {"rows": [], "deleted": []})["deleted"].append(item)
+        else:
+            changes[table]["rows"].append(item)
+    last_seq = stream[min(limit, len(stream)) - 1][0] if stream else None
+    return changes, last_seq, len(stream) > limit
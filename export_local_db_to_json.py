@@ -1,65 +1,115 @@
 #!/usr/bin/env python3
 """
 Export local SQLite database to JSON format for import into React Native app
+
+Rows are streamed straight to the file, so exports of any size use constant
+memory. After each export the watermark is saved next to the output file;
+--incremental starts from it and writes only the rows changed since then to
+a separate, timestamped changes file (e.g. initial_data.changes-20250601T120000000Z.json),
+leaving the full export in place. Apply the changes files in name order.
+--since also writes a changes file, with its own watermark beside it, and
+leaves the full export and its watermark alone.
+
+Usage:
+    python export_local_db_to_json.py                    # everything, to the app's initial_data.json
+    python export_local_db_to_json.py --incremental      # rows changed since the last export, to a changes file
+    python export_local_db_to_json.py --since 2025-06-01T00:00:00Z   # to a changes file too
+    python export_local_db_to_json.py --format ndjson --gzip -o export.ndjson.gz
 """
 
-import sqlite3
-import json
-from datetime import datetime
-
-# Connect to local SQLite database
-conn = sqlite3.connect('expenses.db')
-cursor = conn.cursor()
-
-# Export expenses
-print("Exporting expenses...")
-cursor.execute('SELECT id, amount, category, description, timestamp FROM expenses')
-expenses = []
-for row in cursor.fetchall():
-    expenses.append({
-        'id': row[0],
-        'amount': row[1],
-        'category': row[2],
-        'description': row[3],
-        'timestamp': row[4]
-    })
-
-print(f"Found {len(expenses)} expenses")
-
-# Export pantry items
-print("Exporting pantry items...")
-cursor.execute('SELECT id, name, quantity, unit, created_at, is_consumed, grocery_type FROM pantry_items')
-pantry_items = []
-for row in cursor.fetchall():
-    pantry_items.append({
-        'id': row[0],
-        'name': row[1],
-        'quantity': row[2],
-        'unit': row[3],
-        'created_at': row[4],
-        'is_consumed': bool(row[5]),  # Convert integer to boolean
-        'grocery_type': row[6]
-    })
-
-print(f"Found {len(pantry_items)} pantry items")
-
-conn.close()
-
-# Create export data structure
-export_data = {
-    'version': '1.0',
-    'exported_at': datetime.now().isoformat(),
-    'expenses': expenses,
-    'pantry_items': pantry_items
-}
-
-# Write to JSON file
-output_file = 'ExpenseTracker/assets/initial_data.json'
-with open(output_file, 'w') as f:
-    json.dump(export_data, f, indent=2)
-
-print(f"\n✅ Export complete!")
-print(f"📁 Data exported to: {output_file}")
-print(f"📊 Expenses: {len(expenses)}")
-print(f"🛒 Pantry items: {len(pantry_items)}")
-print(f"\nNext step: Import this data in your app using the import function")
+from datetime import datetime, timezone
+import argparse
+import gzip
+import os
+
+from expense_export import export_header, json_chunks, ndjson_chunks, parse_watermark
+from storage import SQLiteRepository
+
+DEFAULT_OUTPUT = 'ExpenseTracker/assets/initial_data.json'
+
+
+def watermark_path(output_file):
+    return output_file + '.watermark'
+
+
+def changes_path(output_file, moment):
+    """Where an incremental export next to output_file goes, e.g. data.changes-20250601T120000000Z.json"""
+    directory, name = os.path.split(output_file)
+    stem, dot, extensions = name.partition('.')
+    moment = moment.astimezone(timezone.utc)
+    stamp = moment.strftime('%Y%m%dT%H%M%S') + f"{moment.microsecond // 1000:03d}Z"
+    return os.path.join(directory, f"{stem}.changes-{stamp}{dot}{extensions}")
+
+
+def export(repo, output_file, fmt='json', since=None, compress=False, watermark_file=None):
+    """
+    Stream the expenses and pantry items changed at or after since (everything if None) to a file
+
+    Args:
+        watermark_file: Where to save the new watermark (default: next to output_file)
+
+    Returns:
+        (header, counts) - counts is the number of rows written per table
+    """
+    header = export_header(repo, since)
+    counts = {}
+    chunks = (ndjson_chunks if fmt == 'ndjson' else json_chunks)(repo, header, since, counts)
+
+    opener = gzip.open if compress else open
+    with opener(output_file, 'wt', encoding='utf-8') as f:
+        for chunk in chunks:
+            f.write(chunk)
+
+    with open(watermark_file or watermark_path(output_file), 'w') as f:
+        f.write(header['watermark'] + '\n')
+    return header, counts
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Export the local database for the React Native app")
+    parser.add_argument('-o', '--output', default=DEFAULT_OUTPUT, help='Output file')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json', help='Output format')
+    parser.add_argument('--gzip', action='store_true', help='Gzip the output')
+    parser.add_argument('--since', help='Only export rows changed since this watermark (or ISO-8601 time)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only export rows changed since the last export, to a timestamped changes file next to --output')
+    args = parser.parse_args()
+
+    since = None
+    try:
+        if args.incremental:
+            if os.path.exists(watermark_path(args.output)):
+                with open(watermark_path(args.output)) as f:
+                    since = parse_watermark(f.read())
+            else:
+                print("No earlier export found, exporting everything")
+        elif args.since:
+            since = parse_watermark(args.since)
+    except ValueError as e:
+        print(f"❌ Invalid watermark: {e}")
+        exit(1)
+
+    # A partial export never replaces the full one; it goes in a changes file
+    # beside it. Only --incremental moves the full export's watermark on.
+    output_file, watermark_file = args.output, None
+    if since is not None:
+        output_file = changes_path(args.output, datetime.now(timezone.utc))
+        if args.incremental:
+            watermark_file = watermark_path(args.output)
+
+    repo = SQLiteRepository()
+    try:
+        print("Exporting expenses and pantry items...")
+        header, counts = export(repo, output_file, args.format, since, args.gzip,
+                                watermark_file=watermark_file)
+    finally:
+        repo.close()
+
+    print(f"\n✅ Export complete!")
+    print(f"📁 Data exported to: {output_file}")
+    if since is not None:
+        print(f"🕒 Changes since: {header['since']}")
+    print(f"📊 Expenses: {counts.get('expenses', 0)}")
+    print(f"🛒 Pantry items: {counts.get('pantry_items', 0)}")
+    print(f"🔖 Watermark: {header['watermark']} (use --incremental next time)")
+    print(f"\nNext step: Import this data in your app using the import function")
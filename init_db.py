@@ -1,6 +1,7 @@
 import sqlite3
+from storage import connect_sqlite
 
-conn = sqlite3.connect('expenses.db')
+conn = connect_sqlite()
 c = conn.cursor()
 c.execute('''
     CREATE TABLE IF NOT EXISTS expenses (
@@ -59,5 +60,10 @@ except sqlite3.OperationalError as e:
         print(f"Error adding grocery_type column: {e}")
 
 conn.commit()
+
+# Apply versioned schema migrations (indexes, etc.)
+from migrate_schema import migrate_sqlite
+migrate_sqlite(conn)
+
 conn.close()
 print("Database initialization completed successfully!")
@@ -35,5 +35,10 @@ c.execute('''
 ''')
 
 conn.commit()
+
+# Apply versioned schema migrations (native column types, indexes)
+from migrate_schema import migrate_postgres
+migrate_postgres(conn)
+
 conn.close()
 print("PostgreSQL schema created successfully!")
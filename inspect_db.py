@@ -1,15 +1,20 @@
 #!/usr/bin/env python3
 """Quick script to inspect the SQLite database"""
 
-import sqlite3
+from storage import SQLITE_DB_PATH, connect_sqlite, sqlite_settings
 
-conn = sqlite3.connect('expenses.db')
+conn = connect_sqlite()
 cursor = conn.cursor()
 
 print("=" * 60)
-print("DATABASE: expenses.db")
+print(f"DATABASE: {SQLITE_DB_PATH}")
 print("=" * 60)
 
+# Show connection tuning
+print("\n⚙️  SETTINGS:")
+for name, value in sqlite_settings(conn).items():
+    print(f"  {name}: {value}")
+
 # Show table structure
 print("\n📊 TABLES:")
 cursor.execute("SELECT name FROM sqlite_master WHERE type='table'")
@@ -46,7 +51,7 @@ if cursor.fetchone():
     print(f"\n💾 EXPENSE BACKUPS: {backup_count}")
 
 print("\n" + "=" * 60)
-print(f"Database file: expenses.db")
+print(f"Database file: {SQLITE_DB_PATH}")
 print("=" * 60)
 
 conn.close()
@@ -0,0 +1,236 @@
+"""
+Shared client for the local Ollama LLM
+
+Every LLM call in the project goes through one LLMClient so that:
+  - HTTP connections are kept alive and reused (one requests.Session)
+  - at most LLM_MAX_CONCURRENCY requests reach Ollama at once
+  - waiting requests are served by priority (interactive parsing ahead of
+    background summaries), then first come first served
+  - the wait queue is bounded (LLM_MAX_QUEUE); beyond that callers get
+    LLMBusyError immediately instead of piling onto Ollama
+  - every request has a deadline covering both queueing and generation
+  - queue depth, in-flight count and outcomes are tracked for monitoring
+"""
+
+from contextlib import contextmanager
+import heapq
+import itertools
+import json
+import os
+import threading
+import time
+
+import requests
+
+OLLAMA_URL = os.getenv('OLLAMA_URL', 'http://localhost:11434')
+LLM_MODEL = os.getenv('LLM_MODEL', 'gemma3n:e2b')
+LLM_MAX_CONCURRENCY = int(os.getenv('LLM_MAX_CONCURRENCY', '2'))
+LLM_MAX_QUEUE = int(os.getenv('LLM_MAX_QUEUE', '32'))
+LLM_DEFAULT_TIMEOUT_SECONDS = float(os.getenv('LLM_DEFAULT_TIMEOUT_SECONDS', '120'))
+
+# Lower numbers are served first
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BACKGROUND = 10
+
+
+class LLMError(Exception):
+    """Base class for LLM client failures"""
+
+
+class LLMBusyError(LLMError):
+    """The wait queue is full; try again later"""
+
+
+class LLMTimeoutError(LLMError):
+    """The request's deadline passed while queued or generating"""
+
+
+class LLMConnectionError(LLMError):
+    """Ollama could not be reached"""
+
+
+class LLMClient:
+    """Priority-scheduled, concurrency-limited client for Ollama's generate API"""
+
+    def __init__(self, base_url=OLLAMA_URL, model=LLM_MODEL, max_concurrency=LLM_MAX_CONCURRENCY,
+                 max_queue=LLM_MAX_QUEUE, default_timeout=LLM_DEFAULT_TIMEOUT_SECONDS):
+        self.base_url = base_url.rstrip('/')
+        self.model = model
+        self.max_concurrency = max_concurrency
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+
+        self._session = requests.Session()
+        self._cond = threading.Condition()
+        self._waiting = []  # heap of (priority, sequence)
+        self._sequence = itertools.count()
+        self._in_flight = 0
+        self._stats = {
+            "completed": 0,
+            "failed": 0,
+            "timed_out": 0,
+            "rejected": 0,
+            "total_wait_seconds": 0.0,
+            "max_queue_depth_seen": 0,
+        }
+
+    @contextmanager
+    def _slot(self, priority, deadline):
+        """Wait for a concurrency slot in priority order, holding it for the block"""
+        with self._cond:
+            if len(self._waiting) >= self.max_queue:
+                self._stats["rejected"] += 1
+                raise LLMBusyError(f"LLM queue is full ({self.max_queue} requests waiting)")
+
+            ticket = (priority, next(self._sequence))
+            heapq.heappush(self._waiting, ticket)
+            self._stats["max_queue_depth_seen"] = max(self._stats["max_queue_depth_seen"], len(self._waiting))
+            queued_at = time.monotonic()
+
+            try:
+                while self._in_flight >= self.max_concurrency or self._waiting[0] != ticket:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._stats["timed_out"] += 1
+                        raise LLMTimeoutError("Timed out waiting for the LLM")
+                    self._cond.wait(remaining)
+            except BaseException:
+                self._waiting.remove(ticket)
+                heapq.heapify(self._waiting)
+                self._cond.notify_all()
+                raise
+
+            heapq.heappop(self._waiting)
+            self._in_flight += 1
+            self._stats["total_wait_seconds"] += time.monotonic() - queued_at
+            # The next waiter may also fit if more than one slot is free
+            self._cond.notify_all()
+
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._in_flight -= 1
+                self._cond.notify_all()
+
+    def _post(self, prompt, stream, deadline):
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            raise LLMTimeoutError("Timed out waiting for the LLM")
+        try:
+            res = self._session.post(
+                f"{self.base_url}/api/generate",
+                json={"model": self.model, "prompt": prompt, "stream": stream},
+                stream=stream,
+                timeout=remaining
+            )
+        except requests.exceptions.Timeout as e:
+            raise LLMTimeoutError(f"LLM request timed out after {remaining:.0f}s") from e
+        except requests.exceptions.ConnectionError as e:
+            raise LLMConnectionError(
+                f"Cannot connect to LLM server at {self.base_url}. "
+                f"Make sure Ollama is running with the {self.model} model."
+            ) from e
+
+        if res.status_code != 200:
+            print(f"⚠️ LLM server error (status {res.status_code}): {res.text}")
+            res.close()
+            raise LLMError(f"LLM server returned status {res.status_code}")
+        return res
+
+    def _record(self, outcome):
+        with self._cond:
+            self._stats[outcome] += 1
+
+    def generate(self, prompt: str, priority: int = PRIORITY_INTERACTIVE, timeout: float = None) -> str:
+        """Return the full completion for a prompt"""
+        deadline = time.monotonic() + (timeout or self.default_timeout)
+        with self._slot(priority, deadline):
+            try:
+                res = self._post(prompt, False, deadline)
+                response_data = res.json()
+            except LLMTimeoutError:
+                self._record("timed_out")
+                raise
+            except Exception:
+                self._record("failed")
+                raise
+
+        if "response" not in response_data:
+            print(f"⚠️ Unexpected response structure: {response_data}")
+            self._record("failed")
+            raise LLMError("LLM response missing 'response' key")
+        self._record("completed")
+        return response_data["response"]
+
+    def stream(self, prompt: str, priority: int = PRIORITY_INTERACTIVE, timeout: float = None):
+        """
+        Yield the completion chunk by chunk; the slot is held until the stream ends
+
+        The request timeout only bounds each socket read, so a model that
+        keeps producing tokens would never trip it; the deadline is checked
+        between chunks as well.
+        """
+        deadline = time.monotonic() + (timeout or self.default_timeout)
+        with self._slot(priority, deadline):
+            try:
+                with self._post(prompt, True, deadline) as res:
+                    # Ollama streams one JSON object per line until "done" is true
+                    for line in res.iter_lines():
+                        if time.monotonic() > deadline:
+                            raise LLMTimeoutError("LLM stream ran past its deadline")
+                        if not line:
+                            continue
+                        chunk = json.loads(line)
+                        if "error" in chunk:
+                            raise LLMError(f"LLM stream error: {chunk['error']}")
+                        if chunk.get("response"):
+                            yield chunk["response"]
+                        if chunk.get("done"):
+                            break
+            except LLMTimeoutError:
+                self._record("timed_out")
+                raise
+            except requests.exceptions.RequestException as e:
+                if time.monotonic() > deadline:
+                    # A read stalled until the remaining time ran out
+                    self._record("timed_out")
+                    raise LLMTimeoutError("LLM stream ran past its deadline") from e
+                self._record("failed")
+                raise LLMError(f"LLM stream interrupted: {e}") from e
+            except Exception:
+                self._record("failed")
+                raise
+        self._record("completed")
+
+    def stats(self):
+        """Snapshot of scheduler state for monitoring"""
+        with self._cond:
+            finished = self._stats["completed"] + self._stats["failed"] + self._stats["timed_out"]
+            return {
+                "model": self.model,
+                "max_concurrency": self.max_concurrency,
+                "max_queue": self.max_queue,
+                "in_flight": self._in_flight,
+                "queue_depth": len(self._waiting),
+                "max_queue_depth_seen": self._stats["max_queue_depth_seen"],
+                "completed": self._stats["completed"],
+                "failed": self._stats["failed"],
+                "timed_out": self._stats["timed_out"],
+                "rejected": self._stats["rejected"],
+                "avg_wait_seconds": (self._stats["total_wait_seconds"] / finished) if finished else 0.0,
+            }
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_llm_client():
+    """Return the process-wide LLM client, creating it on first use"""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = LLMClient()
+    return _client
@@ -2,8 +2,9 @@ import warnings
 from urllib3.exceptions import NotOpenSSLWarning
 warnings.simplefilter("ignore", NotOpenSSLWarning)
 import typer
-from add_expense import add_expense
-from summarize import summarize
+from add_expense import add_expense, add_expenses_from_lines, insert_expenses
+from summarize import print_summary
+from storage import get_repository
 import sqlite3
 from datetime import datetime
 from typing import Optional, List
@@ -15,12 +16,7 @@ app = typer.Typer()
 # Helper functions for robust editing
 def get_expense_by_id(expense_id: int):
     """Get expense details by ID"""
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute("SELECT id, amount, category, description, timestamp FROM expenses WHERE id = ?", (expense_id,))
-    expense = c.fetchone()
-    conn.close()
-    return expense
+    return get_repository().get_expense(expense_id)
 
 def validate_amount(amount_str: str) -> float:
     """Validate and convert amount string to float"""
@@ -90,74 +86,37 @@ def format_expense_display(expense):
     
     return f"ID: {expense_id} | {amount_str:>8} | {category:12} | {description:30} | {date_str}"
 
-def search_expenses(search_term: str = "", category: str = "", days: Optional[int] = None) -> List:
-    """Search expenses with filters"""
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    
-    query = "SELECT id, amount, category, description, timestamp FROM expenses WHERE 1=1"
-    params = []
-    
-    if search_term:
-        query += " AND (description LIKE ? OR category LIKE ?)"
-        params.extend([f"%{search_term}%", f"%{search_term}%"])
-    
-    if category:
-        query += " AND category = ?"
-        params.append(category)
-    
-    if days:
-        from datetime import timedelta
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-        query += " AND timestamp >= ?"
-        params.append(cutoff_date)
-    
-    query += " ORDER BY timestamp DESC"
+EXPENSE_FIELDS = ("id", "amount", "category", "description", "timestamp")
+
+def search_expenses(search_term: str = "", category: str = "", days: Optional[int] = None,
+                    fuzzy: bool = False) -> List:
+    """Search expenses with filters; search terms are ranked by relevance, best first
     
-    c.execute(query, params)
-    expenses = c.fetchall()
-    conn.close()
-    return expenses
+    With fuzzy, descriptions only need to be similar to the term (typos, "trader joes" vs "Trader Joe's")
+    """
+    repo = get_repository()
+    if not search_term:
+        return repo.list_expenses(category=category, days=days)
+    try:
+        if fuzzy:
+            matches = repo.fuzzy_search(search_term, category=category, days=days)
+        else:
+            matches = repo.search_expenses(search_term, category=category, days=days)
+        return [tuple(expense[field] for field in EXPENSE_FIELDS) for expense in matches]
+    except sqlite3.OperationalError:
+        # Databases that haven't been migrated yet have no search index
+        print("⚠️  Search index missing - run 'python migrate_schema.py' for faster, ranked search.")
+        return repo.list_expenses(category=category, days=days, search=search_term)
 
 def backup_expense(expense_id: int):
     """Create a backup of expense before editing (for undo)"""
-    expense = get_expense_by_id(expense_id)
-    if expense:
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        # Create backup table if not exists
-        c.execute('''
-            CREATE TABLE IF NOT EXISTS expense_backups (
-                backup_id INTEGER PRIMARY KEY,
-                original_id INTEGER,
-                amount REAL,
-                category TEXT,
-                description TEXT,
-                timestamp TEXT,
-                backup_timestamp TEXT
-            )
-        ''')
-        
-        # Insert backup
-        c.execute('''
-            INSERT INTO expense_backups (original_id, amount, category, description, timestamp, backup_timestamp)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (*expense, datetime.now().isoformat()))
-        conn.commit()
-        backup_id = c.lastrowid
-        conn.close()
-        return backup_id
-    return None
+    return get_repository().backup_expense(expense_id)
 
 def get_expense_by_position(position: int, expenses_list: Optional[List] = None):
     """Get expense by its display position (1-based)"""
     if expenses_list is None:
         # Get all expenses in default order
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-        expenses_list = c.fetchall()
-        conn.close()
+        expenses_list = get_repository().list_expenses()
     
     if 1 <= position <= len(expenses_list):
         return expenses_list[position - 1][0]  # Return the expense ID
@@ -213,18 +172,83 @@ def get_expenses_by_positions(positions: List[int], expenses_list: List) -> List
     return selected_expenses
 
 @app.command()
-def add(text: str):
-    add_expense(text)
+def add(
+    text: Optional[str] = typer.Argument(None, help="Expense in plain English, e.g. \"$12 lunch at Chipotle\""),
+    file: Optional[str] = typer.Option(None, "--file", "-f", help="Text file with one expense per line")
+    ):
+    """Add an expense from natural language, or many from a file
+    
+    Examples:
+      expense add "$4.50 coffee"
+      expense add --file today.txt      # one expense per line, parsed in batches
+    """
+    if file:
+        try:
+            with open(file, encoding='utf-8') as f:
+                lines = f.readlines()
+        except OSError as e:
+            print(f"❌ Could not read {file}: {e}")
+            return
+        add_expenses_from_lines(lines)
+    elif text:
+        add_expense(text)
+    else:
+        print("❌ Provide an expense to add, or --file with one expense per line.")
+
+@app.command(name="import")
+def import_expenses(
+    file: str = typer.Argument(..., help="CSV, JSON or JSONL file to import"),
+    file_format: Optional[str] = typer.Option(None, "--format", help="File format: csv, json or jsonl (default: from extension)")
+    ):
+    """Bulk import expenses from a file
+    
+    CSV files need a header row with amount, category, description and
+    optionally timestamp. JSON files hold a list of expenses (or an
+    {"expenses": [...]} export); JSONL files hold one expense per line.
+    
+    Examples:
+      expense import bank_2024.csv
+      expense import export.json
+      expense import expenses.txt --format jsonl
+    """
+    from expense_import import detect_format, load_expenses, batched
+    
+    try:
+        fmt = file_format.lower() if file_format else detect_format(file)
+        with open(file, encoding='utf-8-sig') as f:
+            expenses, errors = load_expenses(f.read(), fmt)
+    except (OSError, ValueError) as e:
+        print(f"❌ Could not read {file}: {e}")
+        return
+    
+    inserted = 0
+    for batch in batched(expenses):
+        inserted += insert_expenses([
+            (amount, category, description, timestamp.isoformat())
+            for amount, category, description, timestamp in batch
+        ])
+    
+    print(f"✅ Imported {inserted} expenses from {file}")
+    if errors:
+        print(f"⚠️  Skipped {len(errors)} invalid rows:")
+        for error in errors[:20]:
+            print(f"  Row {error['row']}: {error['error']}")
+        if len(errors) > 20:
+            print(f"  ... and {len(errors) - 20} more")
 
 @app.command()
 def summary(
-    days: Optional[int] = typer.Option(None, help="Number of days to look back (default: all time)")
+    days: Optional[int] = typer.Option(None, help="Number of days to look back (default: all time)"),
+    category: Optional[str] = typer.Option(None, help="Only summarize one category"),
+    stream: bool = typer.Option(True, "--stream/--no-stream", help="Print the report as the LLM generates it")
     ):
     """Generate expense summary with interactive menu selection
     
     Examples:
       expense summary                    # Interactive mode - choose from menu
       expense summary --days 30          # Interactive mode for last 30 days
+      expense summary --category food    # Only food expenses
+      expense summary --no-stream        # Wait for the full report before printing
     """
     
     print("\n📊 Expense Summary Options")
@@ -314,6 +338,9 @@ def summary(
         print(f"📅 Looking back {days} days")
     else:
         print("📅 Including all expenses")
+    if category:
+        category = category.lower().strip()
+        print(f"🏷️  Only {category} expenses")
     print("-" * 40)
     
     # Check if subcommand is a predefined report type
@@ -322,20 +349,17 @@ def summary(
     if subcommand.lower() in valid_types:
         # Convert budget to budget_analysis for internal use
         report_type = "budget_analysis" if subcommand.lower() == "budget" else subcommand.lower()
-        summarize(report_type=report_type, timeframe_days=days)
+        print_summary(report_type=report_type, timeframe_days=days, category=category, stream=stream)
     else:
         # Treat as custom prompt
-        summarize(prompt=subcommand, timeframe_days=days)
+        print_summary(prompt=subcommand, timeframe_days=days, category=category, stream=stream)
 
 @app.command()
 def clear():
     """Clear all expenses from the database"""
     # Get count of expenses first
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute("SELECT COUNT(*) FROM expenses")
-    count = c.fetchone()[0]
-    conn.close()
+    repo = get_repository()
+    count = repo.count_expenses()
     
     if count == 0:
         print("No expenses to clear.")
@@ -350,13 +374,26 @@ def clear():
         return
     
     # Proceed with deletion
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute("DELETE FROM expenses")
-    conn.commit()
-    conn.close()
+    repo.delete_all_expenses()
     print("✅ All expenses cleared from database.")
 
+@app.command(name="rebuild-rollup")
+def rebuild_rollup_command():
+    """Recompute the daily category rollup from all expenses
+
+    The rollup is kept current automatically; use this if it ever looks out
+    of step with your expenses.
+    """
+    from expense_rollup import rebuild_rollup
+
+    try:
+        rows = rebuild_rollup(get_repository().conn)
+    except sqlite3.OperationalError as e:
+        print(f"❌ Could not rebuild rollup: {e}")
+        print("Run 'python migrate_schema.py' to create the rollup table first.")
+        return
+    print(f"✅ Rebuilt rollup: {rows} day/category rows")
+
 @app.command()
 def list():
     """List expenses with interactive menu selection"""
@@ -413,17 +450,12 @@ def list():
         'december': 12, 'dec': 12
     }
     
+    repo = get_repository()
+    
     # Handle different filter types
     if filter_choice == "weekly":
         # Weekly filter - last 7 days
-        from datetime import timedelta
-        
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        
-        cutoff_date = (datetime.now() - timedelta(days=7)).isoformat()
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses WHERE timestamp >= ? ORDER BY timestamp DESC", (cutoff_date,))
-        expenses = c.fetchall()
+        expenses = repo.list_expenses(days=7)
         
         header = f"📋 Weekly Expenses - Last 7 Days"
         
@@ -448,12 +480,8 @@ def list():
         month_names = ["", "January", "February", "March", "April", "May", "June",
                       "July", "August", "September", "October", "November", "December"]
         
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        
         # Get all expenses and filter by month
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-        all_expenses = c.fetchall()
+        all_expenses = repo.list_expenses()
         
         # Filter expenses by month (any year)
         expenses = []
@@ -470,20 +498,15 @@ def list():
         
     elif filter_choice == "category":
         # Category filter - let user choose from available categories
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        
         # Get available categories
-        c.execute("SELECT DISTINCT category FROM expenses ORDER BY category")
-        categories = c.fetchall()
+        categories = repo.list_categories()
         
         if not categories:
             print("❌ No categories found in your expenses.")
-            conn.close()
             return
         
         print("\n📂 Available Categories:")
-        for i, (category,) in enumerate(categories, 1):
+        for i, category in enumerate(categories, 1):
             print(f"{i:2d}. {category}")
         
         while True:
@@ -491,15 +514,14 @@ def list():
                 cat_choice = input(f"Select category (1-{len(categories)}): ").strip()
                 cat_index = int(cat_choice) - 1
                 if 0 <= cat_index < len(categories):
-                    selected_category = categories[cat_index][0]
+                    selected_category = categories[cat_index]
                     break
                 else:
                     print(f"❌ Please enter a number between 1 and {len(categories)}.")
             except ValueError:
                 print("❌ Please enter a valid number.")
         
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses WHERE category = ? ORDER BY timestamp DESC", (selected_category,))
-        expenses = c.fetchall()
+        expenses = repo.list_expenses(category=selected_category)
         header = f"📋 {selected_category.title()} Expenses"
         
     elif filter_choice == "custom_days":
@@ -515,27 +537,15 @@ def list():
             except ValueError:
                 print("❌ Please enter a valid number.")
         
-        from datetime import timedelta
-        
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        
-        cutoff_date = (datetime.now() - timedelta(days=days_back)).isoformat()
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses WHERE timestamp >= ? ORDER BY timestamp DESC", (cutoff_date,))
-        expenses = c.fetchall()
+        expenses = repo.list_expenses(days=days_back)
         
         header = f"📋 Last {days_back} Days Expenses"
         
     else:
         # All expenses
-        conn = sqlite3.connect('expenses.db')
-        c = conn.cursor()
-        c.execute("SELECT id, amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-        expenses = c.fetchall()
+        expenses = repo.list_expenses()
         header = f"📋 All Expenses"
     
-    conn.close()
-    
     if not expenses:
         if filter_choice == "weekly":
             print("No expenses found in the last 7 days.")
@@ -583,11 +593,7 @@ def edit(
     """
     
     # Get all expenses first
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute("SELECT id, amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-    expenses = c.fetchall()
-    conn.close()
+    expenses = get_repository().list_expenses()
     
     if not expenses:
         print("❌ No expenses found to edit.")
@@ -742,15 +748,8 @@ def edit_single_expense(expense):
         return False
     
     # Apply changes
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute('''
-        UPDATE expenses 
-        SET amount = ?, category = ?, description = ?, timestamp = ?
-        WHERE id = ?
-    ''', (current_amount, current_category, current_description, current_timestamp, exp_id))
-    conn.commit()
-    conn.close()
+    get_repository().update_expense(exp_id, amount=current_amount, category=current_category,
+                                    description=current_description, timestamp=current_timestamp)
     print("✅ Changes saved successfully!")
     return True
 
@@ -878,28 +877,22 @@ def edit_apply_to_all(selected_expenses):
     
     # Apply changes to all expenses
     updated_count = 0
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
+    repo = get_repository()
     
-    for pos, expense_data in selected_expenses:
-        expense_id = expense_data[0]
-        current_amount, current_category, current_description, current_timestamp = expense_data[1:5]
-        
-        # Use new values or keep current ones
-        final_amount = validated_amount if validated_amount else current_amount
-        final_category = validated_category if validated_category else current_category
-        final_description = new_description if new_description else current_description
-        final_timestamp = validated_date if validated_date else current_timestamp
-        
-        c.execute('''
-            UPDATE expenses 
-            SET amount = ?, category = ?, description = ?, timestamp = ?
-            WHERE id = ?
-        ''', (final_amount, final_category, final_description, final_timestamp, expense_id))
-        updated_count += 1
-    
-    conn.commit()
-    conn.close()
+    with repo.transaction():
+        for pos, expense_data in selected_expenses:
+            expense_id = expense_data[0]
+            current_amount, current_category, current_description, current_timestamp = expense_data[1:5]
+            
+            # Use new values or keep current ones
+            repo.update_expense(
+                expense_id,
+                amount=validated_amount if validated_amount else current_amount,
+                category=validated_category if validated_category else current_category,
+                description=new_description if new_description else current_description,
+                timestamp=validated_date if validated_date else current_timestamp
+            )
+            updated_count += 1
     
     print(f"✅ Successfully applied changes to all {updated_count} expenses!")
     return True
@@ -982,17 +975,8 @@ def edit_bulk_field(selected_expenses):
         return False
     
     # Apply the bulk update
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    
     expense_ids = [expense_data[0] for pos, expense_data in selected_expenses]
-    placeholders = ','.join(['?'] * len(expense_ids))
-    
-    c.execute(f"UPDATE expenses SET {field_column} = ? WHERE id IN ({placeholders})", 
-              [validated_value] + expense_ids)
-    updated_count = c.rowcount
-    conn.commit()
-    conn.close()
+    updated_count = get_repository().update_expenses(expense_ids, **{field_column: validated_value})
     
     print(f"✅ Successfully updated {field_name} for {updated_count} expenses!")
     return True
@@ -1000,14 +984,15 @@ def edit_bulk_field(selected_expenses):
 
 @app.command()
 def search(
-    term: str = typer.Option("", help="Search term for description/category"),
+    term: str = typer.Option("", help='Words to find in description/category: coffee, star*, "oat milk"'),
     category: str = typer.Option("", help="Filter by category"),
     days: Optional[int] = typer.Option(None, help="Filter by days back"),
-    limit: int = typer.Option(20, help="Maximum number of results")
+    limit: int = typer.Option(20, help="Maximum number of results"),
+    fuzzy: bool = typer.Option(False, "--fuzzy", help="Match similar descriptions, not just exact words")
     ):
     """Search and filter expenses"""
     
-    expenses = search_expenses(term, category, days)
+    expenses = search_expenses(term, category, days, fuzzy)
     
     if not expenses:
         print("❌ No expenses found matching your criteria.")
@@ -1023,6 +1008,36 @@ def search(
         print(f"\n... and {len(expenses) - limit} more results")
     print("-" * 90)
 
+@app.command()
+def duplicates(
+    threshold: float = typer.Option(0.5, help="How similar descriptions must be (0-1)"),
+    days_apart: int = typer.Option(3, help="Maximum days between the two expenses")
+    ):
+    """Find expenses that look like the same purchase entered twice
+    
+    Pairs must have the same amount, be at most --days-apart days apart and
+    have similar descriptions. Use 'delete <position>' to remove one.
+    """
+    repo = get_repository()
+    expenses = repo.list_expenses()
+    pairs = repo.find_duplicate_pairs(threshold=threshold, window_days=days_apart)
+    
+    if not pairs:
+        print("✅ No likely duplicates found.")
+        return
+    
+    # Positions match the default listing used by edit/undo/delete
+    positions = {expense["id"]: position for position, expense in enumerate(expenses, 1)}
+    by_id = {expense["id"]: expense for expense in expenses}
+    
+    print(f"\n🔁 Possible Duplicates ({len(pairs)} pairs):")
+    print("-" * 100)
+    for first_id, second_id, score in pairs:
+        print(f"Similarity {score:.0%}")
+        for expense_id in (first_id, second_id):
+            print(f"  #{positions[expense_id]:<4} {format_expense_display(by_id[expense_id])}")
+    print("-" * 100)
+
 @app.command()
 def undo(position: int):
     """Undo the last edit made to an expense by position (1, 2, 3, etc.)"""
@@ -1033,22 +1048,12 @@ def undo(position: int):
         return
     print(f"🎯 Found expense at position {position} (ID: {expense_id})")
     
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
+    repo = get_repository()
     
     # Find the most recent backup for this expense
-    c.execute('''
-        SELECT backup_id, amount, category, description, timestamp, backup_timestamp
-        FROM expense_backups 
-        WHERE original_id = ? 
-        ORDER BY backup_timestamp DESC 
-        LIMIT 1
-    ''', (expense_id,))
-    
-    backup = c.fetchone()
+    backup = repo.latest_backup(expense_id)
     if not backup:
         print(f"❌ No backup found for expense {expense_id}")
-        conn.close()
         return
     
     backup_id, amount, category, description, timestamp, backup_time = backup
@@ -1060,21 +1065,10 @@ def undo(position: int):
     
     confirm = input("\n💾 Restore this backup? (y/n): ").lower()
     if confirm in ['y', 'yes']:
-        # Restore the expense
-        c.execute('''
-            UPDATE expenses 
-            SET amount = ?, category = ?, description = ?, timestamp = ?
-            WHERE id = ?
-        ''', (amount, category, description, timestamp, expense_id))
-        
-        # Remove the backup
-        c.execute("DELETE FROM expense_backups WHERE backup_id = ?", (backup_id,))
-        
-        conn.commit()
-        conn.close()
+        # Restore the expense and remove the backup
+        repo.restore_backup(expense_id, backup)
         print("✅ Expense restored successfully!")
     else:
-        conn.close()
         print("❌ Restore cancelled.")
 
 @app.command()
@@ -1087,27 +1081,22 @@ def delete(position: int):
         return
     print(f"🎯 Found expense at position {position} (ID: {expense_id})")
     
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
+    repo = get_repository()
     
     # First, check if the expense exists and get its details
-    c.execute("SELECT id, amount, category, description FROM expenses WHERE id = ?", (expense_id,))
-    expense = c.fetchone()
+    expense = repo.get_expense(expense_id)
     
     if not expense:
         print(f"❌ Expense with ID {expense_id} not found.")
-        conn.close()
         return
     
     # Show what we're about to delete
-    expense_id, amount, category, description = expense
+    expense_id, amount, category, description, _ = expense
     amount_str = f"${amount}" if amount else "No amount"
     print(f"🗑️  About to delete: {amount_str} | {category} | {description}")
     
     # Delete the expense
-    c.execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
-    conn.commit()
-    conn.close()
+    repo.delete_expense(expense_id)
     
     print(f"✅ Deleted expense {expense_id}")
 
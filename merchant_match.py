@@ -0,0 +1,228 @@
+"""
+Fuzzy matching of expense descriptions by trigram similarity
+
+The LLM parser words the same merchant differently from one day to the next
+("Trader Joe's", "trader joes", "Trader Joes groceries"), so exact and
+full-text matches miss them. Trigram similarity - the share of three-letter
+chunks two descriptions have in common, as in PostgreSQL's pg_trgm - treats
+those as close matches while keeping unrelated text apart.
+
+Used for:
+  - fuzzy search (SQLite builds a TrigramIndex; PostgreSQL uses pg_trgm)
+  - warning about a possible duplicate when an expense is added
+  - finding near-duplicate expenses across the whole history
+
+Abbreviations ("TJs") share too few trigrams to match and are out of scope.
+"""
+
+from collections import defaultdict, deque
+from datetime import date, datetime
+import math
+import re
+
+# pg_trgm's default word_similarity threshold: how much of a search term
+# must appear in a description for it to match
+DEFAULT_SIMILARITY = 0.6
+
+# Two expenses are possible duplicates when their amounts match, they're at
+# most DUPLICATE_WINDOW_DAYS apart and their descriptions are this similar
+DUPLICATE_SIMILARITY = 0.5
+DUPLICATE_WINDOW_DAYS = 3
+
+_APOSTROPHES = re.compile(r"['’`]")
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+def normalize_description(text: str) -> str:
+    """Lowercase words without punctuation; "Trader Joe's" -> "trader joes" """
+    text = _APOSTROPHES.sub("", (text or "").lower())
+    return " ".join(_NON_WORD.sub(" ", text).split())
+
+
+def trigrams(text: str) -> frozenset:
+    """pg_trgm-style trigrams: each word padded with two spaces in front and one behind"""
+    grams = set()
+    for word in normalize_description(text).split():
+        padded = f"  {word} "
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return frozenset(grams)
+
+
+def similarity(a, b) -> float:
+    """Shared trigrams over all trigrams (0-1); takes strings or trigram sets"""
+    a = a if isinstance(a, frozenset) else trigrams(a)
+    b = b if isinstance(b, frozenset) else trigrams(b)
+    if not a or not b:
+        return 0.0
+    shared = len(a & b)
+    return shared / (len(a) + len(b) - shared)
+
+
+def word_similarity(query, text) -> float:
+    """
+    Share of the query's trigrams found in text (0-1)
+
+    Unlike similarity(), a short query scores high against a long
+    description that contains it - the in-process counterpart of pg_trgm's
+    word_similarity() used for search.
+    """
+    query = query if isinstance(query, frozenset) else trigrams(query)
+    text = text if isinstance(text, frozenset) else trigrams(text)
+    if not query:
+        return 0.0
+    return len(query & text) / len(query)
+
+
+class TrigramIndex:
+    """Inverted index from trigram to the keys of the texts containing it"""
+
+    def __init__(self):
+        self._postings = defaultdict(list)
+        self._grams = {}
+
+    def __len__(self):
+        return len(self._grams)
+
+    def add(self, key, text):
+        grams = trigrams(text)
+        self._grams[key] = grams
+        for gram in grams:
+            self._postings[gram].append(key)
+
+    def search(self, text, threshold: float = DEFAULT_SIMILARITY, limit=None):
+        """
+        Keys of the indexed texts containing something like text, best match first
+
+        Scores are word_similarity(text, indexed text); only texts sharing at
+        least one trigram are ever looked at.
+
+        Returns:
+            List of (key, similarity)
+        """
+        grams = trigrams(text)
+        if not grams:
+            return []
+        shared = defaultdict(int)
+        for gram in grams:
+            for key in self._postings.get(gram, ()):
+                shared[key] += 1
+
+        matches = []
+        for key, count in shared.items():
+            score = count / len(grams)
+            if score >= threshold:
+                matches.append((key, score))
+        matches.sort(key=lambda match: match[1], reverse=True)
+        return matches[:limit] if limit else matches
+
+
+def rank_similar(text, rows, threshold: float = DEFAULT_SIMILARITY):
+    """
+    Rows whose description is similar to text, most similar first
+
+    Returns:
+        List of (row, similarity)
+    """
+    grams = trigrams(text)
+    scored = [(row, similarity(grams, trigrams(row["description"]))) for row in rows]
+    matches = [(row, score) for row, score in scored if score >= threshold]
+    matches.sort(key=lambda match: match[1], reverse=True)
+    return matches
+
+
+def _day(timestamp):
+    """Day number of a timestamp, or None if it's missing or unreadable"""
+    if isinstance(timestamp, str):
+        try:
+            timestamp = datetime.fromisoformat(timestamp)
+        except ValueError:
+            return None
+    if isinstance(timestamp, datetime):
+        return timestamp.date().toordinal()
+    if isinstance(timestamp, date):
+        return timestamp.toordinal()
+    return None
+
+
+def find_near_duplicates(rows, threshold: float = DUPLICATE_SIMILARITY,
+                         window_days: int = DUPLICATE_WINDOW_DAYS):
+    """
+    Pairs of expenses that look like the same purchase entered twice
+
+    Comparing every expense with every other is quadratic, so candidates are
+    narrowed three ways before any similarity is computed:
+      - only expenses with the same amount (to the cent) are compared, and
+        amounts that occur once are dropped before any text is looked at
+      - expenses are visited in date order and only those within
+        window_days of each other are kept in the index
+      - prefix filtering: each description is indexed under just its
+        |t| - ceil(threshold * |t|) + 1 rarest trigrams, which is provably
+        enough for any pair at or above threshold to share one
+
+    Args:
+        rows: Expense rows with id, amount, description and timestamp
+
+    Returns:
+        List of (id_a, id_b, similarity), most similar first
+    """
+    # Expenses whose amount occurs once can't have a duplicate and are skipped outright;
+    # so are those without a readable date, which can't be placed in the window
+    by_amount = defaultdict(list)
+    for row in rows:
+        day = _day(row["timestamp"])
+        if row["amount"] is not None and day is not None:
+            by_amount[round(float(row["amount"]) * 100)].append((day, row))
+
+    # Recurring purchases repeat descriptions, so trigrams and prefixes are worked out once per text
+    grams_by_text = {}
+    groups = []
+    frequency = defaultdict(int)
+    for group in by_amount.values():
+        if len(group) < 2:
+            continue
+        items = []
+        for day, row in group:
+            text = row["description"]
+            grams = grams_by_text.get(text)
+            if grams is None:
+                grams = grams_by_text[text] = trigrams(text)
+            if not grams:
+                continue
+            items.append((day, row["id"], text))
+            for gram in grams:
+                frequency[gram] += 1
+        if len(items) > 1:
+            items.sort()
+            groups.append(items)
+
+    # One global order, rarest trigram first, shared by every prefix
+    rarity = {gram: rank for rank, gram in enumerate(sorted(frequency, key=lambda gram: (frequency[gram], gram)))}
+    prefixes = {}
+
+    pairs = []
+    for items in groups:
+        # trigram -> deque of (day, id, trigrams) for this amount, oldest first
+        index = defaultdict(deque)
+        for day, expense_id, text in items:
+            grams = grams_by_text[text]
+            prefix = prefixes.get(text)
+            if prefix is None:
+                ordered = sorted(grams, key=rarity.__getitem__)
+                prefix = prefixes[text] = ordered[:len(ordered) - math.ceil(threshold * len(ordered)) + 1]
+
+            seen = set()
+            for gram in prefix:
+                postings = index[gram]
+                while postings and postings[0][0] < day - window_days:
+                    postings.popleft()
+                for _, other_id, other_grams in postings:
+                    if other_id in seen:
+                        continue
+                    seen.add(other_id)
+                    score = similarity(grams, other_grams)
+                    if score >= threshold:
+                        pairs.append((other_id, expense_id, score))
+                postings.append((day, expense_id, grams))
+
+    pairs.sort(key=lambda pair: pair[2], reverse=True)
+    return pairs
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+Versioned schema migrations for the expenses database.
+
+Works against both backends:
+  - the local SQLite database used by the CLI (expenses.db)
+  - the PostgreSQL database used by the API (DATABASE_URL)
+
+Applied versions are recorded in a schema_migrations table, so running this
+again only applies what is missing.
+
+Usage:
+    python migrate_schema.py              # migrate the local SQLite database
+    python migrate_schema.py --postgres   # migrate DATABASE_URL
+"""
+
+import sys
+import os
+from datetime import datetime
+
+from expense_rollup import (
+    SQLITE_ROLLUP_SCHEMA, POSTGRES_ROLLUP_SCHEMA, SQLITE_REBUILD, POSTGRES_REBUILD
+)
+from expense_search import SQLITE_SEARCH_SCHEMA, POSTGRES_SEARCH_SCHEMA, SQLITE_SEARCH_REBUILD
+from expense_export import SQLITE_UPDATED_AT_SCHEMA, POSTGRES_UPDATED_AT_SCHEMA
+from expense_sync import SQLITE_SYNC_SCHEMA, POSTGRES_SYNC_SCHEMA
+from storage import connect_sqlite
+
+# Each migration is (version, description, [statements]).
+# Never edit a migration once it has shipped - add a new version instead.
+
+POSTGRES_MIGRATIONS = [
+    (1, "native timestamp/numeric columns and range indexes", [
+        # Existing rows hold naive ISO strings; they're read in the session time zone
+        "ALTER TABLE expenses ALTER COLUMN timestamp TYPE TIMESTAMPTZ "
+        "USING NULLIF(timestamp, '')::timestamptz",
+        "ALTER TABLE expenses ALTER COLUMN amount TYPE NUMERIC(12, 2) "
+        "USING amount::numeric(12, 2)",
+        # The TEXT default can't be cast automatically, so swap it around the type change
+        "ALTER TABLE pantry_items ALTER COLUMN created_at DROP DEFAULT",
+        "ALTER TABLE pantry_items ALTER COLUMN created_at TYPE TIMESTAMPTZ "
+        "USING NULLIF(created_at, '')::timestamptz",
+        "ALTER TABLE pantry_items ALTER COLUMN created_at SET DEFAULT CURRENT_TIMESTAMP",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_category_timestamp ON expenses (category, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_timestamp_id ON expenses (timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_pantry_items_created_at ON pantry_items (created_at)",
+    ]),
+    (2, "daily category rollup maintained by triggers",
+        POSTGRES_ROLLUP_SCHEMA + POSTGRES_REBUILD),
+    (3, "full-text search vector on expenses", POSTGRES_SEARCH_SCHEMA),
+    (4, "trigram index on expense descriptions", [
+        "CREATE EXTENSION IF NOT EXISTS pg_trgm",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_description_trgm "
+        "ON expenses USING GIN (description gin_trgm_ops)",
+    ]),
+    (5, "updated_at change times on expenses and pantry_items", POSTGRES_UPDATED_AT_SCHEMA),
+    (6, "change sequence and delete tombstones for sync", POSTGRES_SYNC_SCHEMA),
+]
+
+SQLITE_MIGRATIONS = [
+    # SQLite has no native timestamp type and can't change column types in place.
+    # ISO-8601 TEXT is its documented date format and sorts chronologically,
+    # so only the indexes are needed here.
+    (1, "range indexes on expenses and pantry_items", [
+        "CREATE INDEX IF NOT EXISTS idx_expenses_category_timestamp ON expenses (category, timestamp)",
+        "CREATE INDEX IF NOT EXISTS idx_expenses_timestamp_id ON expenses (timestamp, id)",
+        "CREATE INDEX IF NOT EXISTS idx_pantry_items_created_at ON pantry_items (created_at)",
+    ]),
+    (2, "daily category rollup maintained by triggers",
+        SQLITE_ROLLUP_SCHEMA + SQLITE_REBUILD),
+    (3, "full-text search index on expenses",
+        SQLITE_SEARCH_SCHEMA + SQLITE_SEARCH_REBUILD),
+    (4, "updated_at change times on expenses and pantry_items", SQLITE_UPDATED_AT_SCHEMA),
+    (5, "change sequence and delete tombstones for sync", SQLITE_SYNC_SCHEMA),
+]
+
+
+def ensure_migrations_table(conn):
+    """Create the schema_migrations bookkeeping table if needed"""
+    c = conn.cursor()
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            description TEXT,
+            applied_at TEXT
+        )
+    ''')
+    conn.commit()
+
+
+def get_applied_versions(conn):
+    """Return the set of migration versions already applied"""
+    c = conn.cursor()
+    c.execute("SELECT version FROM schema_migrations")
+    return {row[0] if not isinstance(row, dict) else row["version"] for row in c.fetchall()}
+
+
+def run_migrations(conn, migrations, placeholder, begin=None):
+    """
+    Apply any pending migrations in version order, one transaction each
+
+    A migration's statements and its schema_migrations row commit together,
+    so a failure partway through leaves the database at the previous version
+    and the migration can simply be run again.
+
+    Args:
+        conn: Open SQLite or psycopg2 connection
+        migrations: List of (version, description, statements)
+        placeholder: Parameter placeholder for the backend ('?' or '%s')
+        begin: Statement opening each transaction, for drivers that don't
+            open one before DDL themselves (Python's sqlite3 runs CREATE and
+            ALTER in autocommit mode unless a transaction is already open)
+
+    Returns:
+        List of versions that were applied
+    """
+    ensure_migrations_table(conn)
+    applied = get_applied_versions(conn)
+    newly_applied = []
+
+    for version, description, statements in sorted(migrations, key=lambda m: m[0]):
+        if version in applied:
+            continue
+
+        print(f"Applying migration {version}: {description}")
+        c = conn.cursor()
+        try:
+            if begin:
+                c.execute(begin)
+            for statement in statements:
+                c.execute(statement)
+            c.execute(
+                f"INSERT INTO schema_migrations (version, description, applied_at) "
+                f"VALUES ({placeholder}, {placeholder}, {placeholder})",
+                (version, description, datetime.now().isoformat())
+            )
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            print(f"Migration {version} failed, rolled back")
+            raise
+        newly_applied.append(version)
+
+    return newly_applied
+
+
+def migrate_sqlite(conn):
+    """Bring a SQLite database up to the latest schema version"""
+    return run_migrations(conn, SQLITE_MIGRATIONS, '?', begin="BEGIN")
+
+
+def migrate_postgres(conn):
+    """Bring a PostgreSQL database up to the latest schema version"""
+    return run_migrations(conn, POSTGRES_MIGRATIONS, '%s')
+
+
+if __name__ == "__main__":
+    if "--postgres" in sys.argv:
+        import psycopg2
+
+        DATABASE_URL = os.getenv('DATABASE_URL')
+        if not DATABASE_URL:
+            print("Error: DATABASE_URL environment variable not set")
+            exit(1)
+        conn = psycopg2.connect(DATABASE_URL)
+        applied = migrate_postgres(conn)
+    else:
+        conn = connect_sqlite()
+        applied = migrate_sqlite(conn)
+
+    conn.close()
+    if applied:
+        print(f"Applied migrations: {applied}")
+    else:
+        print("Schema already up to date")
@@ -0,0 +1,69 @@
+"""
+Persistent cache of LLM expense parses
+
+Recurring purchases ("coffee $4.50") shouldn't cost a fresh LLM call each
+time. Parsed results are stored in a parse_cache table in expenses.db (read
+and written through the thread's local repository), keyed on a normalized
+form of the input:
+  - lowercased, whitespace collapsed, trailing punctuation dropped
+  - amounts written the same way ("$4.5" == "$4.50")
+  - date references removed, so "coffee $4.50 yesterday" and "coffee $4.50 on
+    6/27/2025" share an entry; the date is re-parsed from the actual input
+
+Each entry records the prompt version it was produced with; entries from an
+older prompt template or model are ignored and purged. The table is capped at
+PARSE_CACHE_MAX_ENTRIES, evicting the least recently used rows.
+"""
+
+import hashlib
+import json
+import re
+
+from rule_based_parser import DATE_SPANS, RELATIVE_DATE_PHRASES
+from storage import get_repository
+
+PARSE_CACHE_MAX_ENTRIES = 5000
+
+_NUMBER = re.compile(r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?")
+
+
+def prompt_version(*templates):
+    """Fingerprint of the prompt templates and model that produced a parse"""
+    return hashlib.sha256("\x00".join(templates).encode()).hexdigest()[:16]
+
+
+def normalize_input(natural_input: str) -> str:
+    """Reduce an expense description to its cache key form"""
+    text = natural_input.lower()
+    text = DATE_SPANS.sub(" ", text)
+    text = RELATIVE_DATE_PHRASES.sub(" ", text)
+    text = _NUMBER.sub(lambda m: f"{float(m.group().replace(',', '')):.2f}", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .,!;:")
+
+
+def get_cached_parse(natural_input: str, version: str):
+    """Return the cached parse (dict or list) for this input, or None"""
+    result = get_repository().get_cached_parse(normalize_input(natural_input), version)
+    return json.loads(result) if result is not None else None
+
+
+def store_parse(natural_input: str, result, version: str):
+    """Cache a successful parse (without its date, which is input-specific)"""
+    if isinstance(result, list):
+        cacheable = [{k: v for k, v in entry.items() if k != 'parsed_date'} for entry in result]
+    else:
+        cacheable = {k: v for k, v in result.items() if k != 'parsed_date'}
+    get_repository().store_cached_parse(
+        normalize_input(natural_input), json.dumps(cacheable), version, PARSE_CACHE_MAX_ENTRIES
+    )
+
+
+def invalidate_parse_cache(current_version=None):
+    """
+    Drop cached parses - all of them, or only those not matching current_version
+
+    Call this when the prompt templates or model change (parse_expense does it
+    automatically for stale versions on first use).
+    """
+    return get_repository().delete_cached_parses(current_version)
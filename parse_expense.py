@@ -1,30 +1,119 @@
-import requests
 import json
 import warnings
 import re
+import threading
+from collections import Counter
 from datetime import datetime, timedelta
+from rule_based_parser import parse_expense_rules, FAST_PATH_CONFIDENCE_THRESHOLD
+import parse_cache
+from llm_client import get_llm_client, LLM_MODEL, PRIORITY_INTERACTIVE
 from urllib3.exceptions import NotOpenSSLWarning
 warnings.simplefilter("ignore", NotOpenSSLWarning)
 
-def query_llm(prompt: str):
-    res = requests.post(
-        "http://localhost:11434/api/generate",
-        json={"model": "gemma3n:e2b", "prompt": prompt, "stream": False}
-    )
-    
-    # Check if the request was successful
-    if res.status_code != 200:
-        print(f"⚠️ LLM server error (status {res.status_code}): {res.text}")
-        raise Exception(f"LLM server returned status {res.status_code}")
-    
-    response_data = res.json()
-    
-    # Check if the response has the expected structure
-    if "response" not in response_data:
-        print(f"⚠️ Unexpected response structure: {response_data}")
-        raise Exception("LLM response missing 'response' key")
-    
-    return response_data["response"]
+# Prompt templates (filled with str.format, so literal braces are doubled).
+# The parse cache keys on a hash of these, so editing them invalidates it.
+SINGLE_EXPENSE_PROMPT = """
+        You are an expert expense parser. Parse this natural language expense description into structured data.
+
+        Input: "{natural_input}"
+
+        Instructions:
+        1. Extract the EXACT dollar amount mentioned (no estimation)
+        2. Determine the most appropriate category from the input and sort into ONLY the following categories: amazon, transportation, groceries, entertainment, fashion, travel, food, monthly, personal. DO NOT CREATE NEW CATEGORIES.
+        3. Create a clear, concise description including relevant details like store names, items, etc.
+        4. If a date/time reference is mentioned (like "last week", "yesterday"), note it but don't include it in the description
+
+        Return ONLY valid JSON in this exact format:
+        {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
+
+        Examples:
+        - "I spent $20 on groceries at trader joes last week" → {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
+        - "bought coffee for $4.50 this morning" → {{"amount": 4.50, "category": "food", "description": "coffee"}}
+        - "$38 COS, T Shirt" → {{"amount": 38.00, "category": "fashion", "description": "COS, T Shirt"}}
+        - "$235 KLM, Flight Ticket" → {{"amount": 235.00, "category": "travel", "description": "KLM, Flight Ticket"}}
+        - "$8 Amazon, Method Body Soap" → {{"amount": 8.00, "category": "amazon", "description": "Method Body Soap"}}
+        """
+
+MULTIPLE_EXPENSE_PROMPT = """
+        You are an expert expense parser. Parse this natural language description that may contain MULTIPLE expenses.
+
+        Input: "{natural_input}"
+
+        Instructions:
+        1. Identify ALL separate expenses mentioned in the input
+        2. For each expense, extract the EXACT dollar amount (no estimation)
+        3. Determine the most appropriate category from the input and sort into ONLY the following categories: amazon, transportation, groceries, entertainment, fashion, travel, food, monthly, personal. DO NOT CREATE NEW CATEGORIES.
+        4. If a date/time reference is mentioned, it applies to all expenses
+
+        Return ONLY valid JSON array in this exact format:
+            [
+                {{"amount": 20.00, "category": "groceries", "description": "groceries"}},
+                {{"amount": 5.00, "category": "coffee", "description": "coffee"}}
+            ]
+
+        If only ONE expense is found, still return an array with one item.
+
+    Examples:
+            - "I spent $20 on groceries at trader joes last week" → {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
+            - "bought coffee for $4.50 this morning" → {{"amount": 4.50, "category": "food", "description": "coffee"}}
+            - "$38 COS, T Shirt" → {{"amount": 38.00, "category": "fashion", "description": "COS, T Shirt"}}
+            - "$235 KLM, Flight Ticket" → {{"amount": 235.00, "category": "travel", "description": "KLM, Flight Ticket"}}
+            - "$8 Amazon, Method Body Soap" → {{"amount": 8.00, "category": "amazon", "description": "Method Body Soap"}}
+            """
+
+BATCH_EXPENSE_PROMPT = """
+        You are an expert expense parser. Parse each numbered line below into structured data.
+
+        Inputs:
+{numbered_inputs}
+
+        Instructions:
+        1. Treat every numbered line as a separate input
+        2. For each expense, extract the EXACT dollar amount (no estimation)
+        3. Determine the most appropriate category and sort into ONLY the following categories: amazon, transportation, groceries, entertainment, fashion, travel, food, monthly, personal. DO NOT CREATE NEW CATEGORIES.
+        4. Create a clear, concise description; leave date/time references out of it
+        5. Set "index" to the number of the line the expense came from. If one line has several expenses, return one object per expense with the same index
+
+        Return ONLY a valid JSON array in this exact format:
+            [
+                {{"index": 1, "amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}},
+                {{"index": 2, "amount": 4.50, "category": "food", "description": "coffee"}}
+            ]
+            """
+
+# Batch prompts stay under both limits; larger batches are split
+BATCH_PARSE_MAX_ITEMS = 20
+BATCH_PARSE_MAX_CHARS = 4000
+# Batch attempts per input before it is reported as failed
+BATCH_PARSE_MAX_ATTEMPTS = 2
+
+# Cached parses are only reused while the prompts and model are unchanged
+PARSE_PROMPT_VERSION = parse_cache.prompt_version(
+    SINGLE_EXPENSE_PROMPT, MULTIPLE_EXPENSE_PROMPT, BATCH_EXPENSE_PROMPT, LLM_MODEL
+)
+_stale_parses_purged = False
+
+# How often each parser tier handled an input
+# ("rules" = fast path, "cache" = earlier LLM parse, "llm" = single model call, "llm_batch" = batched model call)
+parse_tier_counts = Counter()
+_parse_tier_lock = threading.Lock()
+
+def record_parse_tier(tier: str):
+    with _parse_tier_lock:
+        parse_tier_counts[tier] += 1
+
+def get_parse_tier_stats():
+    """Counts of inputs handled by each parser tier"""
+    with _parse_tier_lock:
+        return dict(parse_tier_counts)
+
+def query_llm(prompt: str, priority: int = PRIORITY_INTERACTIVE):
+    """Send a prompt through the shared LLM client and return the full response"""
+    return get_llm_client().generate(prompt, priority=priority)
+
+def stream_llm(prompt: str, priority: int = PRIORITY_INTERACTIVE):
+    """Yield the LLM's response token by token as Ollama generates it"""
+    yield from get_llm_client().stream(prompt, priority=priority)
 
 def parse_absolute_date(text: str):
     """Parse absolute dates in various formats"""
@@ -98,7 +187,50 @@ def parse_date(text: str):
     if absolute_date:
         return absolute_date
 
+def get_cached_parse(natural_input: str):
+    """Earlier LLM parse of the same (normalized) input, with this input's date applied"""
+    global _stale_parses_purged
+    try:
+        if not _stale_parses_purged:
+            parse_cache.invalidate_parse_cache(PARSE_PROMPT_VERSION)
+            _stale_parses_purged = True
+        cached = parse_cache.get_cached_parse(natural_input, PARSE_PROMPT_VERSION)
+    except Exception as e:
+        print(f"⚠️ Parse cache unavailable: {e}")
+        return None
+    if cached is None:
+        return None
+    
+    parsed_date = parse_date(natural_input)
+    if parsed_date:
+        for entry in (cached if isinstance(cached, list) else [cached]):
+            entry['parsed_date'] = parsed_date
+    return cached
+
+def remember_parse(natural_input: str, result):
+    """Store a successful LLM parse for reuse"""
+    try:
+        parse_cache.store_parse(natural_input, result, PARSE_PROMPT_VERSION)
+    except Exception as e:
+        print(f"⚠️ Could not cache parse: {e}")
+
 def parse_expense(natural_input: str):
+    # Fast path: short, formulaic inputs don't need the LLM
+    rule_result = parse_expense_rules(natural_input)
+    if rule_result and rule_result['confidence'] >= FAST_PATH_CONFIDENCE_THRESHOLD:
+        record_parse_tier('rules')
+        parsed_date = parse_date(natural_input)
+        if parsed_date:
+            rule_result['parsed_date'] = parsed_date
+        return rule_result
+    
+    # Recurring inputs reuse an earlier LLM parse
+    cached = get_cached_parse(natural_input)
+    if cached is not None:
+        record_parse_tier('cache')
+        return cached
+    record_parse_tier('llm')
+    
     # Check if the input might contain multiple expenses
     multiple_indicators = ['and', '&', 'also', 'plus', 'then']
     might_be_multiple = any(indicator in natural_input.lower() for indicator in multiple_indicators)
@@ -110,34 +242,16 @@ def parse_expense(natural_input: str):
         print("🔍 Attempting to parse multiple expenses...")
         multiple_results = parse_multiple_expenses(natural_input)
         if multiple_results and len(multiple_results) > 1:
+            remember_parse(natural_input, multiple_results)
             return multiple_results  # Return list for multiple expenses
         elif multiple_results and len(multiple_results) == 1:
+            remember_parse(natural_input, multiple_results[0])
             return multiple_results[0]  # Return single object for one expense
     
     # Fallback to single expense parsing
     parsed_date = parse_date(natural_input)
     
-    prompt = f"""
-        You are an expert expense parser. Parse this natural language expense description into structured data.
-
-        Input: "{natural_input}"
-
-        Instructions:
-        1. Extract the EXACT dollar amount mentioned (no estimation)
-        2. Determine the most appropriate category from the input and sort into ONLY the following categories: amazon, transportation, groceries, entertainment, fashion, travel, food, monthly, personal. DO NOT CREATE NEW CATEGORIES.
-        3. Create a clear, concise description including relevant details like store names, items, etc.
-        4. If a date/time reference is mentioned (like "last week", "yesterday"), note it but don't include it in the description
-
-        Return ONLY valid JSON in this exact format:
-        {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
-
-        Examples:
-        - "I spent $20 on groceries at trader joes last week" → {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
-        - "bought coffee for $4.50 this morning" → {{"amount": 4.50, "category": "food", "description": "coffee"}}
-        - "$38 COS, T Shirt" → {{"amount": 38.00, "category": "fashion", "description": "COS, T Shirt"}}
-        - "$235 KLM, Flight Ticket" → {{"amount": 235.00, "category": "travel", "description": "KLM, Flight Ticket"}}
-        - "$8 Amazon, Method Body Soap" → {{"amount": 8.00, "category": "amazon", "description": "Method Body Soap"}}
-        """
+    prompt = SINGLE_EXPENSE_PROMPT.format(natural_input=natural_input)
     
     response = query_llm(prompt)
     
@@ -178,6 +292,7 @@ def parse_expense(natural_input: str):
             result['parsed_date'] = parsed_date
             print(f"🔍 Parsed date: {parsed_date}")
         
+        remember_parse(natural_input, result)
         return result
         
     except Exception as e:
@@ -200,32 +315,7 @@ def parse_multiple_expenses(natural_input: str):
         """Parse multiple expenses from a single input like 'I spent $20 on groceries and $5 on coffee'"""
         parsed_date = parse_date(natural_input)
         
-        prompt = f"""
-        You are an expert expense parser. Parse this natural language description that may contain MULTIPLE expenses.
-
-        Input: "{natural_input}"
-
-        Instructions:
-        1. Identify ALL separate expenses mentioned in the input
-        2. For each expense, extract the EXACT dollar amount (no estimation)
-        3. Determine the most appropriate category from the input and sort into ONLY the following categories: amazon, transportation, groceries, entertainment, fashion, travel, food, monthly, personal. DO NOT CREATE NEW CATEGORIES.
-        4. If a date/time reference is mentioned, it applies to all expenses
-
-        Return ONLY valid JSON array in this exact format:
-            [
-                {{"amount": 20.00, "category": "groceries", "description": "groceries"}},
-                {{"amount": 5.00, "category": "coffee", "description": "coffee"}}
-            ]
-
-        If only ONE expense is found, still return an array with one item.
-
-    Examples:
-            - "I spent $20 on groceries at trader joes last week" → {{"amount": 20.00, "category": "groceries", "description": "groceries at Trader Joe's"}}
-            - "bought coffee for $4.50 this morning" → {{"amount": 4.50, "category": "food", "description": "coffee"}}
-            - "$38 COS, T Shirt" → {{"amount": 38.00, "category": "fashion", "description": "COS, T Shirt"}}
-            - "$235 KLM, Flight Ticket" → {{"amount": 235.00, "category": "travel", "description": "KLM, Flight Ticket"}}
-            - "$8 Amazon, Method Body Soap" → {{"amount": 8.00, "category": "amazon", "description": "Method Body Soap"}}
-            """
+        prompt = MULTIPLE_EXPENSE_PROMPT.format(natural_input=natural_input)
         
         response = query_llm(prompt)
         
@@ -266,4 +356,133 @@ def parse_multiple_expenses(natural_input: str):
         except Exception as e:
             print("⚠️ Failed to parse multiple expenses response:", response)
             print("⚠️ Error:", str(e))
-            return None
\ No newline at end of file
+            return None
+
+def chunk_for_batch_prompt(items):
+    """Split (position, text) items into groups that fit the batch prompt limits"""
+    batch, batch_chars = [], 0
+    for item in items:
+        item_chars = len(item[1])
+        if batch and (len(batch) >= BATCH_PARSE_MAX_ITEMS or batch_chars + item_chars > BATCH_PARSE_MAX_CHARS):
+            yield batch
+            batch, batch_chars = [], 0
+        batch.append(item)
+        batch_chars += item_chars
+    if batch:
+        yield batch
+
+def query_llm_batch(texts):
+    """
+    Parse several inputs in one LLM call
+    
+    Returns:
+        dict mapping 0-based position in `texts` -> list of validated expenses;
+        inputs the model skipped or got wrong are simply missing
+    """
+    numbered_inputs = "\n".join(
+        f'        {i}. "{text}"' for i, text in enumerate(texts, 1)
+    )
+    response = query_llm(BATCH_EXPENSE_PROMPT.format(numbered_inputs=numbered_inputs))
+    
+    # Remove markdown code blocks if present
+    if "```" in response:
+        response = response.replace("```json", "").replace("```", "").strip()
+    
+    # Try to extract just the JSON part - find first [ and last ]
+    start = response.find('[')
+    end = response.rfind(']')
+    if start != -1 and end != -1 and end > start:
+        response = response[start:end+1]
+    
+    try:
+        results = json.loads(response)
+    except json.JSONDecodeError as e:
+        print("⚠️ Failed to parse batch response:", response)
+        print("⚠️ Error:", str(e))
+        return {}
+    if not isinstance(results, list):
+        results = [results]
+    
+    parsed = {}
+    for result in results:
+        if not isinstance(result, dict):
+            continue
+        try:
+            position = int(result.pop('index')) - 1
+        except (KeyError, TypeError, ValueError):
+            continue
+        if not 0 <= position < len(texts):
+            continue
+        if not isinstance(result.get('amount'), (int, float)) or result['amount'] <= 0:
+            continue
+        if not result.get('category'):
+            result['category'] = 'personal'
+        if not result.get('description'):
+            result['description'] = texts[position][:50]
+        parsed.setdefault(position, []).append(result)
+    return parsed
+
+def parse_expenses_batch(inputs):
+    """
+    Parse many natural-language expenses, packing the LLM work into few calls
+    
+    Each input first goes through the rule-based fast path and the parse cache;
+    only the rest reach the LLM, several per prompt. Inputs the model misses are
+    retried (alone with the other misses) up to BATCH_PARSE_MAX_ATTEMPTS times.
+    
+    Returns:
+        A list aligned with `inputs`: each item is a dict (one expense), a list
+        (several expenses in one input) or None if it couldn't be parsed
+    """
+    results = [None] * len(inputs)
+    pending = []
+    
+    for position, natural_input in enumerate(inputs):
+        rule_result = parse_expense_rules(natural_input)
+        if rule_result and rule_result['confidence'] >= FAST_PATH_CONFIDENCE_THRESHOLD:
+            record_parse_tier('rules')
+            parsed_date = parse_date(natural_input)
+            if parsed_date:
+                rule_result['parsed_date'] = parsed_date
+            results[position] = rule_result
+            continue
+        
+        cached = get_cached_parse(natural_input)
+        if cached is not None:
+            record_parse_tier('cache')
+            results[position] = cached
+            continue
+        
+        pending.append((position, natural_input))
+    
+    for attempt in range(BATCH_PARSE_MAX_ATTEMPTS):
+        if not pending:
+            break
+        if attempt:
+            print(f"🔄 Retrying {len(pending)} unparsed inputs...")
+        
+        failed = []
+        for batch in chunk_for_batch_prompt(pending):
+            try:
+                parsed = query_llm_batch([text for _, text in batch])
+            except Exception as e:
+                print(f"⚠️ Batch parse failed: {e}")
+                parsed = {}
+            
+            for batch_position, (position, natural_input) in enumerate(batch):
+                expenses = parsed.get(batch_position)
+                if not expenses:
+                    failed.append((position, natural_input))
+                    continue
+                record_parse_tier('llm_batch')
+                result = expenses if len(expenses) > 1 else expenses[0]
+                remember_parse(natural_input, result)
+                
+                parsed_date = parse_date(natural_input)
+                if parsed_date:
+                    for expense in expenses:
+                        expense['parsed_date'] = parsed_date
+                results[position] = result
+        pending = failed
+    
+    return results
@@ -1,8 +1,18 @@
 #!/usr/bin/env python3
 """
 Script to recategorize all pantry items in the database using the latest categorization logic.
+
+Each distinct item name is categorized once, however many items share it,
+and only items whose grocery type actually changes are written, in a single
+batched UPDATE. Re-running after a keyword change therefore costs one read
+of the pantry plus one write of the differences.
+
+Usage:
+    python recategorize_all_pantry_items.py              # local SQLite database
+    python recategorize_all_pantry_items.py --postgres   # database in DATABASE_URL
+    python recategorize_all_pantry_items.py --preview    # show changes without saving
 """
-import sqlite3
+from collections import Counter, defaultdict
 import sys
 import os
 
@@ -10,36 +20,96 @@ import os
 sys.path.append(os.path.join(os.path.dirname(__file__), 'api'))
 from api.utils.grocery_categories import categorize_grocery_item_rule_based
 
-def recategorize_all_pantry_items():
-    db_path = os.path.join(os.path.dirname(__file__), 'expenses.db')
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
+# Progress is reported after every PROGRESS_EVERY distinct names
+PROGRESS_EVERY = 5000
+
+
+def recategorize_pantry_items(repo, categorize=categorize_grocery_item_rule_based, preview=False,
+                              progress=None):
+    """
+    Recompute every pantry item's grocery type and save the ones that changed
+
+    Args:
+        repo: ExpenseRepository for the database to update
+        categorize: Function from item name to grocery type
+        preview: Work out the changes without writing them
+        progress: Optional callback(names_done, names_total)
+
+    Returns:
+        (item_count, changes) - changes is a list of (item_id, name, old_type, new_type)
+    """
+    items = repo.list_pantry_types()
+
+    ids_by_name = defaultdict(list)
+    current_types = {}
+    for row in items:
+        ids_by_name[row["name"]].append(row["id"])
+        current_types[row["id"]] = row["grocery_type"]
+
+    changes = []
+    for done, (name, item_ids) in enumerate(ids_by_name.items(), 1):
+        new_type = categorize(name)
+        for item_id in item_ids:
+            if current_types[item_id] != new_type:
+                changes.append((item_id, name, current_types[item_id], new_type))
+        if progress and (done % PROGRESS_EVERY == 0 or done == len(ids_by_name)):
+            progress(done, len(ids_by_name))
+
+    if changes and not preview:
+        with repo.transaction():
+            repo.update_pantry_types((item_id, new_type) for item_id, _, _, new_type in changes)
+    return len(items), changes
+
+
+def print_progress(done, total):
+    print(f"\r  Categorized {done}/{total} distinct names", end="\n" if done == total else "", flush=True)
+
+
+def open_repository():
+    """Repository for DATABASE_URL with --postgres, otherwise the local database"""
+    if "--postgres" in sys.argv:
+        import psycopg2
+        from psycopg2.extras import RealDictCursor
+        from storage import PostgresRepository
+
+        DATABASE_URL = os.getenv('DATABASE_URL')
+        if not DATABASE_URL:
+            print("Error: DATABASE_URL environment variable not set")
+            exit(1)
+        return PostgresRepository(psycopg2.connect(DATABASE_URL, cursor_factory=RealDictCursor))
+
+    from storage import SQLiteRepository
+    return SQLiteRepository()
+
+
+def run(categorize, preview=False):
+    """Recategorize the pantry of the selected database and print a summary"""
+    repo = open_repository()
     try:
-        c.execute('SELECT id, name, grocery_type FROM pantry_items')
-        items = c.fetchall()
-        print(f"Found {len(items)} pantry items to recategorize...")
+        item_count, changes = recategorize_pantry_items(repo, categorize, preview, progress=print_progress)
+        print(f"Checked {item_count} pantry items.")
         print("=" * 80)
-        changes = []
-        for item_id, name, current_category in items:
-            new_category = categorize_grocery_item_rule_based(name)
-            if new_category != current_category:
-                c.execute('UPDATE pantry_items SET grocery_type = ? WHERE id = ?', (new_category, item_id))
-                changes.append({'name': name, 'old': current_category, 'new': new_category})
-        conn.commit()
-        print(f"Recategorization complete. {len(changes)} items updated.")
+        if preview:
+            print(f"Preview: {len(changes)} items would change (nothing saved).")
+        else:
+            print(f"Recategorization complete. {len(changes)} items updated.")
+
         if changes:
             print("\nSummary of changes:")
-            for change in changes:
-                print(f"- {change['name']}: {change['old']} → {change['new']}")
-        print("\nFinal category distribution:")
-        c.execute('SELECT grocery_type, COUNT(*) FROM pantry_items GROUP BY grocery_type ORDER BY COUNT(*) DESC')
-        for cat, count in c.fetchall():
-            print(f"  {cat}: {count}")
+            moves = Counter((old, new) for _, _, old, new in changes)
+            for (old, new), count in moves.most_common():
+                print(f"  {old} → {new}: {count}")
+
+        if not preview:
+            print("\nFinal category distribution:")
+            for row in repo.count_pantry_types():
+                print(f"  {row['grocery_type']}: {row['count']}")
     except Exception as e:
         print(f"Error: {e}")
-        conn.rollback()
+        repo.rollback()
     finally:
-        conn.close()
+        repo.close()
+
 
 if __name__ == "__main__":
-    recategorize_all_pantry_items() 
\ No newline at end of file
+    run(categorize_grocery_item_rule_based, preview="--preview" in sys.argv)
@@ -18,14 +18,14 @@ Options:
     --interactive        Interactive mode to select ingredients
 """
 
-import sqlite3
-import requests
+from llm_client import get_llm_client, PRIORITY_BACKGROUND, LLMBusyError, LLMConnectionError, LLMTimeoutError
 import json
 import argparse
 import sys
 import os
 from datetime import datetime
 from typing import List, Dict, Optional
+from storage import SQLITE_DB_PATH, get_repository
 import warnings
 from urllib3.exceptions import NotOpenSSLWarning
 warnings.simplefilter("ignore", NotOpenSSLWarning)
@@ -34,40 +34,23 @@ def query_llm(prompt: str) -> str:
     """Query the local Gemma3n LLM with retry logic"""
     max_retries = 3
     timeout = 60  # Increased timeout
+    client = get_llm_client()
     
     for attempt in range(max_retries):
         try:
             print(f"🤖 Attempting LLM request (attempt {attempt + 1}/{max_retries})...")
-            res = requests.post(
-                "http://localhost:11434/api/generate",
-                json={"model": "gemma3n:e2b", "prompt": prompt, "stream": False},
-                timeout=timeout
-            )
+            # Recommendations are requested interactively, but yield to expense parsing
+            return client.generate(prompt, priority=PRIORITY_BACKGROUND, timeout=timeout)
             
-            if res.status_code != 200:
-                print(f"⚠️ LLM server error (status {res.status_code}): {res.text}")
-                if attempt < max_retries - 1:
-                    print("🔄 Retrying...")
-                    continue
-                raise Exception(f"LLM server returned status {res.status_code}")
-            
-            response_data = res.json()
-            
-            if "response" not in response_data:
-                print(f"⚠️ Unexpected response structure: {response_data}")
-                if attempt < max_retries - 1:
-                    print("🔄 Retrying...")
-                    continue
-                raise Exception("LLM response missing 'response' key")
-            
-            return response_data["response"]
-            
-        except requests.exceptions.ConnectionError:
+        except LLMBusyError:
+            # Retrying straight away would only add to the backlog
+            raise Exception("LLM server is busy. Try again in a moment.")
+        except LLMConnectionError:
             if attempt < max_retries - 1:
                 print("🔄 Connection failed, retrying...")
                 continue
             raise Exception("Cannot connect to LLM server. Make sure Ollama is running with the gemma3n:e2b model.")
-        except requests.exceptions.Timeout:
+        except LLMTimeoutError:
             if attempt < max_retries - 1:
                 print(f"🔄 Request timed out after {timeout}s, retrying...")
                 continue
@@ -82,43 +65,19 @@ def query_llm(prompt: str) -> str:
 
 def get_pantry_items(show_all: bool = False) -> List[Dict]:
     """Get current pantry items from the database"""
-    db_path = os.path.join(os.path.dirname(__file__), 'expenses.db')
-    
-    if not os.path.exists(db_path):
+    if not os.path.exists(SQLITE_DB_PATH):
         raise Exception("Database not found. Make sure you're running this from the project root directory.")
     
-    conn = sqlite3.connect(db_path)
-    c = conn.cursor()
-    
-    try:
-        if show_all:
-            c.execute('''
-                SELECT name, quantity, unit, grocery_type, is_consumed
-                FROM pantry_items
-                ORDER BY grocery_type, name
-            ''')
-        else:
-            c.execute('''
-                SELECT name, quantity, unit, grocery_type, is_consumed
-                FROM pantry_items
-                WHERE is_consumed = FALSE AND quantity > 0
-                ORDER BY grocery_type, name
-            ''')
-        
-        items = []
-        for row in c.fetchall():
-            name, quantity, unit, grocery_type, is_consumed = row
-            items.append({
-                'name': name,
-                'quantity': quantity,
-                'unit': unit,
-                'category': grocery_type or 'other',
-                'is_consumed': bool(is_consumed)
-            })
-        
-        return items
-    finally:
-        conn.close()
+    return [
+        {
+            'name': row['name'],
+            'quantity': row['quantity'],
+            'unit': row['unit'],
+            'category': row['grocery_type'] or 'other',
+            'is_consumed': bool(row['is_consumed'])
+        }
+        for row in get_repository().list_pantry_items(include_consumed=show_all)
+    ]
 
 def format_pantry_for_llm(items: List[Dict]) -> str:
     """Format pantry items for LLM prompt"""
@@ -0,0 +1,226 @@
+"""
+Rule-based expense parser - the fast path in front of the LLM
+
+Most expenses are short and formulaic ("$38 COS, T Shirt", "coffee $4.50"),
+and a regex plus a merchant/keyword table parses them in microseconds instead
+of a multi-second LLM call. Every result carries a confidence score;
+parse_expense() only falls back to the LLM when it is below the threshold.
+"""
+
+import re
+
+# Results at or above this confidence skip the LLM entirely
+FAST_PATH_CONFIDENCE_THRESHOLD = 0.8
+
+# Known merchants: lowercase match text -> (display name, category)
+MERCHANTS = {
+    # Groceries
+    "trader joe's": ("Trader Joe's", "groceries"),
+    "trader joes": ("Trader Joe's", "groceries"),
+    "whole foods": ("Whole Foods", "groceries"),
+    "wegmans": ("Wegmans", "groceries"),
+    "costco": ("Costco", "groceries"),
+    "safeway": ("Safeway", "groceries"),
+    "kroger": ("Kroger", "groceries"),
+    "aldi": ("Aldi", "groceries"),
+    "h mart": ("H Mart", "groceries"),
+    # Food & drink
+    "starbucks": ("Starbucks", "food"),
+    "blue bottle": ("Blue Bottle", "food"),
+    "dunkin": ("Dunkin", "food"),
+    "chipotle": ("Chipotle", "food"),
+    "sweetgreen": ("Sweetgreen", "food"),
+    "mcdonald's": ("McDonald's", "food"),
+    "mcdonalds": ("McDonald's", "food"),
+    "shake shack": ("Shake Shack", "food"),
+    "doordash": ("DoorDash", "food"),
+    "uber eats": ("Uber Eats", "food"),
+    "seamless": ("Seamless", "food"),
+    "grubhub": ("Grubhub", "food"),
+    # Transportation
+    "uber": ("Uber", "transportation"),
+    "lyft": ("Lyft", "transportation"),
+    "mta": ("MTA", "transportation"),
+    "citi bike": ("Citi Bike", "transportation"),
+    # Travel
+    "klm": ("KLM", "travel"),
+    "delta": ("Delta", "travel"),
+    "united": ("United", "travel"),
+    "jetblue": ("JetBlue", "travel"),
+    "american airlines": ("American Airlines", "travel"),
+    "airbnb": ("Airbnb", "travel"),
+    "marriott": ("Marriott", "travel"),
+    "hilton": ("Hilton", "travel"),
+    "amtrak": ("Amtrak", "travel"),
+    # Fashion
+    "cos": ("COS", "fashion"),
+    "uniqlo": ("Uniqlo", "fashion"),
+    "zara": ("Zara", "fashion"),
+    "h&m": ("H&M", "fashion"),
+    "adidas": ("Adidas", "fashion"),
+    "nike": ("Nike", "fashion"),
+    "everlane": ("Everlane", "fashion"),
+    # Amazon
+    "amazon": ("Amazon", "amazon"),
+    # Monthly bills & subscriptions
+    "netflix": ("Netflix", "monthly"),
+    "spotify": ("Spotify", "monthly"),
+    "verizon": ("Verizon", "monthly"),
+    "t-mobile": ("T-Mobile", "monthly"),
+    "con edison": ("Con Edison", "monthly"),
+    "icloud": ("iCloud", "monthly"),
+    # Entertainment
+    "amc": ("AMC", "entertainment"),
+    "ticketmaster": ("Ticketmaster", "entertainment"),
+    "steam": ("Steam", "entertainment"),
+    # Personal
+    "cvs": ("CVS", "personal"),
+    "walgreens": ("Walgreens", "personal"),
+    "sephora": ("Sephora", "personal"),
+}
+
+# Generic words that point to a category when no merchant is recognised
+CATEGORY_KEYWORDS = {
+    "groceries": ["groceries", "grocery", "supermarket"],
+    "food": ["coffee", "latte", "lunch", "dinner", "breakfast", "brunch", "snack",
+             "pizza", "burger", "sushi", "restaurant", "takeout", "drinks", "bar", "tea"],
+    "transportation": ["ride", "taxi", "cab", "subway", "metro", "train", "bus",
+                       "gas", "parking", "toll", "metrocard"],
+    "travel": ["flight", "hotel", "airfare", "hostel", "luggage", "visa"],
+    "fashion": ["shirt", "t shirt", "t-shirt", "shoes", "sneakers", "jeans", "pants",
+                "dress", "jacket", "coat", "sweater", "hoodie", "socks"],
+    "monthly": ["rent", "subscription", "phone bill", "internet", "electricity",
+                "utilities", "insurance"],
+    "entertainment": ["movie", "cinema", "concert", "tickets", "ticket", "show",
+                      "museum", "game"],
+    "personal": ["haircut", "gym", "pharmacy", "medicine", "doctor", "toiletries",
+                 "shampoo", "soap"],
+}
+
+# Words hinting that one input describes several expenses
+MULTIPLE_EXPENSE_HINTS = re.compile(r"\b(and|also|plus|then)\b|&")
+
+# Filler words trimmed from the edges of the description
+FILLER_WORDS = {"i", "spent", "paid", "bought", "got", "on", "for", "at", "a", "an", "the", "of"}
+
+_MONTHS = (r"jan(?:uary)?|feb(?:ruary)?|mar(?:ch)?|apr(?:il)?|may|june?|july?|aug(?:ust)?|"
+           r"sep(?:t(?:ember)?)?|oct(?:ober)?|nov(?:ember)?|dec(?:ember)?")
+
+# Date text is removed before looking for amounts so "6/27/2025" isn't read as money
+DATE_SPANS = re.compile(
+    rf"(?:\bon\s+)?(?:\b(?:{_MONTHS})\s+\d{{1,2}}(?:st|nd|rd|th)?,?\s+\d{{4}}\b"
+    r"|\b\d{4}-\d{1,2}-\d{1,2}\b"
+    r"|\b\d{1,2}[/.-]\d{1,2}[/.-]\d{4}\b)",
+    re.IGNORECASE
+)
+
+# Relative time references are left out of the description, as the LLM prompt asks
+RELATIVE_DATE_PHRASES = re.compile(
+    r"\b(?:yesterday|today|tonight|this (?:morning|afternoon|evening|week|month)"
+    r"|last (?:night|week|weekend|month)|earlier)\b",
+    re.IGNORECASE
+)
+
+DOLLAR_AMOUNT = re.compile(r"\$\s?(\d{1,3}(?:,\d{3})+(?:\.\d{1,2})?|\d+(?:\.\d{1,2})?)")
+BARE_AMOUNT = re.compile(r"(?<![\w.])(\d+(?:\.\d{1,2})?)(?![\w.])")
+
+
+def _build_phrase_pattern(phrases):
+    """Compile phrases into one whole-word alternation, longest first"""
+    ordered = sorted(phrases, key=len, reverse=True)
+    return re.compile(
+        r"(?<![\w&'-])(" + "|".join(re.escape(p) for p in ordered) + r")(?![\w&'-])",
+        re.IGNORECASE
+    )
+
+
+MERCHANT_PATTERN = _build_phrase_pattern(MERCHANTS)
+KEYWORD_TO_CATEGORY = {
+    keyword: category
+    for category, keywords in CATEGORY_KEYWORDS.items()
+    for keyword in keywords
+}
+KEYWORD_PATTERN = _build_phrase_pattern(KEYWORD_TO_CATEGORY)
+
+
+def _clean_description(text: str) -> str:
+    """Tidy leftover text into a description"""
+    text = re.sub(r"\s+", " ", text).strip(" ,.;:-")
+    words = text.split(" ")
+    while words and words[0].lower() in FILLER_WORDS:
+        words.pop(0)
+    while words and words[-1].lower() in FILLER_WORDS:
+        words.pop()
+    return " ".join(words).strip(" ,.;:-")
+
+
+def parse_expense_rules(natural_input: str):
+    """
+    Parse a simple expense without the LLM
+
+    Returns:
+        dict with amount, category, description, merchant and confidence (0-1),
+        or None if the input clearly needs the LLM (no amount, or several amounts)
+    """
+    text = natural_input.strip()
+    without_dates = DATE_SPANS.sub(" ", text)
+
+    # Amount: exactly one, preferably written with a dollar sign
+    dollar_matches = DOLLAR_AMOUNT.findall(without_dates)
+    if len(dollar_matches) > 1:
+        return None
+    confidence = 0.0
+    if dollar_matches:
+        amount_text = dollar_matches[0]
+        amount_span = DOLLAR_AMOUNT.search(without_dates).span()
+        confidence += 0.5
+    else:
+        bare_matches = BARE_AMOUNT.findall(without_dates)
+        if len(bare_matches) != 1:
+            return None
+        amount_text = bare_matches[0]
+        amount_span = BARE_AMOUNT.search(without_dates).span()
+        confidence += 0.3
+
+    amount = float(amount_text.replace(",", ""))
+    if amount <= 0:
+        return None
+
+    remainder = without_dates[:amount_span[0]] + " " + without_dates[amount_span[1]:]
+
+    # Category: a known merchant beats a generic keyword
+    merchant = None
+    category = None
+    merchant_match = MERCHANT_PATTERN.search(remainder)
+    if merchant_match:
+        merchant, category = MERCHANTS[merchant_match.group(1).lower()]
+        confidence += 0.4
+    else:
+        keyword_match = KEYWORD_PATTERN.search(remainder)
+        if keyword_match:
+            category = KEYWORD_TO_CATEGORY[keyword_match.group(1).lower()]
+            confidence += 0.3
+
+    description = remainder
+    # "$8 Amazon, Method Body Soap" - the category already says Amazon
+    if category == "amazon" and merchant_match:
+        description = remainder[:merchant_match.start()] + remainder[merchant_match.end():]
+    description = _clean_description(RELATIVE_DATE_PHRASES.sub(" ", description))
+    if description:
+        confidence += 0.1
+    else:
+        description = merchant or text[:50]
+
+    # Long or compound inputs are where the LLM earns its keep
+    if MULTIPLE_EXPENSE_HINTS.search(remainder.lower()):
+        confidence -= 0.3
+    if len(text.split()) > 8:
+        confidence -= 0.2
+
+    return {
+        "amount": amount,
+        "category": category or "personal",
+        "description": description,
+        "merchant": merchant,
+        "confidence": round(max(0.0, min(confidence, 1.0)), 2),
+    }
@@ -0,0 +1,897 @@
+"""
+Shared data access for the CLI and the API
+
+Every query against the expenses and pantry tables lives here, behind one
+ExpenseRepository interface with two implementations:
+  - SQLiteRepository for the local expenses.db used by the CLI and scripts
+  - PostgresRepository for the API, wrapping a pooled psycopg2 connection
+
+SQL is written once with '?' placeholders; the Postgres repository rewrites
+them to '%s'. Both hold a single connection for their whole lifetime, so the
+CLI opens the database once per command (get_repository()) and SQLite's
+per-connection statement cache turns repeated queries into prepared
+statements. Writes commit immediately unless they run inside
+`with repo.transaction():`, which commits or rolls back as one unit.
+"""
+
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from typing import Optional
+import os
+import sqlite3
+import threading
+
+from merchant_match import (
+    DEFAULT_SIMILARITY, DUPLICATE_SIMILARITY, DUPLICATE_WINDOW_DAYS,
+    TrigramIndex, find_near_duplicates, rank_similar
+)
+from expense_search import (
+    SQLITE_MATCHES_SQL, POSTGRES_MATCHES_SQL, parse_search_query, to_fts5_query, to_tsquery
+)
+from expense_export import format_watermark, parse_watermark
+from expense_sync import POSTGRES_PENDING_CHANGE_SEQ, InvalidSyncTokenError, merge_changes
+
+# The local database lives next to the code unless EXPENSES_DB_PATH says otherwise,
+# so commands behave the same from any working directory
+SQLITE_DB_PATH = os.getenv(
+    'EXPENSES_DB_PATH',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), 'expenses.db')
+)
+
+EXPENSE_COLUMNS = "id, amount, category, description, timestamp"
+SUMMARY_COLUMNS = "amount, category, description, timestamp"
+PANTRY_COLUMNS = "id, name, quantity, unit, created_at, is_consumed, grocery_type"
+
+# Tables an export or sync covers, with the columns sent for each
+EXPORT_COLUMNS = {
+    "expenses": EXPENSE_COLUMNS,
+    "pantry_items": PANTRY_COLUMNS,
+}
+EXPORT_BATCH_SIZE = 1000
+SYNC_BATCH_SIZE = 500
+
+# Columns the CLI and API may change on an expense
+EDITABLE_FIELDS = ("amount", "category", "description", "timestamp")
+
+
+# SQLite tuning applied to every connection (all overridable from the environment):
+#   WAL lets readers keep reading while a command writes, and with
+#   synchronous=NORMAL a commit no longer waits for an fsync (a power cut can
+#   lose the last commits, never corrupt the file). Reads go through a
+#   memory map and a larger page cache, and temp b-trees stay in memory.
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', 'WAL').upper()
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', 'NORMAL').upper()
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', str(256 * 1024 * 1024)))
+SQLITE_CACHE_SIZE_KB = int(os.getenv('SQLITE_CACHE_SIZE_KB', str(64 * 1024)))
+SQLITE_TEMP_STORE = os.getenv('SQLITE_TEMP_STORE', 'MEMORY').upper()
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', '10000'))
+
+_JOURNAL_MODES = {"DELETE", "TRUNCATE", "PERSIST", "MEMORY", "WAL", "OFF"}
+_SYNCHRONOUS_MODES = {"OFF", "NORMAL", "FULL", "EXTRA"}
+_TEMP_STORES = {"DEFAULT", "FILE", "MEMORY"}
+
+
+def sqlite_pragmas():
+    """The PRAGMA statements run on each new connection, validated (PRAGMAs can't take parameters)"""
+    for name, value, allowed in (
+        ("SQLITE_JOURNAL_MODE", SQLITE_JOURNAL_MODE, _JOURNAL_MODES),
+        ("SQLITE_SYNCHRONOUS", SQLITE_SYNCHRONOUS, _SYNCHRONOUS_MODES),
+        ("SQLITE_TEMP_STORE", SQLITE_TEMP_STORE, _TEMP_STORES),
+    ):
+        if value not in allowed:
+            raise ValueError(f"{name} must be one of {', '.join(sorted(allowed))}, got {value!r}")
+    return [
+        f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}",
+        f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}",
+        f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}",
+        f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}",
+        # Negative cache_size is in KiB rather than pages
+        f"PRAGMA cache_size = -{SQLITE_CACHE_SIZE_KB}",
+        f"PRAGMA temp_store = {SQLITE_TEMP_STORE}",
+    ]
+
+
+def connect_sqlite(path: Optional[str] = None):
+    """
+    Open the local SQLite database with the tuning above applied
+
+    The one connection factory for the local repository and the maintenance
+    scripts; rows support both index and name access.
+    """
+    conn = sqlite3.connect(path or SQLITE_DB_PATH, timeout=SQLITE_BUSY_TIMEOUT_MS / 1000)
+    conn.row_factory = sqlite3.Row
+    for pragma in sqlite_pragmas():
+        conn.execute(pragma)
+    return conn
+
+
+def sqlite_settings(conn):
+    """Current values of the tuned settings on a connection, for diagnostics"""
+    return {
+        name: conn.execute(f"PRAGMA {name}").fetchone()[0]
+        for name in ("journal_mode", "synchronous", "mmap_size", "cache_size", "temp_store", "busy_timeout")
+    }
+
+
+class ExpenseRepository(ABC):
+    """Backend-neutral expense queries; subclasses adapt placeholders and types"""
+
+    placeholder = "?"
+    like_operator = "LIKE"
+    search_matches_sql = None  # (id, rank) of full-text matches; see expense_search.py
+    rollup_day_sql = "date(timestamp)"  # the day an expense is rolled up under; see expense_rollup.py
+
+    def __init__(self, conn):
+        self.conn = conn
+        self._transaction_depth = 0
+
+    # -- plumbing ----------------------------------------------------------
+
+    def _sql(self, query: str) -> str:
+        return query if self.placeholder == "?" else query.replace("?", self.placeholder)
+
+    def _execute(self, query: str, params=()):
+        c = self.conn.cursor()
+        c.execute(self._sql(query), params)
+        return c
+
+    def _db_timestamp(self, value):
+        """Convert a datetime to the form the backend stores"""
+        return value
+
+    def _db_day(self, value: date):
+        return value
+
+    def _commit(self):
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    @contextmanager
+    def transaction(self):
+        """Group several writes into one commit; rolls back if anything raises"""
+        self._transaction_depth += 1
+        try:
+            yield self
+        except BaseException:
+            self._transaction_depth -= 1
+            if self._transaction_depth == 0:
+                self.conn.rollback()
+            raise
+        self._transaction_depth -= 1
+        if self._transaction_depth == 0:
+            self.conn.commit()
+
+    def rollback(self):
+        self.conn.rollback()
+
+    def close(self):
+        self.conn.close()
+
+    def _expense_filters(self, category: Optional[str] = None, days: Optional[int] = None,
+                         search: Optional[str] = None):
+        """WHERE clause shared by every filtered expense query"""
+        where_sql = "WHERE 1=1"
+        params = []
+        if category:
+            where_sql += " AND category = ?"
+            params.append(category)
+        if days:
+            where_sql += " AND timestamp >= ?"
+            params.append(self._db_timestamp(datetime.now() - timedelta(days=days)))
+        if search:
+            where_sql += f" AND (description {self.like_operator} ? OR category {self.like_operator} ?)"
+            params.extend([f"%{search}%", f"%{search}%"])
+        return where_sql, params
+
+    # -- expenses: reads ---------------------------------------------------
+
+    def get_expense(self, expense_id: int):
+        return self._execute(
+            f"SELECT {EXPENSE_COLUMNS} FROM expenses WHERE id = ?", (expense_id,)
+        ).fetchone()
+
+    def list_expenses(self, category: Optional[str] = None, days: Optional[int] = None,
+                      search: Optional[str] = None, columns: str = EXPENSE_COLUMNS):
+        """Matching expenses, newest first"""
+        where_sql, params = self._expense_filters(category, days, search)
+        return self._execute(
+            f"SELECT {columns} FROM expenses {where_sql} ORDER BY timestamp DESC, id DESC", params
+        ).fetchall()
+
+    @abstractmethod
+    def _search_query(self, clauses) -> str:
+        """Compile parsed search clauses into the backend's full-text query string"""
+
+    def search_expenses(self, query: str, category: Optional[str] = None, days: Optional[int] = None,
+                        limit: Optional[int] = None):
+        """
+        Full-text search over descriptions and categories, best match first
+
+        Args:
+            query: Words, prefix* terms and "quoted phrases" (see expense_search.py)
+
+        Returns:
+            Expense rows with an extra rank column (higher is more relevant);
+            empty if the query has no searchable words
+        """
+        clauses = parse_search_query(query)
+        if not clauses:
+            return []
+        where_sql, params = self._expense_filters(category, days)
+        limit_sql = ""
+        if limit:
+            limit_sql = "LIMIT ?"
+            params.append(limit)
+        return self._execute(f"""
+            WITH matches AS ({self.search_matches_sql})
+            SELECT {EXPENSE_COLUMNS}, matches.rank
+            FROM expenses
+            JOIN matches USING (id)
+            {where_sql}
+            ORDER BY matches.rank DESC, timestamp DESC, id DESC
+            {limit_sql}
+        """, [self._search_query(clauses)] + params).fetchall()
+
+    def fuzzy_search(self, text: str, category: Optional[str] = None, days: Optional[int] = None,
+                     limit: Optional[int] = None, threshold: float = DEFAULT_SIMILARITY):
+        """
+        Expenses whose description contains something like text, best match first
+
+        Builds an in-process trigram index over the filtered descriptions;
+        PostgreSQL overrides this with a pg_trgm index lookup.
+
+        Returns:
+            Expense dicts with an extra rank key (trigram word similarity, 0-1)
+        """
+        index = TrigramIndex()
+        rows = {}
+        for row in self.list_expenses(category=category, days=days):
+            index.add(row["id"], row["description"])
+            rows[row["id"]] = row
+        return [
+            dict(zip(row.keys(), row), rank=score)
+            for row, score in ((rows[key], score) for key, score in index.search(text, threshold, limit))
+        ]
+
+    def list_expenses_near(self, amount, timestamp, window_days: int = DUPLICATE_WINDOW_DAYS):
+        """Expenses of the same amount (to the cent) within window_days of timestamp"""
+        if isinstance(timestamp, str):
+            timestamp = datetime.fromisoformat(timestamp)
+        window = timedelta(days=window_days)
+        return self._execute(f"""
+            SELECT {EXPENSE_COLUMNS} FROM expenses
+            WHERE timestamp BETWEEN ? AND ?
+              AND amount BETWEEN ? AND ?
+            ORDER BY timestamp DESC, id DESC
+        """, (
+            self._db_timestamp(timestamp - window), self._db_timestamp(timestamp + window),
+            float(amount) - 0.005, float(amount) + 0.005
+        )).fetchall()
+
+    def find_possible_duplicates(self, amount, description, timestamp,
+                                 window_days: int = DUPLICATE_WINDOW_DAYS,
+                                 threshold: float = DUPLICATE_SIMILARITY):
+        """
+        Existing expenses that the given one may duplicate, most similar first
+
+        Reads only same-amount expenses from the surrounding days (an index
+        range scan), then compares their descriptions by trigram similarity.
+
+        Returns:
+            List of (row, similarity)
+        """
+        return rank_similar(description, self.list_expenses_near(amount, timestamp, window_days), threshold)
+
+    def find_duplicate_pairs(self, threshold: float = DUPLICATE_SIMILARITY,
+                             window_days: int = DUPLICATE_WINDOW_DAYS):
+        """Near-duplicate expense pairs across the whole history; see merchant_match.find_near_duplicates"""
+        return find_near_duplicates(self.list_expenses(), threshold, window_days)
+
+    def list_categories(self):
+        """Distinct categories in use, alphabetically"""
+        rows = self._execute("SELECT DISTINCT category FROM expenses ORDER BY category").fetchall()
+        return [row["category"] for row in rows]
+
+    def count_expenses(self) -> int:
+        return self._execute("SELECT COUNT(*) AS count FROM expenses").fetchone()["count"]
+
+    def list_expenses_page(self, category: Optional[str] = None, days: Optional[int] = None,
+                           limit: int = 50, offset: int = 0, before=None):
+        """
+        One page of expenses, plus totals over the whole filtered set when paging by offset
+
+        Expenses without a timestamp come after all the others, newest id first.
+
+        Args:
+            before: (timestamp, id) keyset cursor (timestamp None past an
+                undated expense); when set, offset is ignored
+                and no totals are computed (they'd cost a scan of every
+                matching expense on each page; clients keep the first page's)
+
+        Returns:
+            (rows, total_count, total_amount) - rows holds up to limit + 1
+            expenses so callers can tell whether another page follows; the
+            totals are None in cursor mode
+        """
+        where_sql, params = self._expense_filters(category, days)
+
+        # Cursor mode seeks past the last (timestamp, id) seen instead of skipping rows.
+        # The row comparison never matches a NULL timestamp, so the undated
+        # expenses that follow the dated ones are a second seek of their own.
+        if before and before[0] is None:
+            rows = self._execute(f"""
+                SELECT {EXPENSE_COLUMNS}
+                FROM expenses
+                {where_sql} AND timestamp IS NULL AND id < ?
+                ORDER BY id DESC
+                LIMIT ?
+            """, params + [before[1], limit + 1]).fetchall()
+            return rows, None, None
+        if before:
+            rows = self._execute(f"""
+                SELECT * FROM (
+                    SELECT {EXPENSE_COLUMNS}
+                    FROM expenses
+                    {where_sql} AND (timestamp, id) < (?, ?)
+                    ORDER BY timestamp DESC, id DESC
+                    LIMIT ?
+                ) AS dated
+                UNION ALL
+                SELECT * FROM (
+                    SELECT {EXPENSE_COLUMNS}
+                    FROM expenses
+                    {where_sql} AND timestamp IS NULL
+                    ORDER BY id DESC
+                    LIMIT ?
+                ) AS undated
+                ORDER BY timestamp DESC NULLS LAST, id DESC
+                LIMIT ?
+            """, params + [before[0], before[1], limit + 1] + params + [limit + 1, limit + 1]).fetchall()
+            return rows, None, None
+
+        # The LEFT JOIN keeps the totals row even when the page itself is empty
+        rows = self._execute(f"""
+            WITH filtered AS (
+                SELECT {EXPENSE_COLUMNS}
+                FROM expenses
+                {where_sql}
+            ),
+            totals AS (
+                SELECT COUNT(*) AS total_count, COALESCE(SUM(amount), 0) AS total_amount
+                FROM filtered
+            ),
+            page AS (
+                SELECT * FROM filtered
+                ORDER BY timestamp DESC NULLS LAST, id DESC
+                LIMIT ? OFFSET ?
+            )
+            SELECT totals.total_count, totals.total_amount,
+                   page.id, page.amount, page.category, page.description, page.timestamp
+            FROM totals
+            LEFT JOIN page ON TRUE
+            ORDER BY page.timestamp DESC NULLS LAST, page.id DESC
+        """, params + [limit + 1, offset]).fetchall()
+
+        total_count = rows[0]["total_count"] if rows else 0
+        total_amount = (rows[0]["total_amount"] if rows else 0) or 0
+        return [row for row in rows if row["id"] is not None], total_count, total_amount
+
+    def category_rollup(self, category: Optional[str] = None, days: Optional[int] = None):
+        """
+        Per-category count, total, min and max, read from expense_daily_rollup
+
+        A "last N days" window rarely starts at midnight, so whole days come
+        from the rollup and only the partial first day is read from expenses -
+        the result matches a full scan exactly.
+
+        Returns:
+            Rows of (category, count, total, min_amount, max_amount), largest total first
+        """
+        rollup_where = "WHERE 1=1"
+        rollup_params = []
+        partial_day_sql = ""
+        partial_day_params = []
+
+        if category:
+            rollup_where += " AND category = ?"
+            rollup_params.append(category)
+
+        if days:
+            cutoff = datetime.now() - timedelta(days=days)
+            first_full_day = cutoff.date() + timedelta(days=1)
+            rollup_where += " AND day >= ?"
+            rollup_params.append(self._db_day(first_full_day))
+
+            # Bounded by the rollup's own day expression, so no row is counted twice or missed
+            partial_day_sql = f"""
+                UNION ALL
+                SELECT category, COUNT(*), COALESCE(SUM(amount), 0), MIN(amount), MAX(amount)
+                FROM expenses
+                WHERE timestamp >= ? AND {self.rollup_day_sql} < ?
+            """
+            partial_day_params = [self._db_timestamp(cutoff), self._db_day(first_full_day)]
+            if category:
+                partial_day_sql += " AND category = ?"
+                partial_day_params.append(category)
+            partial_day_sql += " GROUP BY category"
+
+        return self._execute(f"""
+            WITH parts (category, expense_count, total_amount, min_amount, max_amount) AS (
+                SELECT category, expense_count, total_amount, min_amount, max_amount
+                FROM expense_daily_rollup
+                {rollup_where}
+                {partial_day_sql}
+            )
+            SELECT category,
+                   SUM(expense_count) AS count,
+                   SUM(total_amount) AS total,
+                   MIN(min_amount) AS min_amount,
+                   MAX(max_amount) AS max_amount
+            FROM parts
+            GROUP BY category
+            ORDER BY total DESC
+        """, rollup_params + partial_day_params).fetchall()
+
+    # -- expenses: writes --------------------------------------------------
+
+    def insert_expense(self, amount, category, description, timestamp) -> int:
+        """Insert one expense and return its id"""
+        c = self._execute(
+            "INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?)",
+            (amount, category, description, self._db_timestamp(timestamp))
+        )
+        self._commit()
+        return c.lastrowid
+
+    def insert_expense_returning(self, amount, category, description, timestamp):
+        """Insert one expense and return the full stored row"""
+        return self.get_expense(self.insert_expense(amount, category, description, timestamp))
+
+    def insert_expenses(self, rows) -> int:
+        """Insert (amount, category, description, timestamp) rows in one statement batch"""
+        rows = [(a, cat, desc, self._db_timestamp(ts)) for a, cat, desc, ts in rows]
+        if not rows:
+            return 0
+        c = self.conn.cursor()
+        c.executemany(
+            self._sql("INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?)"),
+            rows
+        )
+        self._commit()
+        return len(rows)
+
+    def update_expenses(self, expense_ids, **fields) -> int:
+        """Set the given fields on every listed expense; returns rows changed"""
+        unknown = set(fields) - set(EDITABLE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown expense fields: {', '.join(sorted(unknown))}")
+        expense_ids = list(expense_ids)
+        if not fields or not expense_ids:
+            return 0
+
+        if "timestamp" in fields:
+            fields["timestamp"] = self._db_timestamp(fields["timestamp"])
+        assignments = ", ".join(f"{name} = ?" for name in fields)
+        id_placeholders = ", ".join("?" * len(expense_ids))
+        c = self._execute(
+            f"UPDATE expenses SET {assignments} WHERE id IN ({id_placeholders})",
+            list(fields.values()) + expense_ids
+        )
+        self._commit()
+        return c.rowcount
+
+    def update_expense(self, expense_id: int, **fields) -> int:
+        return self.update_expenses([expense_id], **fields)
+
+    def delete_expense(self, expense_id: int) -> int:
+        c = self._execute("DELETE FROM expenses WHERE id = ?", (expense_id,))
+        self._commit()
+        return c.rowcount
+
+    def delete_all_expenses(self) -> int:
+        c = self._execute("DELETE FROM expenses")
+        self._commit()
+        return c.rowcount
+
+    # -- export ------------------------------------------------------------
+
+    export_tables = tuple(EXPORT_COLUMNS)
+
+    def _db_change_time(self, moment):
+        """Convert a watermark to the form updated_at is stored in"""
+        return parse_watermark(moment)
+
+    def _stream_cursor(self, name: str):
+        return self.conn.cursor()
+
+    def stream_rows(self, table: str, since=None, batch_size: int = EXPORT_BATCH_SIZE):
+        """
+        Rows of an export table in id order, only those changed since a watermark if given
+
+        Args:
+            since: A change sequence number (rows numbered after it), or a
+                time (rows updated at or after it); see expense_export.py
+
+        Rows are fetched batch_size at a time, so the table is never held in memory.
+        """
+        where_sql, params = "", ()
+        if isinstance(since, int):
+            where_sql, params = "WHERE change_seq > ?", (since,)
+        elif since is not None:
+            where_sql, params = "WHERE updated_at >= ?", (self._db_change_time(since),)
+        c = self._stream_cursor(f"stream_{table}")
+        try:
+            c.execute(self._sql(f"""
+                SELECT {EXPORT_COLUMNS[table]}, updated_at
+                FROM {table}
+                {where_sql}
+                ORDER BY id
+            """), params)
+            while True:
+                rows = c.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+        finally:
+            c.close()
+
+    # -- sync --------------------------------------------------------------
+
+    @abstractmethod
+    def current_change_seq(self) -> int:
+        """The most recent change sequence number handed out (0 before any)"""
+
+    def settled_change_seq(self) -> int:
+        """
+        Highest change number at or below which every change is visible (or rolled back)
+
+        One writer at a time means that's the most recent number.
+        """
+        return self.current_change_seq()
+
+    def expenses_version(self):
+        """
+        Changes whenever an expense is inserted, updated or deleted
+
+        Two index lookups; reads no expense rows. Deletes are seen through
+        the tombstones (of any table, so pantry deletes count too).
+        """
+        row = self._execute("""
+            SELECT (SELECT MAX(change_seq) FROM expenses) AS rows_seq,
+                   (SELECT MAX(change_seq) FROM sync_tombstones) AS deletes_seq
+        """).fetchone()
+        return f"{row['rows_seq'] or 0}.{row['deletes_seq'] or 0}"
+
+    def changes_since(self, change_seq: int, limit: int = SYNC_BATCH_SIZE):
+        """
+        Up to `limit` inserts, updates and deletes after change_seq, oldest first
+
+        Returns:
+            (changes, next_seq, has_more) - changes is {table: {"rows": [...],
+            "deleted": [ids]}}; rows include updated_at and change_seq
+
+        Raises:
+            InvalidSyncTokenError: if change_seq is ahead of the database
+            (e.g. the database was recreated), so the client must start over
+        """
+        latest = self.current_change_seq()
+        if change_seq > latest:
+            raise InvalidSyncTokenError(f"Sync position {change_seq} is ahead of the database ({latest})")
+        # Everything up to a token handed out earlier had settled by then
+        ceiling = max(self.settled_change_seq(), change_seq)
+        row_batches = {
+            table: self._execute(f"""
+                SELECT {EXPORT_COLUMNS[table]}, updated_at, change_seq
+                FROM {table}
+                WHERE change_seq > ? AND change_seq <= ?
+                ORDER BY change_seq
+                LIMIT ?
+            """, (change_seq, ceiling, limit + 1)).fetchall()
+            for table in self.export_tables
+        }
+        tombstones = self._execute("""
+            SELECT table_name, row_id, change_seq
+            FROM sync_tombstones
+            WHERE change_seq > ? AND change_seq <= ?
+            ORDER BY change_seq
+            LIMIT ?
+        """, (change_seq, ceiling, limit + 1)).fetchall()
+        changes, last_seq, has_more = merge_changes(row_batches, tombstones, limit)
+        # With nothing left to send, the client can skip straight to the ceiling
+        return changes, (last_seq if has_more else ceiling), has_more
+
+    # -- pantry ------------------------------------------------------------
+
+    def list_pantry_items(self, include_consumed: bool = False):
+        """Pantry items grouped by type; by default only what's still on hand"""
+        where_sql = "" if include_consumed else "WHERE is_consumed = FALSE AND quantity > 0"
+        return self._execute(f"""
+            SELECT id, name, quantity, unit, grocery_type, is_consumed
+            FROM pantry_items
+            {where_sql}
+            ORDER BY grocery_type, name
+        """).fetchall()
+
+    def list_pantry_types(self):
+        """(id, name, grocery_type) of every pantry item, consumed or not"""
+        return self._execute("SELECT id, name, grocery_type FROM pantry_items").fetchall()
+
+    def count_pantry_types(self):
+        """(grocery_type, count) per type, largest first"""
+        return self._execute("""
+            SELECT grocery_type, COUNT(*) AS count
+            FROM pantry_items
+            GROUP BY grocery_type
+            ORDER BY count DESC
+        """).fetchall()
+
+    def update_pantry_types(self, changes) -> int:
+        """Set grocery_type from (item_id, grocery_type) pairs in one statement batch"""
+        changes = [(grocery_type, item_id) for item_id, grocery_type in changes]
+        if not changes:
+            return 0
+        c = self.conn.cursor()
+        c.executemany(self._sql("UPDATE pantry_items SET grocery_type = ? WHERE id = ?"), changes)
+        self._commit()
+        return len(changes)
+
+
+class SQLiteRepository(ExpenseRepository):
+    """Repository over the local SQLite database (ISO-8601 TEXT timestamps)"""
+
+    search_matches_sql = SQLITE_MATCHES_SQL
+
+    def __init__(self, conn=None, path: Optional[str] = None):
+        super().__init__(conn or connect_sqlite(path))
+
+    def _db_timestamp(self, value):
+        return value.isoformat() if isinstance(value, datetime) else value
+
+    def _db_day(self, value: date):
+        return value.isoformat()
+
+    def _search_query(self, clauses) -> str:
+        return to_fts5_query(clauses)
+
+    def _db_change_time(self, moment):
+        return format_watermark(moment)
+
+    def current_change_seq(self) -> int:
+        return self._execute("SELECT change_seq FROM sync_clock").fetchone()["change_seq"]
+
+    # Edit backups back the CLI's undo command and only exist locally
+
+    def _ensure_backup_table(self):
+        self._execute('''
+            CREATE TABLE IF NOT EXISTS expense_backups (
+                backup_id INTEGER PRIMARY KEY,
+                original_id INTEGER,
+                amount REAL,
+                category TEXT,
+                description TEXT,
+                timestamp TEXT,
+                backup_timestamp TEXT
+            )
+        ''')
+
+    def backup_expense(self, expense_id: int):
+        """Snapshot an expense before editing; returns the backup id, or None if it doesn't exist"""
+        expense = self.get_expense(expense_id)
+        if not expense:
+            return None
+        self._ensure_backup_table()
+        c = self._execute('''
+            INSERT INTO expense_backups (original_id, amount, category, description, timestamp, backup_timestamp)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (*expense, datetime.now().isoformat()))
+        self._commit()
+        return c.lastrowid
+
+    def latest_backup(self, expense_id: int):
+        """Most recent backup of an expense, or None"""
+        self._ensure_backup_table()
+        return self._execute('''
+            SELECT backup_id, amount, category, description, timestamp, backup_timestamp
+            FROM expense_backups
+            WHERE original_id = ?
+            ORDER BY backup_timestamp DESC
+            LIMIT 1
+        ''', (expense_id,)).fetchone()
+
+    def restore_backup(self, expense_id: int, backup):
+        """Put a backup's values back on the expense and drop the backup, atomically"""
+        backup_id, amount, category, description, timestamp = backup[:5]
+        with self.transaction():
+            self.update_expense(expense_id, amount=amount, category=category,
+                                description=description, timestamp=timestamp)
+            self._execute("DELETE FROM expense_backups WHERE backup_id = ?", (backup_id,))
+
+    # The LLM parse cache (see parse_cache.py) also only exists locally
+
+    _parse_cache_ready = False
+
+    def _ensure_parse_cache_table(self):
+        if self._parse_cache_ready:
+            return
+        self._execute('''
+            CREATE TABLE IF NOT EXISTS parse_cache (
+                input_key TEXT PRIMARY KEY,
+                result TEXT NOT NULL,
+                prompt_version TEXT NOT NULL,
+                created_at TEXT,
+                last_used_at TEXT,
+                hits INTEGER DEFAULT 0
+            )
+        ''')
+        self._execute("CREATE INDEX IF NOT EXISTS idx_parse_cache_last_used ON parse_cache (last_used_at)")
+        self._commit()
+        self._parse_cache_ready = True
+
+    def get_cached_parse(self, input_key: str, prompt_version: str):
+        """The cached result JSON for a normalized input, or None; counts the hit"""
+        self._ensure_parse_cache_table()
+        row = self._execute(
+            "SELECT result FROM parse_cache WHERE input_key = ? AND prompt_version = ?",
+            (input_key, prompt_version)
+        ).fetchone()
+        if not row:
+            return None
+        self._execute(
+            "UPDATE parse_cache SET hits = hits + 1, last_used_at = ? WHERE input_key = ?",
+            (datetime.now().isoformat(), input_key)
+        )
+        self._commit()
+        return row["result"]
+
+    def store_cached_parse(self, input_key: str, result: str, prompt_version: str, max_entries: int):
+        """Cache a result JSON, then drop the least recently used entries beyond max_entries"""
+        self._ensure_parse_cache_table()
+        now = datetime.now().isoformat()
+        with self.transaction():
+            self._execute('''
+                INSERT OR REPLACE INTO parse_cache (input_key, result, prompt_version, created_at, last_used_at, hits)
+                VALUES (?, ?, ?, ?, ?, 0)
+            ''', (input_key, result, prompt_version, now, now))
+            overflow = self._execute("SELECT COUNT(*) AS count FROM parse_cache").fetchone()["count"] - max_entries
+            if overflow > 0:
+                self._execute('''
+                    DELETE FROM parse_cache WHERE input_key IN (
+                        SELECT input_key FROM parse_cache ORDER BY last_used_at ASC LIMIT ?
+                    )
+                ''', (overflow,))
+
+    def delete_cached_parses(self, keep_version: Optional[str] = None) -> int:
+        """Drop every cached parse, or every one not produced with keep_version"""
+        self._ensure_parse_cache_table()
+        if keep_version is None:
+            c = self._execute("DELETE FROM parse_cache")
+        else:
+            c = self._execute("DELETE FROM parse_cache WHERE prompt_version != ?", (keep_version,))
+        self._commit()
+        return c.rowcount
+
+
+class PostgresRepository(ExpenseRepository):
+    """Repository over a psycopg2 connection (TIMESTAMPTZ timestamps, dict rows)"""
+
+    placeholder = "%s"
+    like_operator = "ILIKE"
+    search_matches_sql = POSTGRES_MATCHES_SQL
+    rollup_day_sql = "CAST(timestamp AS DATE)"
+
+    def _search_query(self, clauses) -> str:
+        return to_tsquery(clauses)
+
+    def _stream_cursor(self, name: str):
+        # A named (server-side) cursor, so fetchmany() pulls one batch at a time
+        return self.conn.cursor(name=name)
+
+    def current_change_seq(self) -> int:
+        row = self._execute("SELECT last_value, is_called FROM change_seq").fetchone()
+        return row["last_value"] if row["is_called"] else 0
+
+    def settled_change_seq(self) -> int:
+        """
+        The most recent change number, kept below those of transactions still open
+
+        Writers lock a lower bound for their numbers before taking any (see
+        expense_sync.py) and the locks are read after the sequence, so a
+        number at or below the result belongs to a transaction that had
+        ended by then.
+        """
+        latest = self.current_change_seq()
+        pending = self._execute(POSTGRES_PENDING_CHANGE_SEQ).fetchone()["pending"]
+        return latest if pending is None else min(latest, pending - 1)
+
+    def fuzzy_search(self, text: str, category: Optional[str] = None, days: Optional[int] = None,
+                     limit: Optional[int] = None, threshold: float = DEFAULT_SIMILARITY):
+        """Trigram similarity search served by the pg_trgm GIN index on description"""
+        where_sql, filter_params = self._expense_filters(category, days)
+        params = [text] + filter_params + [text]
+        limit_sql = ""
+        if limit:
+            limit_sql = "LIMIT ?"
+            params.append(limit)
+        # <% is pg_trgm's indexable "term appears in" operator; it uses this threshold,
+        # set for this transaction only so it doesn't stay on a pooled connection
+        with self.transaction():
+            self._execute("SELECT set_config('pg_trgm.word_similarity_threshold', ?, true)", (str(threshold),))
+            return self._execute(f"""
+                SELECT {EXPENSE_COLUMNS}, word_similarity(?, description) AS rank
+                FROM expenses
+                {where_sql} AND ? <%% description
+                ORDER BY rank DESC, timestamp DESC, id DESC
+                {limit_sql}
+            """, params).fetchall()
+
+    def insert_expense(self, amount, category, description, timestamp) -> int:
+        c = self._execute(
+            "INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?) RETURNING id",
+            (amount, category, description, timestamp)
+        )
+        row = c.fetchone()
+        self._commit()
+        return row["id"] if isinstance(row, dict) else row[0]
+
+    def insert_expense_returning(self, amount, category, description, timestamp):
+        """Insert one expense and return the full stored row"""
+        c = self._execute(f"""
+            INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?)
+            RETURNING {EXPENSE_COLUMNS}
+        """, (amount, category, description, timestamp))
+        row = c.fetchone()
+        self._commit()
+        return row
+
+    def insert_expenses(self, rows) -> int:
+        """Insert rows with one multi-row INSERT"""
+        from psycopg2.extras import execute_values
+
+        rows = list(rows)
+        if not rows:
+            return 0
+        execute_values(
+            self.conn.cursor(),
+            "INSERT INTO expenses (amount, category, description, timestamp) VALUES %s",
+            rows,
+            page_size=len(rows)
+        )
+        self._commit()
+        return len(rows)
+
+    def update_pantry_types(self, changes) -> int:
+        """Set grocery_type with one UPDATE joined to a VALUES list"""
+        from psycopg2.extras import execute_values
+
+        changes = list(changes)
+        if not changes:
+            return 0
+        execute_values(
+            self.conn.cursor(),
+            """
+            UPDATE pantry_items AS p SET grocery_type = v.grocery_type
+            FROM (VALUES %s) AS v (id, grocery_type)
+            WHERE p.id = v.id
+            """,
+            changes,
+            page_size=len(changes)
+        )
+        self._commit()
+        return len(changes)
+
+
+_local = threading.local()
+
+
+def get_repository() -> SQLiteRepository:
+    """
+    The repository over the local database, opened on first use
+
+    SQLite connections can't be shared between threads, so each thread gets
+    its own; the single-threaded CLI ends up with one for the whole command.
+    """
+    repository = getattr(_local, "repository", None)
+    if repository is None:
+        repository = _local.repository = SQLiteRepository()
+    return repository
@@ -1,83 +1,48 @@
-import sqlite3
-from datetime import datetime, timedelta
-from parse_expense import query_llm
-
-def get_all_expenses():
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    c.execute("SELECT amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def get_expenses_by_timeframe(days=None):
-    """Get expenses within a specific timeframe"""
-    conn = sqlite3.connect('expenses.db')
-    c = conn.cursor()
-    
-    if days:
-        cutoff_date = (datetime.now() - timedelta(days=days)).isoformat()
-        c.execute("SELECT amount, category, description, timestamp FROM expenses WHERE timestamp >= ? ORDER BY timestamp DESC", (cutoff_date,))
-    else:
-        c.execute("SELECT amount, category, description, timestamp FROM expenses ORDER BY timestamp DESC")
-    
-    data = c.fetchall()
-    conn.close()
-    return data
-
-def calculate_category_totals(entries):
-    """Calculate totals by category"""
-    category_totals = {}
-    for entry in entries:
-        amount, category, _, _ = entry
-        if amount is not None:
-            category_totals[category] = category_totals.get(category, 0) + amount
-    return category_totals
-
-def format_time_context(entries):
+from datetime import date
+from parse_expense import query_llm, stream_llm
+from llm_client import PRIORITY_BACKGROUND
+from expense_analytics import ExpenseColumns, compute_stats, category_totals as category_totals_from
+from storage import SUMMARY_COLUMNS, get_repository
+
+def get_expenses_by_timeframe(days=None, category=None):
+    """Get expenses within a specific timeframe (and optionally one category) from the local database"""
+    return get_repository().list_expenses(category=category, days=days, columns=SUMMARY_COLUMNS)
+
+def format_time_context(stats):
     """Add time context to the data"""
-    if not entries:
+    if not stats:
         return "No expenses in timeframe."
-    
-    timestamps = [datetime.fromisoformat(entry[3]) for entry in entries if entry[3]]
-    if timestamps:
-        earliest = min(timestamps)
-        latest = max(timestamps)
-        timespan = (latest - earliest).days
-        return f"Data spans {timespan + 1} days from {earliest.strftime('%m/%d/%Y')} to {latest.strftime('%m/%d/%Y')}"
-    return ""
-
-def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
+    return (f"Data spans {stats['span_days']} days from {stats['first_day'].strftime('%m/%d/%Y')} "
+            f"to {stats['last_day'].strftime('%m/%d/%Y')}")
+
+def build_summary_prompt(columns, stats, prompt=None, report_type="comprehensive"):
     """
-    Generate expense summary with improved prompt engineering
+    Build the full LLM prompt for an expense summary
     
     Args:
-        prompt: Custom prompt (if None, uses report_type)
-        report_type: "quick", "comprehensive", "insights", "budget_analysis"
-        timeframe_days: Number of days to look back (None for all time)
+        columns: ExpenseColumns of the expenses being summarized, most recent first
+        stats: compute_stats(columns) - passed in so callers can reuse it
     """
     
-    entries = get_expenses_by_timeframe(timeframe_days)
-    if not entries:
-        print("No expenses found.")
-        return
-
-    # Calculate totals and context
-    category_totals = calculate_category_totals(entries)
-    total_spent = sum(category_totals.values())
-    time_context = format_time_context(entries)
+    category_totals = category_totals_from(stats)
+    total_spent = stats["total"]
+    time_context = format_time_context(stats)
     
-    # Format entries more cleanly
-    formatted_entries = []
-    for entry in entries:
-        amount, category, description, timestamp = entry
-        if amount is not None:
-            date_str = datetime.fromisoformat(timestamp).strftime('%m/%d') if timestamp else 'Unknown'
-            formatted_entries.append(f"${amount:.2f} - {category} - {description} ({date_str})")
-
-    if not formatted_entries:
-        print("No valid expenses found.")
-        return
+    # Dates were parsed once when the columns were loaded
+    formatted_entries = [
+        f"${columns.amounts[i]:.2f} - {columns.categories[columns.category_codes[i]]} - "
+        f"{columns.descriptions[i]} ({date.fromordinal(columns.days[i]).strftime('%m/%d')})"
+        for i in range(min(len(columns), 20))
+    ]
+
+    # Expenses far above what's usual for their category
+    unusual_section = ""
+    if stats["anomalies"]:
+        unusual_lines = "\n".join(
+            f"        ${a['amount']:.2f} - {a['category']} - {a['description']} ({a['date'].strftime('%m/%d')})"
+            for a in stats["anomalies"][:5]
+        )
+        unusual_section = f"\n        UNUSUALLY LARGE EXPENSES:\n{unusual_lines}\n"
 
     # Category breakdown
     category_breakdown = "\n".join([f"  {cat}: ${total:.2f}" for cat, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True)])
@@ -100,7 +65,7 @@ def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
             5. **Recommendations**: 1-2 actionable suggestions for better financial management
 
             Context: {time_context}
-            Total Expenses: {len(entries)} transactions
+            Total Expenses: {stats['count']} transactions
             """
         elif report_type == "insights":
             prompt = f"""
@@ -114,7 +79,7 @@ def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
             Be specific and practical in your analysis.
             """
         elif report_type == "budget_analysis":
-            avg_daily = total_spent / max(1, len(set(datetime.fromisoformat(e[3]).date() for e in entries if e[3])))
+            avg_daily = stats["daily_average"]
             prompt = f"""
             Perform a budget-focused analysis:
 
@@ -137,7 +102,7 @@ def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
         EXPENSE SUMMARY:
         Total Spent: ${total_spent:.2f}
         Top Category: {top_category[0]} (${top_category[1]:.2f})
-        Number of Transactions: {len(entries)}
+        Number of Transactions: {stats['count']}
         {time_context}
 
         ANALYSIS REQUEST:
@@ -153,13 +118,15 @@ def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
         EXPENSE DATA:
         {time_context}
         Total Spent: ${total_spent:.2f}
-        Number of Transactions: {len(entries)}
+        Number of Transactions: {stats['count']}
+        Typical Purchase: ${stats['percentiles'][50]:.2f} (90% under ${stats['percentiles'][90]:.2f})
+        {stats['rolling_average']['window_days']}-Day Rolling Average: ${stats['rolling_average']['latest']:.2f} per day
 
         CATEGORY TOTALS:
         {category_breakdown}
-
+{unusual_section}
         DETAILED TRANSACTIONS:
-        {chr(10).join(formatted_entries[:20])}{'...(more transactions)' if len(formatted_entries) > 20 else ''}
+        {chr(10).join(formatted_entries[:20])}{'...(more transactions)' if stats['count'] > 20 else ''}
 
         ANALYSIS REQUEST:
         {prompt}
@@ -167,16 +134,74 @@ def summarize(prompt=None, report_type="comprehensive", timeframe_days=None):
         Please format your response clearly with headers and bullet points where appropriate. Be concise but thorough.
         """
     
+    return full_prompt
+
+def prepare_summary(timeframe_days=None, category=None):
+    """
+    Load the local expenses once and compute their statistics
+    
+    Returns:
+        (columns, stats), or None if there are no expenses
+    """
+    columns = ExpenseColumns.from_rows(get_expenses_by_timeframe(timeframe_days, category))
+    stats = compute_stats(columns)
+    if not stats:
+        return None
+    return columns, stats
+
+def summarize(columns, stats, prompt=None, report_type="comprehensive"):
+    """
+    Generate an expense report with the LLM
+    
+    Args:
+        columns: ExpenseColumns of the expenses to summarize (the CLI reads the
+            local database, the API its own)
+        stats: compute_stats(columns)
+        prompt: Custom prompt (if None, uses report_type)
+        report_type: "quick", "comprehensive", "insights", "budget_analysis"
+    
+    Returns:
+        The report text. LLM failures raise.
+    """
+    full_prompt = build_summary_prompt(columns, stats, prompt, report_type)
+    return query_llm(full_prompt, priority=PRIORITY_BACKGROUND)
+
+def summarize_stream(columns, stats, prompt=None, report_type="comprehensive"):
+    """Generate an expense report as a stream of text chunks (see summarize)"""
+    full_prompt = build_summary_prompt(columns, stats, prompt, report_type)
+    yield from stream_llm(full_prompt, priority=PRIORITY_BACKGROUND)
+
+def format_fallback_summary(stats):
+    """Plain totals to show when the LLM is unavailable"""
+    lines = [f"Total Spent: ${stats['total']:.2f}", "Categories:"]
+    for cat, values in stats["by_category"].items():
+        lines.append(f"  {cat}: ${values['total']:.2f}")
+    return "\n".join(lines)
+
+def print_summary(prompt=None, report_type="comprehensive", timeframe_days=None, category=None, stream=False):
+    """
+    Generate a summary from the local database and print it (for the CLI)
+    
+    Args:
+        stream: Print the report token by token as the LLM generates it
+    """
+    prepared = prepare_summary(timeframe_days, category)
+    if prepared is None:
+        print("No expenses found.")
+        return
+    columns, stats = prepared
+    
     try:
-        response = query_llm(full_prompt)
         print(f"\n📊 EXPENSE REPORT - {report_type.upper()}")
         print("=" * 50)
-        print(response)
+        if stream:
+            for token in summarize_stream(columns, stats, prompt, report_type):
+                print(token, end="", flush=True)
+            print()
+        else:
+            print(summarize(columns, stats, prompt, report_type))
         print("=" * 50)
     except Exception as e:
         print(f"Error generating summary: {e}")
         print(f"\nFallback Summary:")
-        print(f"Total Spent: ${total_spent:.2f}")
-        print(f"Categories:")
-        for cat, total in sorted(category_totals.items(), key=lambda x: x[1], reverse=True):
-            print(f"  {cat}: ${total:.2f}")
+        print(format_fallback_summary(stats))
@@ -0,0 +1,144 @@
+"""
+Shared fixtures: throwaway databases migrated to the latest schema
+
+Tests never touch the real expenses.db; each gets a fresh file under pytest's
+tmp_path, created the way init_db.py creates it.
+
+PostgreSQL tests run only when TEST_DATABASE_URL points at a server they may
+write to; each gets its own schema, dropped afterwards.
+"""
+
+import os
+import sys
+import uuid
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from migrate_schema import migrate_sqlite
+from storage import SQLiteRepository, connect_sqlite
+
+TEST_DATABASE_URL = os.getenv('TEST_DATABASE_URL')
+
+BASE_SCHEMA = [
+    '''
+    CREATE TABLE expenses (
+        id INTEGER PRIMARY KEY,
+        amount REAL,
+        category TEXT,
+        description TEXT,
+        timestamp TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE pantry_items (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        quantity REAL DEFAULT 1,
+        unit TEXT DEFAULT 'pieces',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        is_consumed BOOLEAN DEFAULT FALSE,
+        grocery_type TEXT DEFAULT 'other'
+    )
+    ''',
+]
+
+
+# As init_postgres.py creates them
+BASE_POSTGRES_SCHEMA = [
+    '''
+    CREATE TABLE expenses (
+        id SERIAL PRIMARY KEY,
+        amount REAL,
+        category TEXT,
+        description TEXT,
+        timestamp TEXT
+    )
+    ''',
+    '''
+    CREATE TABLE pantry_items (
+        id SERIAL PRIMARY KEY,
+        name TEXT NOT NULL,
+        quantity REAL DEFAULT 1,
+        unit TEXT DEFAULT 'pieces',
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        is_consumed BOOLEAN DEFAULT FALSE,
+        grocery_type TEXT DEFAULT 'other'
+    )
+    ''',
+]
+
+
+def create_base_schema(path):
+    """The tables as init_db.py creates them, before any migration; returns the open connection"""
+    conn = connect_sqlite(path)
+    for statement in BASE_SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    return conn
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    """Path of a new database at the latest schema version"""
+    path = str(tmp_path / "expenses.db")
+    conn = create_base_schema(path)
+    migrate_sqlite(conn)
+    conn.close()
+    return path
+
+
+@pytest.fixture
+def repo(db_path):
+    repository = SQLiteRepository(path=db_path)
+    yield repository
+    repository.close()
+
+
+@pytest.fixture
+def pg_schema():
+    """Name of a new, empty PostgreSQL schema (skips without TEST_DATABASE_URL)"""
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    import psycopg2
+
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    conn = psycopg2.connect(TEST_DATABASE_URL)
+    conn.autocommit = True
+    conn.cursor().execute(f"CREATE SCHEMA {schema}")
+    yield schema
+    conn.cursor().execute(f"DROP SCHEMA {schema} CASCADE")
+    conn.close()
+
+
+def connect_pg(schema, dict_rows=True):
+    """A connection working in the test schema; dict rows like the API's pool"""
+    import psycopg2
+    from psycopg2.extras import RealDictCursor
+
+    return psycopg2.connect(
+        TEST_DATABASE_URL, options=f"-c search_path={schema}",
+        cursor_factory=RealDictCursor if dict_rows else None
+    )
+
+
+@pytest.fixture
+def pg_migrated(pg_schema):
+    """
+    pg_schema with the base tables at the latest schema version
+
+    The trigram migration is skipped when the server lacks pg_trgm; it only
+    adds an index for fuzzy search.
+    """
+    from migrate_schema import POSTGRES_MIGRATIONS, run_migrations
+
+    conn = connect_pg(pg_schema, dict_rows=False)
+    c = conn.cursor()
+    for statement in BASE_POSTGRES_SCHEMA:
+        c.execute(statement)
+    c.execute("SELECT EXISTS (SELECT 1 FROM pg_available_extensions WHERE name = 'pg_trgm')")
+    has_trgm = c.fetchone()[0]
+    conn.commit()
+    run_migrations(conn, [m for m in POSTGRES_MIGRATIONS if has_trgm or m[0] != 4], '%s')
+    conn.close()
+    return pg_schema
@@ -0,0 +1,46 @@
+from datetime import date
+
+import pytest
+
+from expense_analytics import ExpenseColumns, compute_stats
+
+
+def columns_from(rows):
+    return ExpenseColumns.from_rows(rows)
+
+
+def test_empty_input_has_no_stats():
+    assert compute_stats(columns_from([])) is None
+
+
+def test_grouped_totals_rolling_average_and_percentiles():
+    stats = compute_stats(columns_from([
+        (10.0, "food", "lunch", "2025-07-01T12:00:00"),      # Tuesday
+        (30.0, "food", "dinner", "2025-07-01T19:00:00"),
+        (5.0, "transport", "bus", "2025-07-03T08:00:00"),     # Thursday
+        (None, "food", "skipped", "2025-07-03T09:00:00"),
+    ]))
+
+    assert stats["count"] == 3
+    assert stats["total"] == 45.0
+    assert list(stats["by_category"]) == ["food", "transport"]
+    assert stats["by_category"]["food"] == {"count": 2, "total": 40.0, "average": 20.0,
+                                            "percentage": pytest.approx(40 / 45 * 100)}
+    assert stats["by_weekday"]["Tuesday"] == {"count": 2, "total": 40.0}
+    assert stats["span_days"] == 3 and stats["active_days"] == 2
+    assert stats["daily_totals"] == {date(2025, 7, 1): 40.0, date(2025, 7, 3): 5.0}
+    # Quiet days count as $0 in the trailing average
+    assert [value for _, value in stats["rolling_average"]["series"]] == [40.0, 20.0, 15.0]
+    assert stats["percentiles"][50] == 10.0
+    assert stats["percentiles"][90] == pytest.approx(26.0)
+
+
+def test_anomalies_are_measured_against_their_own_category():
+    rows = [(10.0 + i % 3, "food", f"meal {i}", f"2025-07-{i + 1:02d}T12:00:00") for i in range(20)]
+    rows.append((95.0, "food", "banquet", "2025-07-25T20:00:00"))
+    rows += [(900.0, "rent", f"rent {i}", f"2025-0{i + 1}-01T00:00:00") for i in range(6)]
+
+    anomalies = compute_stats(columns_from(rows))["anomalies"]
+    assert [a["description"] for a in anomalies] == ["banquet"]
+    assert anomalies[0]["date"] == date(2025, 7, 25)
+    assert anomalies[0]["z_score"] > 3
@@ -0,0 +1,50 @@
+import pytest
+
+from api.utils.grocery_categories import (
+    GROCERY_CATEGORIES, categorize_grocery_item, categorize_grocery_item_ai,
+    categorize_grocery_item_rule_based, normalize_item_name
+)
+
+
+@pytest.mark.parametrize("name, category", [
+    ("apple", "produce"),
+    ("Organic Bananas", "produce"),
+    ("2% milk", "dairy"),
+    ("greek yogurt", "dairy"),
+    ("Whole Wheat Bread", "bread"),
+    # The last keyword is the head noun
+    ("chicken broth", "pantry"),
+    ("hot sauce", "condiments"),
+    ("red wine", "beverages"),
+    # Frozen and canned override what the food itself would be
+    ("frozen chicken breast", "frozen"),
+    ("ice cream cake", "frozen"),
+    ("canned tomatoes", "pantry"),
+    ("qwertyuiop", "other"),
+])
+def test_rule_based_categories(name, category):
+    assert categorize_grocery_item_rule_based(name) == category
+
+
+def test_every_result_is_a_known_category():
+    for name in ("", "   ", "tomatoes", "Tomato", "free-range eggs", "beyond meat burger", "???"):
+        assert categorize_grocery_item_rule_based(name) in GROCERY_CATEGORIES
+
+
+def test_names_are_normalized_before_matching():
+    assert normalize_item_name("  Trader Joe's  ORGANIC-milk! ") == "trader joe s organic milk"
+    assert categorize_grocery_item_rule_based("ORGANIC-milk!") == categorize_grocery_item_rule_based("organic milk")
+
+
+def test_ai_tier_falls_back_to_rules_when_the_llm_fails(monkeypatch):
+    import llm_client
+
+    class Unreachable:
+        def generate(self, *args, **kwargs):
+            raise llm_client.LLMConnectionError("no LLM here")
+
+    monkeypatch.setattr(llm_client, "get_llm_client", lambda: Unreachable())
+    result = categorize_grocery_item_ai("greek yogurt")
+    assert result["category"] == "dairy" and result["confidence"] == 0
+    assert categorize_grocery_item("mystery item xyz") == "other"
+    assert categorize_grocery_item("greek yogurt", use_ai=False) == "dairy"
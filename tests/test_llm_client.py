@@ -0,0 +1,54 @@
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import json
+import threading
+import time
+
+import pytest
+
+from llm_client import LLMClient, LLMTimeoutError
+
+
+class EndlessStreamHandler(BaseHTTPRequestHandler):
+    """Streams a token every 20ms and never sends done"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers["Content-Length"]))
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.end_headers()
+        try:
+            while True:
+                self.wfile.write(json.dumps({"response": "token ", "done": False}).encode() + b"\n")
+                self.wfile.flush()
+                time.sleep(0.02)
+        except (BrokenPipeError, ConnectionResetError):
+            pass
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def endless_server():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), EndlessStreamHandler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+    server.server_close()
+
+
+def test_stream_stops_at_deadline_while_tokens_keep_coming(endless_server):
+    client = LLMClient(base_url=endless_server, max_concurrency=1)
+    started = time.monotonic()
+    tokens = []
+
+    with pytest.raises(LLMTimeoutError):
+        for token in client.stream("prompt", timeout=0.3):
+            tokens.append(token)
+
+    assert tokens
+    assert time.monotonic() - started < 2
+    stats = client.stats()
+    assert stats["in_flight"] == 0
+    assert stats["timed_out"] == 1
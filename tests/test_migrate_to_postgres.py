@@ -0,0 +1,101 @@
+from datetime import datetime, timedelta, timezone
+from decimal import Decimal
+
+import pytest
+
+import migrate_to_postgres
+from conftest import connect_pg
+from migrate_to_postgres import TABLES, _checksum_value, copy_value, migrate, table_checksum
+
+
+def test_copy_values_are_escaped_for_copy_text_format():
+    assert copy_value("description", "tab\there\nnew\\line") == "tab\\there\\nnew\\\\line"
+    assert copy_value("timestamp", "") == "\\N"
+    assert copy_value("description", None) == "\\N"
+    assert copy_value("is_consumed", 1) == "t"
+    assert copy_value("amount", 0.1) == "0.1"
+
+
+def test_checksums_agree_across_backend_representations():
+    sqlite_row = (1, 12.345, "food", "lunch", "2025-07-01T12:00:00")
+    postgres_row = (1, Decimal("12.35"), "food", "lunch", datetime(2025, 7, 1, 12, 0, tzinfo=timezone.utc))
+    columns = TABLES["expenses"]
+    assert table_checksum([sqlite_row], columns) == table_checksum([postgres_row], columns)
+    assert _checksum_value("timestamp", "") is None
+    assert _checksum_value("quantity", 0.1) == _checksum_value("quantity", 0.10000000149011612)
+    assert table_checksum([sqlite_row], columns) != table_checksum([(1, 12.34, *sqlite_row[2:])], columns)
+
+
+@pytest.fixture
+def source(repo):
+    start = datetime(2025, 1, 1, 8, 0)
+    repo.insert_expenses([
+        (round(1.5 * i, 2), f"category {i % 4}", f"expense\t{i}\nline two", start + timedelta(hours=7 * i))
+        for i in range(57)
+    ])
+    repo.conn.executemany(
+        "INSERT INTO pantry_items (name, quantity, unit, is_consumed, grocery_type) VALUES (?, ?, ?, ?, ?)",
+        [(f"item {i}", i / 3, "pieces", i % 2, "other") for i in range(23)]
+    )
+    # Gaps in the ids must survive the copy
+    repo.conn.execute("DELETE FROM expenses WHERE id IN (5, 6, 40)")
+    repo.conn.commit()
+    return repo.conn
+
+
+@pytest.fixture
+def pg_conn(pg_migrated):
+    conn = connect_pg(pg_migrated, dict_rows=False)
+    yield conn
+    conn.close()
+
+
+def test_interrupted_copy_resumes_and_verifies(source, pg_conn, monkeypatch):
+    original_read_chunks = migrate_to_postgres.read_chunks
+
+    def failing_read_chunks(sqlite_conn, table, after_id, chunk_size):
+        for number, rows in enumerate(original_read_chunks(sqlite_conn, table, after_id, chunk_size)):
+            if table == "expenses" and number == 3:
+                raise ConnectionError("connection lost")
+            yield rows
+
+    monkeypatch.setattr(migrate_to_postgres, "read_chunks", failing_read_chunks)
+    with pytest.raises(ConnectionError):
+        migrate(source, pg_conn, chunk_size=10)
+    assert migrate_to_postgres.get_checkpoint(pg_conn, "expenses") == (32, 30)
+    pg_conn.rollback()
+
+    monkeypatch.setattr(migrate_to_postgres, "read_chunks", original_read_chunks)
+    assert migrate(source, pg_conn, chunk_size=10)
+
+    c = pg_conn.cursor()
+    c.execute("SELECT COUNT(*), MAX(id) FROM expenses")
+    assert c.fetchone() == (54, 57)
+    # The id sequences continue after the copied ids
+    c.execute("INSERT INTO expenses (amount, category, description, timestamp) VALUES (1, 'x', 'y', now()) RETURNING id")
+    assert c.fetchone()[0] == 58
+    pg_conn.rollback()
+
+    # Verification notices any difference
+    c.execute("UPDATE pantry_items SET quantity = quantity + 1 WHERE id = 7")
+    pg_conn.commit()
+    assert not migrate(source, pg_conn, verify_only=True)
+
+
+def test_refuses_to_copy_over_rows_it_did_not_copy(source, pg_conn):
+    c = pg_conn.cursor()
+    c.execute("INSERT INTO expenses (amount, category, description, timestamp) VALUES (1, 'x', 'y', now())")
+    pg_conn.commit()
+
+    with pytest.raises(RuntimeError, match="--reset"):
+        migrate(source, pg_conn, chunk_size=10)
+    assert migrate(source, pg_conn, chunk_size=10, reset=True)
+
+    # The wiped row is recorded for sync, and the rollup only counts the copied rows
+    c.execute("SELECT table_name, row_id FROM sync_tombstones")
+    assert c.fetchall() == [("expenses", 1)]
+    c.execute("SELECT category, SUM(expense_count), SUM(total_amount) FROM expense_daily_rollup GROUP BY category ORDER BY category")
+    rollup = c.fetchall()
+    c.execute("SELECT category, COUNT(*), SUM(amount) FROM expenses GROUP BY category ORDER BY category")
+    assert rollup == c.fetchall()
+    assert "x" not in [category for category, _, _ in rollup]
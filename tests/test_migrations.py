@@ -0,0 +1,36 @@
+import pytest
+
+from conftest import create_base_schema
+from migrate_schema import SQLITE_MIGRATIONS, get_applied_versions, migrate_sqlite, run_migrations
+
+
+def columns(conn, table):
+    return {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+
+
+def test_migrate_applies_every_version_once(tmp_path):
+    conn = create_base_schema(str(tmp_path / "expenses.db"))
+    assert migrate_sqlite(conn) == [version for version, _, _ in SQLITE_MIGRATIONS]
+    assert migrate_sqlite(conn) == []
+    conn.close()
+
+
+def test_failed_migration_rolls_back_completely(tmp_path):
+    conn = create_base_schema(str(tmp_path / "expenses.db"))
+    broken = [(1, "add a column, then fail", [
+        "ALTER TABLE expenses ADD COLUMN note TEXT",
+        "CREATE INDEX idx_expenses_note ON expenses (note)",
+        "SELECT * FROM no_such_table",
+    ])]
+
+    with pytest.raises(Exception):
+        run_migrations(conn, broken, "?", begin="BEGIN")
+
+    assert "note" not in columns(conn, "expenses")
+    assert get_applied_versions(conn) == set()
+
+    # Nothing was half-applied, so the fixed migration runs cleanly
+    fixed = [(1, "add a column", broken[0][2][:2])]
+    assert run_migrations(conn, fixed, "?", begin="BEGIN") == [1]
+    assert "note" in columns(conn, "expenses")
+    conn.close()
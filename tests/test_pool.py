@@ -0,0 +1,48 @@
+import threading
+
+import pytest
+
+from conftest import TEST_DATABASE_URL
+
+
+@pytest.fixture
+def db_pool():
+    if not TEST_DATABASE_URL:
+        pytest.skip("TEST_DATABASE_URL not set")
+    from api.dependencies import DatabasePool
+
+    db_pool = DatabasePool(TEST_DATABASE_URL, min_size=2, max_size=5)
+    yield db_pool
+    db_pool.close()
+
+
+def test_stats_count_idle_and_checked_out_connections(db_pool):
+    assert db_pool.stats()["idle"] == 2
+    conns = [db_pool.getconn() for _ in range(4)]
+    assert (db_pool.stats()["in_use"], db_pool.stats()["idle"]) == (4, 0)
+    for conn in conns:
+        db_pool.putconn(conn)
+    # Connections beyond min_size are closed on return
+    assert (db_pool.stats()["in_use"], db_pool.stats()["idle"]) == (0, 2)
+
+    conn = db_pool.getconn()
+    conn.close()
+    db_pool.putconn(conn)
+    assert db_pool.stats()["idle"] == 1
+
+
+def test_concurrent_checkouts_keep_the_books_straight(db_pool):
+    def work():
+        for _ in range(100):
+            conn = db_pool.getconn()
+            conn.cursor().execute("SELECT 1")
+            db_pool.putconn(conn)
+
+    threads = [threading.Thread(target=work) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = db_pool.stats()
+    assert (stats["in_use"], stats["idle"], stats["total_checkouts"]) == (0, 2, 800)
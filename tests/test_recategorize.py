@@ -0,0 +1,45 @@
+from recategorize_all_pantry_items import recategorize_pantry_items
+
+
+def add_pantry_items(repo, items):
+    repo.conn.executemany("INSERT INTO pantry_items (name, grocery_type) VALUES (?, ?)", items)
+    repo.conn.commit()
+
+
+def pantry_types(repo):
+    return {row["id"]: row["grocery_type"] for row in repo.list_pantry_types()}
+
+
+def test_only_changed_items_are_written_and_each_name_is_categorized_once(repo):
+    add_pantry_items(repo, [("milk", "dairy"), ("milk", "other"), ("hot sauce", "pantry"),
+                            ("apple", "produce"), ("hot sauce", "condiments")])
+    calls = []
+
+    def categorize(name):
+        calls.append(name)
+        return {"milk": "dairy", "hot sauce": "condiments", "apple": "produce"}[name]
+
+    item_count, changes = recategorize_pantry_items(repo, categorize)
+
+    assert item_count == 5
+    assert sorted(calls) == ["apple", "hot sauce", "milk"]
+    assert sorted(changes) == [(2, "milk", "other", "dairy"), (3, "hot sauce", "pantry", "condiments")]
+    assert pantry_types(repo) == {1: "dairy", 2: "dairy", 3: "condiments", 4: "produce", 5: "condiments"}
+
+    # A second pass finds nothing left to change
+    assert recategorize_pantry_items(repo, categorize)[1] == []
+
+
+def test_preview_writes_nothing(repo):
+    add_pantry_items(repo, [("milk", "other")])
+    before = pantry_types(repo)
+    _, changes = recategorize_pantry_items(repo, lambda name: "dairy", preview=True)
+    assert changes == [(1, "milk", "other", "dairy")]
+    assert pantry_types(repo) == before
+
+
+def test_progress_reports_distinct_names(repo):
+    add_pantry_items(repo, [("milk", "other")] * 3 + [("bread", "other")])
+    reports = []
+    recategorize_pantry_items(repo, lambda name: "other", progress=lambda done, total: reports.append((done, total)))
+    assert reports == [(2, 2)]
@@ -0,0 +1,150 @@
+from datetime import datetime, timedelta
+import threading
+
+import pytest
+
+import storage
+from api.utils.pagination import decode_cursor, next_cursor_for
+from conftest import connect_pg
+from storage import ExpenseRepository, PostgresRepository, SQLiteRepository
+
+
+def add_expenses(repo, count, start=datetime(2025, 7, 1, 12, 0)):
+    """count expenses an hour apart, plus one pair sharing a timestamp to exercise the id tiebreak"""
+    rows = [(float(i + 1), "food" if i % 2 else "transport", f"expense {i}", start + timedelta(hours=i))
+            for i in range(count)]
+    rows.append((100.0, "food", "same time as the last", start + timedelta(hours=count - 1)))
+    repo.insert_expenses(rows)
+    return repo.list_expenses()
+
+
+def test_repository_base_class_is_abstract():
+    with pytest.raises(TypeError):
+        ExpenseRepository(None)
+
+
+def test_offset_pages_carry_totals_for_the_whole_filtered_set(repo):
+    everything = add_expenses(repo, 9)
+
+    rows, total_count, total_amount = repo.list_expenses_page(limit=4, offset=4)
+    assert [row["id"] for row in rows] == [row["id"] for row in everything[4:9]]
+    assert total_count == 10
+    assert total_amount == sum(row["amount"] for row in everything)
+
+    rows, total_count, total_amount = repo.list_expenses_page(category="food", limit=50)
+    assert total_count == len(rows) == 5
+    assert total_amount == sum(row["amount"] for row in everything if row["category"] == "food")
+
+
+def test_keyset_pages_walk_every_expense_once_in_order(repo):
+    everything = add_expenses(repo, 23)
+
+    rows, total_count, _ = repo.list_expenses_page(limit=5)
+    assert total_count == 24
+    seen = [row["id"] for row in rows[:5]]
+    while len(rows) > 5:
+        before = (rows[4]["timestamp"], rows[4]["id"])
+        rows, total_count, total_amount = repo.list_expenses_page(limit=5, before=before)
+        # Totals come with the first page only
+        assert total_count is None and total_amount is None
+        seen += [row["id"] for row in rows[:5]]
+
+    assert seen == [row["id"] for row in everything]
+
+
+def walk_pages(repo, limit):
+    """Every page's ids, following cursors the way the API hands them out"""
+    rows, _, _ = repo.list_expenses_page(limit=limit)
+    pages = [[row["id"] for row in rows[:limit]]]
+    while (cursor := next_cursor_for(rows, limit)):
+        rows, _, _ = repo.list_expenses_page(limit=limit, before=decode_cursor(cursor))
+        pages.append([row["id"] for row in rows[:limit]])
+    return pages
+
+
+def add_undated_expenses(repo):
+    """Ids 1-4 dated (1 and 3 at the same time), 5-9 without a timestamp"""
+    repo.insert_expenses([(1.0, "food", "a", datetime(2025, 7, 1, 12)), (2.0, "food", "b", datetime(2025, 7, 2, 12)),
+                          (3.0, "food", "c", datetime(2025, 7, 1, 12)), (4.0, "food", "d", datetime(2025, 7, 3, 12))])
+    for i in range(5):
+        repo._execute("INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, 'food', 'undated', NULL)",
+                      (10.0 + i,))
+    repo.conn.commit()
+
+
+@pytest.mark.parametrize("limit", [1, 2, 3, 4, 10])
+def test_keyset_pages_put_undated_expenses_last(repo, limit):
+    add_undated_expenses(repo)
+    pages = walk_pages(repo, limit)
+    assert sum(pages, []) == [4, 2, 3, 1, 9, 8, 7, 6, 5]
+    assert all(len(page) == limit for page in pages[:-1])
+
+
+def test_postgres_keyset_pages_put_undated_expenses_last(pg_migrated):
+    conn = connect_pg(pg_migrated)
+    try:
+        pg_repo = PostgresRepository(conn)
+        add_undated_expenses(pg_repo)
+        for limit in (1, 3, 4):
+            assert sum(walk_pages(pg_repo, limit), []) == [4, 2, 3, 1, 9, 8, 7, 6, 5]
+    finally:
+        conn.close()
+
+
+def test_an_empty_page_still_reports_totals(repo):
+    add_expenses(repo, 3)
+    rows, total_count, total_amount = repo.list_expenses_page(limit=5, offset=50)
+    assert rows == []
+    assert total_count == 4 and total_amount == 106.0
+
+
+def test_transaction_rolls_back_every_write(repo):
+    with pytest.raises(RuntimeError):
+        with repo.transaction():
+            repo.insert_expense(1.0, "food", "kept?", "2025-07-01T12:00:00")
+            repo.insert_expense(2.0, "food", "kept?", "2025-07-01T12:00:00")
+            raise RuntimeError("abort")
+    assert repo.count_expenses() == 0
+
+
+def test_parse_cache_round_trip_and_eviction(repo):
+    assert repo.get_cached_parse("coffee 4.50", "v1") is None
+    repo.store_cached_parse("coffee 4.50", '{"amount": 4.5}', "v1", max_entries=2)
+    assert repo.get_cached_parse("coffee 4.50", "v1") == '{"amount": 4.5}'
+    assert repo.get_cached_parse("coffee 4.50", "v2") is None
+
+    repo.store_cached_parse("tea 3.00", '{"amount": 3.0}', "v1", max_entries=2)
+    repo.store_cached_parse("bagel 2.00", '{"amount": 2.0}', "v2", max_entries=2)
+    assert repo.get_cached_parse("coffee 4.50", "v1") is None  # least recently used
+    assert repo.delete_cached_parses(keep_version="v2") == 1
+    assert repo.delete_cached_parses() == 1
+
+
+def test_parse_cache_uses_the_threads_repository(db_path, monkeypatch):
+    import parse_cache
+
+    monkeypatch.setattr(storage, "SQLITE_DB_PATH", db_path)
+    monkeypatch.setattr(storage, "_local", threading.local())
+    opened = []
+    original_init = SQLiteRepository.__init__
+
+    def counting_init(self, *args, **kwargs):
+        opened.append(threading.get_ident())
+        original_init(self, *args, **kwargs)
+
+    monkeypatch.setattr(SQLiteRepository, "__init__", counting_init)
+
+    def use_cache():
+        parse_cache.store_parse("Coffee $4.5 yesterday", {"amount": 4.5, "parsed_date": "x"}, "v1")
+        assert parse_cache.get_cached_parse("coffee $4.50", "v1") == {"amount": 4.5}
+        assert parse_cache.get_cached_parse("coffee $4.50 today", "v1") == {"amount": 4.5}
+
+    use_cache()
+    use_cache()
+    worker = threading.Thread(target=use_cache)
+    worker.start()
+    worker.join()
+
+    # One connection for the main thread's calls, one for the worker's
+    assert len(opened) == 2 and len(set(opened)) == 2
+    storage.get_repository().close()
@@ -0,0 +1,87 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+DIRECT_GROUP_BY = '''
+    SELECT date(timestamp) AS day, category, COUNT(*), SUM(amount), MIN(amount), MAX(amount)
+    FROM expenses
+    WHERE date(timestamp) IS NOT NULL AND category IS NOT NULL
+    GROUP BY date(timestamp), category
+    ORDER BY day, category
+'''
+
+
+def rollup(repo):
+    rows = repo.conn.execute('''
+        SELECT day, category, expense_count, total_amount, min_amount, max_amount
+        FROM expense_daily_rollup
+        ORDER BY day, category
+    ''').fetchall()
+    return [tuple(row) for row in rows]
+
+
+def direct(repo):
+    return [tuple(row) for row in repo.conn.execute(DIRECT_GROUP_BY).fetchall()]
+
+
+def test_rollup_matches_group_by_through_inserts_updates_and_deletes(repo):
+    ids = [
+        repo.insert_expense(12.5, "food", "lunch", "2025-07-01T12:00:00"),
+        repo.insert_expense(4.0, "food", "coffee", "2025-07-01T08:00:00"),
+        # Offset timestamps roll up under their UTC date
+        repo.insert_expense(30.0, "food", "late dinner", "2025-07-01T23:30:00-05:00"),
+        repo.insert_expense(8.0, "transport", "bus", "2025-07-02T04:00:00+00:00"),
+        repo.insert_expense(15.0, "transport", "taxi", "2025-07-02T09:15:00"),
+    ]
+    assert rollup(repo) == direct(repo)
+
+    repo.update_expense(ids[0], amount=20.0)
+    repo.update_expense(ids[1], category="transport")
+    repo.update_expense(ids[2], timestamp="2025-07-01T10:00:00-05:00")
+    repo.update_expense(ids[3], timestamp="2025-07-03T00:30:00+02:00")
+    assert rollup(repo) == direct(repo)
+
+    repo.delete_expense(ids[4])
+    repo.delete_expense(ids[0])
+    assert rollup(repo) == direct(repo)
+
+    repo.delete_all_expenses()
+    assert rollup(repo) == []
+
+
+def test_unreadable_timestamp_is_left_out_instead_of_failing_the_write(repo):
+    expense_id = repo.insert_expense(9.99, "food", "mystery", "sometime last week")
+    repo.insert_expense(5.0, "food", "snack", "2025-07-01T15:00:00")
+    assert repo.get_expense(expense_id)["timestamp"] == "sometime last week"
+    assert rollup(repo) == direct(repo)
+
+    # Moving into and out of a readable day keeps the rollup in step
+    repo.update_expense(expense_id, timestamp="2025-07-01T09:00:00")
+    assert rollup(repo) == direct(repo)
+    repo.update_expense(expense_id, timestamp="not a date")
+    assert rollup(repo) == direct(repo)
+    repo.delete_expense(expense_id)
+    assert rollup(repo) == direct(repo)
+
+
+@pytest.mark.parametrize("days", [1, 3, 10])
+def test_category_rollup_matches_a_full_scan(repo, days):
+    now = datetime.now()
+    for hours_ago in range(0, 24 * 12, 5):
+        timestamp = now - timedelta(hours=hours_ago, minutes=7)
+        repo.insert_expense(hours_ago % 17 + 1, "food" if hours_ago % 2 else "transport",
+                            f"expense {hours_ago}", timestamp)
+
+    expected = repo.conn.execute('''
+        SELECT category, COUNT(*), SUM(amount), MIN(amount), MAX(amount)
+        FROM expenses
+        WHERE timestamp >= ?
+        GROUP BY category
+        ORDER BY SUM(amount) DESC
+    ''', ((now - timedelta(days=days)).isoformat(),)).fetchall()
+
+    got = [tuple(row) for row in repo.category_rollup(days=days)]
+    assert len(got) == len(expected)
+    for row, want in zip(got, expected):
+        assert row[0] == want[0] and row[1] == want[1] and row[3:] == tuple(want)[3:]
+        assert row[2] == pytest.approx(want[2])
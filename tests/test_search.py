@@ -0,0 +1,139 @@
+from datetime import datetime, timedelta
+
+import pytest
+
+from conftest import connect_pg
+from expense_search import parse_search_query, rebuild_search_index, to_fts5_query, to_tsquery
+from merchant_match import find_near_duplicates, similarity, word_similarity
+
+
+@pytest.fixture
+def expenses(repo):
+    now = datetime.now()
+    ids = {}
+    for key, amount, category, description, age in [
+        ("tj", 38.0, "groceries", "Trader Joe's weekly groceries", 2),
+        ("tj2", 41.0, "groceries", "trader joes", 40),
+        ("coffee", 4.8, "coffee", "Starbucks latte", 1),
+        ("coffee_shop", 6.0, "coffee", "Blue Bottle coffee beans", 3),
+        ("uber", 15.0, "transport", "Uber ride to the airport", 5),
+    ]:
+        ids[key] = repo.insert_expense(amount, category, description, now - timedelta(days=age))
+    return ids
+
+
+def ids(rows):
+    return [row["id"] for row in rows]
+
+
+def test_query_parsing_keeps_user_input_out_of_the_query_syntax():
+    clauses = parse_search_query('"trader joe" star* OR -x')
+    assert clauses == [(("trader", "joe"), False), (("star",), True), (("or",), False), (("x",), False)]
+    assert to_fts5_query(clauses) == '"trader joe" "star"* "or" "x"'
+    assert to_tsquery(clauses) == "trader <-> joe & star:* & or & x"
+
+
+def test_full_text_search_words_prefixes_and_phrases(repo, expenses):
+    assert ids(repo.search_expenses("starbucks")) == [expenses["coffee"]]
+    assert ids(repo.search_expenses("star*")) == [expenses["coffee"]]
+    assert set(ids(repo.search_expenses("trader"))) == {expenses["tj"], expenses["tj2"]}
+    assert ids(repo.search_expenses('"airport uber"')) == []
+    assert ids(repo.search_expenses('"ride to the airport"')) == [expenses["uber"]]
+    # Categories are searchable too, and every clause must match
+    assert set(ids(repo.search_expenses("coffee"))) == {expenses["coffee"], expenses["coffee_shop"]}
+    assert ids(repo.search_expenses("coffee beans")) == [expenses["coffee_shop"]]
+    assert repo.search_expenses("!!!") == []
+
+
+def test_full_text_search_applies_filters_and_follows_edits(repo, expenses):
+    assert ids(repo.search_expenses("trader", days=7)) == [expenses["tj"]]
+    assert ids(repo.search_expenses("coffee", category="coffee", limit=1))[0] in {
+        expenses["coffee"], expenses["coffee_shop"]
+    }
+
+    repo.update_expense(expenses["uber"], description="Lyft ride home")
+    assert repo.search_expenses("uber") == []
+    assert ids(repo.search_expenses("lyft")) == [expenses["uber"]]
+    repo.delete_expense(expenses["uber"])
+    assert repo.search_expenses("lyft") == []
+
+
+def test_fuzzy_search_matches_differently_worded_merchants(repo, expenses):
+    rows = repo.fuzzy_search("trader joe's")
+    assert set(ids(rows)) == {expenses["tj"], expenses["tj2"]}
+    assert all(0.6 <= row["rank"] <= 1 for row in rows)
+    assert repo.fuzzy_search("starbuks")[0]["id"] == expenses["coffee"]
+    assert repo.fuzzy_search("walmart") == []
+
+
+def test_possible_duplicates_need_the_same_amount_nearby_and_a_similar_description(repo, expenses):
+    now = datetime.now()
+    matches = repo.find_possible_duplicates(38.0, "trader joes groceries", now - timedelta(days=1))
+    assert [(row["id"]) for row, _ in matches] == [expenses["tj"]]
+    assert repo.find_possible_duplicates(38.5, "trader joes groceries", now) == []
+    assert repo.find_possible_duplicates(38.0, "trader joes groceries", now - timedelta(days=30)) == []
+
+
+def test_similarity_measures():
+    assert similarity("Trader Joe's", "trader joes") == 1.0
+    assert similarity("coffee", "") == 0.0
+    assert word_similarity("uber", "Uber ride to the airport") == 1.0
+
+
+def test_near_duplicate_pairs_match_a_brute_force_scan():
+    start = datetime(2025, 7, 1)
+    descriptions = ["Trader Joe's", "trader joes", "Trader Joes groceries", "Starbucks", "Starbucks coffee",
+                    "Uber", "Uber ride", "Whole Foods", "whole foods market"]
+    rows = [
+        {"id": i, "amount": (i * 7) % 4 * 5.0, "description": descriptions[i % len(descriptions)],
+         "timestamp": (start + timedelta(days=(i * 5) % 11)).isoformat()}
+        for i in range(60)
+    ]
+
+    expected = set()
+    for a in rows:
+        for b in rows:
+            day_a, day_b = (datetime.fromisoformat(r["timestamp"]).date() for r in (a, b))
+            if ((day_a, a["id"]) < (day_b, b["id"]) and a["amount"] == b["amount"]
+                    and (day_b - day_a).days <= 3
+                    and similarity(a["description"], b["description"]) >= 0.5):
+                expected.add((a["id"], b["id"]))
+
+    pairs = find_near_duplicates(rows)
+    assert {(a, b) for a, b, _ in pairs} == expected
+    assert [score for _, _, score in pairs] == sorted((score for _, _, score in pairs), reverse=True)
+
+
+def test_near_duplicates_skip_rows_without_a_readable_date(repo):
+    repo.insert_expenses([(12.5, "food", "chipotle burrito", "2025-03-01T12:00:00"),
+                          (12.5, "food", "chipotle burrito", "2025-03-01T19:00:00")])
+    repo.conn.executemany("INSERT INTO expenses (amount, category, description, timestamp) VALUES (?, ?, ?, ?)",
+                          [(12.5, "food", "chipotle burrito", None),
+                           (12.5, "food", "chipotle burrito", "last tuesday"),
+                           (12.5, "food", "chipotle burrito", "")])
+    repo.conn.commit()
+
+    assert [(a, b) for a, b, _ in repo.find_duplicate_pairs()] == [(1, 2)]
+
+
+def test_postgres_rebuild_recomputes_search_vectors(pg_migrated):
+    conn = connect_pg(pg_migrated, dict_rows=False)
+    try:
+        c = conn.cursor()
+        # Vectors built with a stemming configuration, as if the column had been defined differently
+        c.execute("ALTER TABLE expenses DROP COLUMN search_vector")
+        c.execute("""
+            ALTER TABLE expenses ADD COLUMN search_vector tsvector
+            GENERATED ALWAYS AS (to_tsvector('english', coalesce(description, ''))) STORED
+        """)
+        c.execute("INSERT INTO expenses (amount, category, description, timestamp) VALUES (5, 'fitness', 'running shoes', now())")
+        conn.commit()
+
+        rebuild_search_index(conn, postgres=True)
+
+        c.execute("SELECT search_vector::text FROM expenses")
+        assert c.fetchone()[0] == "'fitness':3B 'running':1A 'shoes':2A"
+        c.execute("SELECT COUNT(*) FROM pg_indexes WHERE indexname = 'idx_expenses_search_vector' AND schemaname = current_schema()")
+        assert c.fetchone()[0] == 1
+    finally:
+        conn.close()
@@ -0,0 +1,111 @@
+import pytest
+
+from conftest import connect_pg
+from expense_sync import InvalidSyncTokenError, decode_sync_token, encode_sync_token
+from storage import PostgresRepository
+
+
+def test_tokens_round_trip_and_reject_anything_else():
+    assert decode_sync_token(encode_sync_token(42)) == 42
+    assert decode_sync_token(None) == 0
+    assert decode_sync_token("") == 0
+    for token in ("42", "v1-", "v2-42", "v1-42x", "v1--1"):
+        with pytest.raises(InvalidSyncTokenError):
+            decode_sync_token(token)
+
+
+def sync_all(repo, token=0, limit=1000):
+    """Follow has_more to the end; returns ({table: {id: row}}, {table: deleted ids}, token, batches)"""
+    rows, deleted, batches = {}, {}, 0
+    while True:
+        changes, token, has_more = repo.changes_since(token, limit)
+        batches += 1
+        for table, table_changes in changes.items():
+            for row in table_changes["rows"]:
+                rows.setdefault(table, {})[row["id"]] = row
+            deleted.setdefault(table, set()).update(table_changes["deleted"])
+        if not has_more:
+            return rows, deleted, token, batches
+
+
+def test_changes_arrive_once_in_batches_with_deletes_as_tombstones(repo):
+    repo.insert_expenses([(float(i), "food", f"expense {i}", "2025-06-01T12:00:00") for i in range(1, 8)])
+    repo.conn.execute("INSERT INTO pantry_items (name) VALUES ('milk')")
+    repo.conn.commit()
+
+    rows, deleted, token, batches = sync_all(repo, limit=3)
+    assert sorted(rows["expenses"]) == list(range(1, 8))
+    assert list(rows["pantry_items"]) == [1]
+    assert batches == 3
+    assert repo.changes_since(token, 3) == ({"expenses": {"rows": [], "deleted": []},
+                                            "pantry_items": {"rows": [], "deleted": []}}, token, False)
+
+    repo.conn.execute("UPDATE expenses SET amount = 99 WHERE id = 2")
+    repo.conn.execute("DELETE FROM expenses WHERE id IN (3, 4)")
+    repo.conn.execute("DELETE FROM pantry_items")
+    repo.conn.commit()
+
+    rows, deleted, token, _ = sync_all(repo, token, limit=2)
+    assert {table: list(table_rows) for table, table_rows in rows.items()} == {"expenses": [2]}
+    assert rows["expenses"][2]["amount"] == 99
+    assert deleted == {"expenses": {3, 4}, "pantry_items": {1}}
+
+
+def test_a_token_ahead_of_the_database_must_start_over(repo):
+    repo.insert_expenses([(1.0, "food", "coffee", "2025-06-01T12:00:00")])
+    _, _, token, _ = sync_all(repo)
+    with pytest.raises(InvalidSyncTokenError):
+        repo.changes_since(token + 1)
+
+
+@pytest.fixture
+def pg_repos(pg_migrated):
+    connections = [connect_pg(pg_migrated) for _ in range(3)]
+    yield [PostgresRepository(conn) for conn in connections]
+    for conn in connections:
+        conn.close()
+
+
+def insert_expense(repo, category):
+    # Writers of one category and day would queue on the same rollup row
+    return repo._execute(
+        "INSERT INTO expenses (amount, category, description, timestamp) VALUES (1, ?, 'test', now()) RETURNING id",
+        (category,)
+    ).fetchone()["id"]
+
+
+def test_postgres_sync_waits_for_changes_numbered_before_a_later_commit(pg_repos):
+    slow, quick, reader = pg_repos
+
+    # A long transaction takes its number first but commits last
+    slow_id = insert_expense(slow, "groceries")
+    quick_id = insert_expense(quick, "coffee")
+    quick.conn.commit()
+
+    rows, _, token, _ = sync_all(reader)
+    assert rows == {}
+    assert reader.current_change_seq() > token
+    # A token handed out while a writer was open still counts as current
+    sync_all(reader, token)
+    reader.conn.commit()
+
+    slow._execute("UPDATE expenses SET amount = 2 WHERE id = ?", (slow_id,))
+    slow._execute("DELETE FROM expenses WHERE id = ?", (slow_id,))
+    slow.conn.commit()
+
+    rows, deleted, token, _ = sync_all(reader, token)
+    assert list(rows["expenses"]) == [quick_id]
+    assert deleted["expenses"] == {slow_id}
+    assert token == reader.current_change_seq()
+
+
+def test_postgres_rolled_back_writers_do_not_hold_sync_back(pg_repos):
+    writer, _, reader = pg_repos
+    insert_expense(writer, "groceries")
+    writer.conn.rollback()
+    kept_id = insert_expense(writer, "coffee")
+    writer.conn.commit()
+
+    rows, _, token, _ = sync_all(reader)
+    assert list(rows["expenses"]) == [kept_id]
+    assert token == reader.current_change_seq()